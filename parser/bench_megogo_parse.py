@@ -0,0 +1,63 @@
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+import tracemalloc
+from bs4 import BeautifulSoup as bs
+from core import parse_megogo_film_html, extract_megogo_film, match_megogo_search_results, match_megogo_cards
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(base_dir, 'fixtures')
+FILM_URL = "https://megogo.net/ua/view/200-dyuna-chastina-druga.html"
+SEARCH_QUERY = "Дюна: Частина друга"
+
+# "До" — повне дерево html.parser, "після" — lxml лише з потрібними фрагментами
+CASES = {
+    "film": {
+        "fixture": "megogo_film.html",
+        "before": lambda html: extract_megogo_film(bs(html, "html.parser"), FILM_URL),
+        "after": lambda html: parse_megogo_film_html(html, FILM_URL),
+    },
+    "search": {
+        "fixture": "megogo_search.html",
+        "before": lambda html: match_megogo_cards(bs(html, "html.parser"), SEARCH_QUERY),
+        "after": lambda html: match_megogo_search_results(html, SEARCH_QUERY),
+    },
+}
+
+
+def measure(parse, html, repeat):
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(html)
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        parse(html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Мікробенчмарк розбору сторінок Megogo на синтетичних фікстурах (fixtures/README.md)")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'сторінка':<8} {'варіант':<7} {'мс/сторінку':>12} {'пік, МБ':>9}")
+    for name, case in CASES.items():
+        with open(os.path.join(FIXTURES_DIR, case["fixture"]), 'r', encoding='utf-8') as f:
+            html = f.read()
+        results = {}
+        for variant in ("before", "after"):
+            results[variant] = measure(case[variant], html, args.repeat)
+            ms, peak = results[variant]
+            print(f"{name:<8} {variant:<7} {ms:>12.2f} {peak:>9.2f}")
+        print(f"{name:<8} {'speedup':<7} {results['before'][0] / results['after'][0]:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
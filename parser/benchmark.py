@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import core
+import platforms
+import sweettv_http
+from core import configure_base_urls, create_connection, load_genre_cache
+from crawler import CrawlEngine
+from db_writer import FilmBatchWriter
+from platforms import build_film_changes
+from schema import ensure_schema
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(base_dir, 'fixtures')
+# Шлях запиту -> файл фікстури; один сервер відповідає і за Megogo, і за Sweet.tv
+ROUTES_PATH = os.path.join(FIXTURES_DIR, 'routes.json')
+RESULTS_DIR = os.path.join(base_dir, 'bench_results')
+
+BENCH_FILM_NAME = "Дюна: Частина друга"
+BENCH_PLATFORMS = {"Megogo": 1, "Sweet.tv": 2}
+PERCENTILES = (50, 90, 99)
+# Наскільки результат може погіршитись відносно попереднього запуску, перш ніж це вважається регресією
+REGRESSION_THRESHOLD = 0.10
+
+# (модуль, функція, етап) — обгортаються таймером на час бенчмарку
+STAGES = (
+    (platforms, "search_megogo", "megogo_search"),
+    (platforms, "parse_film_page_megogo", "megogo_page"),
+    (sweettv_http, "search_sweettv_http", "sweettv_search"),
+    (sweettv_http, "parse_film_page_sweettv_http", "sweettv_page"),
+    (sweettv_http, "search_sweettv", "sweettv_search_browser"),
+    (sweettv_http, "parse_film_page_sweettv", "sweettv_page_browser"),
+    (platforms, "fetch_sweettv", "sweettv_total"),
+)
+
+
+def percentile(values, pct):
+    """Перцентиль з лінійною інтерполяцією між сусідніми значеннями."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def load_routes(path=ROUTES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        routes = json.load(f)
+    pages = {}
+    for route, fixture in routes.items():
+        with open(os.path.join(os.path.dirname(path), fixture), 'rb') as f:
+            pages[route] = f.read()
+    return pages
+
+
+class FixtureServer:
+    """Локальний HTTP-сервер, що віддає сторінки-фікстури за шляхом запиту (query ігнорується)."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.hits = 0
+        self.misses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path
+                body = server.pages.get(path)
+                with server._lock:
+                    if body is None:
+                        server.misses.append(path)
+                    else:
+                        server.hits += 1
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        return False
+
+
+class StageTimer:
+    """Збирає тривалості викликів по етапах (потокобезпечно)."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def timed(self, stage, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+        return wrapper
+
+    @contextlib.contextmanager
+    def patched(self, stages=STAGES):
+        originals = [(module, name, getattr(module, name)) for module, name, _ in stages]
+        for module, name, stage in stages:
+            setattr(module, name, self.timed(stage, getattr(module, name)))
+        try:
+            yield self
+        finally:
+            for module, name, original in originals:
+                setattr(module, name, original)
+
+    def summary(self):
+        result = {}
+        for stage, values in sorted(self.samples.items()):
+            ms = [v * 1000 for v in values]
+            result[stage] = {"count": len(ms), "mean": sum(ms) / len(ms)}
+            for pct in PERCENTILES:
+                result[stage][f"p{pct}"] = percentile(ms, pct)
+        return result
+
+
+def no_browser(cookies):
+    raise RuntimeError("браузер вимкнено, запустіть бенчмарк з --browser")
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає кілобайти, macOS — байти
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class MemoryStore:
+    """Без БД: вимірюється лише підготовка змін (build_film_changes)."""
+
+    def __init__(self, timer):
+        self.build = timer.timed("db_write", build_film_changes)
+
+    def create_films(self, count):
+        return list(range(1, count + 1))
+
+    def write(self, film_id, result):
+        self.build(film_id, result, BENCH_PLATFORMS)
+
+    def close(self):
+        pass
+
+
+class MySQLStore:
+    """
+    Пише результати через FilmBatchWriter у локальну MySQL з db_config.json.
+    Фільми бенчмарку створюються на початку та видаляються в кінці.
+    """
+
+    def __init__(self, timer):
+        self.conn = create_connection()
+        self.cursor = self.conn.cursor()
+        ensure_schema(self.cursor)
+        self.cursor.execute("SELECT * FROM platform")
+        platform_cache = {p['name']: p['platform_id'] for p in self.cursor.fetchall()}
+        self.writer = FilmBatchWriter(self.conn, self.cursor, load_genre_cache(self.cursor), platform_cache)
+        self.writer.flush = timer.timed("db_write", self.writer.flush)
+        self.film_ids = []
+
+    def create_films(self, count):
+        for _ in range(count):
+            self.cursor.execute("INSERT INTO films (name, normalized_name) VALUES (%s, %s)",
+                                (BENCH_FILM_NAME, core.normalize_title(BENCH_FILM_NAME)))
+            self.film_ids.append(self.cursor.lastrowid)
+        self.conn.commit()
+        return list(self.film_ids)
+
+    def write(self, film_id, result):
+        self.writer.add(film_id, result)
+
+    def close(self):
+        try:
+            self.writer.flush()
+        finally:
+            if self.film_ids:
+                placeholders = ", ".join(["%s"] * len(self.film_ids))
+                for table, column in (("film_platform", "film_id"), ("film_genre", "film_id"), ("film_search", "film_id"),
+                                      ("film_search_country", "film_id"), ("film_search_price", "film_id"), ("films", "id")):
+                    self.cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", self.film_ids)
+                self.conn.commit()
+            self.cursor.close()
+            self.conn.close()
+
+
+def run_benchmark(film_count, db="memory", browser=False, routes_path=ROUTES_PATH):
+    """Проганяє film_count фільмів через CrawlEngine на фікстурах і повертає результати заміру."""
+    timer = StageTimer()
+    store = (MySQLStore if db == "mysql" else MemoryStore)(timer)
+    base_urls = (core.MEGOGO_BASE_URL, core.SWEETTV_BASE_URL)
+    found = {"megogo": 0, "sweettv": 0}
+    try:
+        with FixtureServer(load_routes(routes_path)) as server, timer.patched():
+            configure_base_urls(megogo=server.url, sweettv=server.url)
+            films = [{"id": film_id, "name": BENCH_FILM_NAME} for film_id in store.create_films(film_count)]
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                engine = CrawlEngine([], megogo_min_interval=0, sweettv_min_interval=0, sweettv_http_first=not browser,
+                                     driver_factory=None if browser else no_browser)
+                try:
+                    start = time.perf_counter()
+                    for result in engine.crawl(films):
+                        found["megogo"] += result['megogo_data'] is not None
+                        found["sweettv"] += result['sweettv_data'] is not None
+                        store.write(result['film']['id'], result)
+                    store.close()
+                    store = None
+                    wall = time.perf_counter() - start
+                finally:
+                    engine.close()
+            http_hits, http_misses = server.hits, sorted(set(server.misses))
+    finally:
+        configure_base_urls(*base_urls)
+        if store is not None:
+            store.close()
+
+    return {
+        "films": film_count,
+        "db": db,
+        "browser": browser,
+        "wall_seconds": wall,
+        "films_per_min": film_count / wall * 60 if wall else None,
+        "peak_memory_mb": peak_memory_mb(),
+        "found": found,
+        "http_requests": http_hits,
+        "http_misses": http_misses,
+        "stages": timer.summary(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=base_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['revision']}.json"
+    path = os.path.join(results_dir, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_previous(results, results_dir=RESULTS_DIR):
+    """Останній збережений запуск з тими ж налаштуваннями (БД, браузер)."""
+    for path in sorted(glob.glob(os.path.join(results_dir, '*.json')), reverse=True):
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get("db") == results["db"] and previous.get("browser") == results["browser"]:
+            return previous
+    return None
+
+
+def find_regressions(previous, current, threshold=REGRESSION_THRESHOLD):
+    """Список (метрика, було, стало) для всього, що погіршилось більше ніж на threshold."""
+    regressions = []
+    if previous.get("films_per_min") and current["films_per_min"] < previous["films_per_min"] * (1 - threshold):
+        regressions.append(("films_per_min", previous["films_per_min"], current["films_per_min"]))
+    for stage, stats in current["stages"].items():
+        before = previous.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for key in ("p50", "p90"):
+            if before.get(key) and stats[key] > before[key] * (1 + threshold):
+                regressions.append((f"{stage}.{key}", before[key], stats[key]))
+    return regressions
+
+
+def print_report(results):
+    memory = results["peak_memory_mb"]
+    print(f"Фільмів: {results['films']} за {results['wall_seconds']:.2f} с — {results['films_per_min']:.0f} фільмів/хв")
+    print(f"Знайдено: Megogo {results['found']['megogo']}, Sweet.tv {results['found']['sweettv']}; "
+          f"HTTP-запитів: {results['http_requests']}; пік пам'яті: {f'{memory:.1f} МБ' if memory else 'н/д'}")
+    if results["http_misses"]:
+        print(f"[!] Запити без фікстур: {', '.join(results['http_misses'])}")
+    print(f"\n{'етап':<24} {'викликів':>8} {'p50, мс':>9} {'p90, мс':>9} {'p99, мс':>9}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<24} {stats['count']:>8} {stats['p50']:>9.2f} {stats['p90']:>9.2f} {stats['p99']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк конвеєра парсера на синтетичних сторінках (fixtures/README.md)")
+    parser.add_argument("--films", type=int, default=200)
+    parser.add_argument("--db", choices=("memory", "mysql"), default="memory",
+                        help="memory — без БД; mysql — запис у локальну MySQL з db_config.json")
+    parser.add_argument("--browser", action="store_true", help="розбирати Sweet.tv у headless Chrome")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.films, db=args.db, browser=args.browser)
+    results["revision"] = git_revision()
+    results["timestamp"] = datetime.now().isoformat(timespec='seconds')
+    print_report(results)
+
+    previous = load_previous(results)
+    regressions = find_regressions(previous, results) if previous else []
+    if previous:
+        print(f"\nПорівняння з {previous.get('revision')} ({previous.get('timestamp')}):")
+        for metric, before, after in regressions:
+            print(f"  [!] Регресія {metric}: {before:.2f} -> {after:.2f}")
+        if not regressions:
+            print(f"  Регресій понад {REGRESSION_THRESHOLD:.0%} немає.")
+    if not args.no_save:
+        print(f"\nРезультати збережено: {save_results(results)}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
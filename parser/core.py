@@ -3,15 +3,39 @@ import pymysql.cursors
 import json
 import os
 import re
+import sqlite3
+import threading
 import requests
-from bs4 import BeautifulSoup as bs
-from difflib import SequenceMatcher
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup as bs, SoupStrainer
+import soupsieve as sv
 import urllib.parse
 import time
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException
+from matching import TITLE_MATCH_THRESHOLD, normalize_title, similarity, best_title_match
+import metrics
+
+# Базові адреси платформ; бенчмарк перенаправляє їх на локальний сервер з фікстурами
+MEGOGO_BASE_URL = "https://megogo.net"
+SWEETTV_BASE_URL = "https://sweet.tv"
+
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 10
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_BACKOFF_JITTER = 0.5
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_http_session = None
+_http_lock = threading.Lock()
+_http_counters = {"requests": 0, "retries": 0}
 
 def get_db_config():
     try:
@@ -42,43 +66,150 @@ def create_connection():
     config = get_db_config()
     return pymysql.connect(**config)
 
-def normalize_title(title):
-    if not title: return None
-    title = title.lower()
-    title = re.sub(r'["\'"“”’‘:,\-\s]+', ' ', title)
-    title = re.sub(r'\([^)]*\)', '', title)
-    return title.strip()
+def configure_base_urls(megogo=None, sweettv=None):
+    global MEGOGO_BASE_URL, SWEETTV_BASE_URL
+    if megogo: MEGOGO_BASE_URL = megogo.rstrip('/')
+    if sweettv: SWEETTV_BASE_URL = sweettv.rstrip('/')
 
-def similarity(a, b):
-    if not a or not b: return 0
-    return SequenceMatcher(None, a.lower().strip(), b.lower().strip()).ratio()
+def megogo_url(path):
+    return MEGOGO_BASE_URL + path
 
-def get_or_create_genre(cursor, genre_cache, genre_name):
-    clean_name = genre_name.strip()
-    if not clean_name:
-        return None
-    
-    if clean_name in genre_cache:
-        return genre_cache[clean_name]
+def sweettv_url(path):
+    return SWEETTV_BASE_URL + path
 
-    cursor.execute("SELECT genre_id FROM genre WHERE name = %s", (clean_name,))
-    result = cursor.fetchone()
-    
-    if result:
-        genre_id = result['genre_id']
-    else:
-        try:
-            cursor.execute("INSERT INTO genre (name) VALUES (%s)", (clean_name,))
-            genre_id = cursor.lastrowid
-            print(f"    -> Створено новий жанр: '{clean_name}' (ID: {genre_id})")
-        except pymysql.err.IntegrityError:
-            cursor.execute("SELECT genre_id FROM genre WHERE name = %s", (clean_name,))
-            result = cursor.fetchone()
-            genre_id = result['genre_id'] if result else None
-
-    if genre_id:
-        genre_cache[clean_name] = genre_id
-    return genre_id
+def _build_http_session(pool_size, retries):
+    retry = Retry(
+        total=retries,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+def configure_http_session(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES):
+    """
+    Створює спільну HTTP-сесію з пулом keep-alive з'єднань, стисненням gzip/br
+    та повторами з експоненційною затримкою на 429/5xx. Попередня сесія закривається,
+    тож викликати лише на старті процесу (або в тестах), поки жоден потік нею не користується.
+    """
+    global _http_session
+    session = _build_http_session(pool_size, retries)
+    with _http_lock:
+        old_session, _http_session = _http_session, session
+        _http_counters.update(requests=0, retries=0)
+    if old_session is not None:
+        old_session.close()
+    return session
+
+def get_http_session(pool_size=HTTP_POOL_SIZE):
+    """Спільна сесія; перший виклик створює її під замком з пулом на pool_size з'єднань, далі pool_size ігнорується."""
+    global _http_session
+    session = _http_session
+    if session is None:
+        with _http_lock:
+            if _http_session is None:
+                _http_session = _build_http_session(pool_size, HTTP_RETRIES)
+            session = _http_session
+    return session
+
+def http_get(url, **kwargs):
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    r = get_http_session().get(url, **kwargs)
+    retries = r.raw.retries if r.raw is not None else None
+    retried = len(retries.history) if retries is not None else 0
+    with _http_lock:
+        _http_counters["requests"] += 1
+        _http_counters["retries"] += retried
+    host = urllib.parse.urlsplit(url).hostname
+    metrics.count("http_requests", host=host, status=r.status_code)
+    if retried:
+        metrics.count("http_retries", retried, host=host)
+    return r
+
+def get_http_stats():
+    """Лічильники HTTP-шару: скільки з'єднань відкрито і скільки запитів пішло повторно використаними."""
+    opened = 0
+    sent = 0
+    session = _http_session
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None: continue
+                opened += pool.num_connections
+                sent += pool.num_requests
+    with _http_lock:
+        stats = dict(_http_counters)
+    stats["connections_opened"] = opened
+    stats["connections_reused"] = max(sent - opened, 0)
+    return stats
+
+def create_sweettv_driver(cookies):
+    options = Options()
+    options.add_argument("--start-maximized")
+    options.add_argument("--headless")
+    driver = webdriver.Chrome(options=options)
+
+    driver.get(sweettv_url("/"))
+    try:
+        WebDriverWait(driver, 10).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    except TimeoutException:
+        pass
+    for cookie in cookies:
+        try: driver.add_cookie(cookie)
+        except: pass
+    return driver
+
+def genre_key(genre_name):
+    """Канонічний ключ жанру: без різниці в регістрі та пробілах ("Наукова  фантастика" == "наукова фантастика")."""
+    return " ".join((genre_name or "").split()).casefold()
+
+def load_genre_cache(cursor):
+    """genre_key -> genre_id; з кількох варіантів одного жанру береться найстаріший запис."""
+    cursor.execute("SELECT genre_id, name FROM genre ORDER BY genre_id")
+    genre_cache = {}
+    for row in cursor.fetchall():
+        genre_cache.setdefault(genre_key(row['name']), row['genre_id'])
+    return genre_cache
+
+def resolve_genres(cursor, genre_cache, genre_names):
+    """
+    Повертає genre_id для списку назв (без повторів, у порядку назв). Відсутні в кеші
+    жанри створюються і перечитуються однією парою INSERT IGNORE / SELECT ... IN.
+    """
+    missing = {}
+    for name in genre_names:
+        key = genre_key(name)
+        if key and key not in genre_cache and key not in missing:
+            missing[key] = " ".join(name.split())
+
+    if missing:
+        metrics.count("genre_cache", len(missing), result="miss")
+        names = list(missing.values())
+        with metrics.timer("genre_lookup"):
+            cursor.executemany("INSERT IGNORE INTO genre (name) VALUES (%s)", names)
+            if cursor.rowcount and cursor.rowcount > 0:
+                print(f"    -> Створено нових жанрів: {cursor.rowcount}")
+                metrics.count("genres_created", cursor.rowcount)
+            cursor.execute(f"SELECT genre_id, name FROM genre WHERE name IN ({', '.join(['%s'] * len(names))}) ORDER BY genre_id", names)
+            for row in cursor.fetchall():
+                genre_cache.setdefault(genre_key(row['name']), row['genre_id'])
+
+    genre_ids = []
+    for name in genre_names:
+        genre_id = genre_cache.get(genre_key(name))
+        if genre_id and genre_id not in genre_ids:
+            genre_ids.append(genre_id)
+    return genre_ids
 
 def parse_megogo_options(film_id, platform_id, json_str):
     rows_to_insert = []
@@ -118,91 +249,173 @@ def parse_megogo_options(film_id, platform_id, json_str):
     
     return rows_to_insert
 
-def parse_sweettv_prices(driver):
+SWEETTV_PAGE_BUDGET = 8.0
+# Скільки чекати на появу модалки чи кнопок цін (як пауза до появи бюджету сторінки)
+SWEETTV_FIRST_WAIT = 2.0
+SWEETTV_POLL_INTERVAL = 0.1
+
+# Один запит до DOM замість кількох find_element/очікувань: стан модалок, кнопок та блоків цін
+SWEETTV_STATE_JS = """
+const text = el => el ? (el.innerText || '').trim() : null;
+const content = el => el ? (el.textContent || '').trim() : null;
+const byClass = (root, name) => Array.from(root.getElementsByClassName(name));
+const modal = document.getElementById('movieBlocked');
+const visible = el => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+return {
+    modal: visible(modal),
+    buttons: byClass(document, 'movie-info__buttons-button').map(b => content(b).toLowerCase()),
+    subs: byClass(document, 'subscriptions__cards-card').map(card => ({
+        name: text(card.getElementsByClassName('subscriptions__cards-card-title')[0]),
+        price: content(card.getElementsByClassName('subscriptions__cards-card-discount-price')[0])
+    })),
+    offers: byClass(document, 'movie-offers__modal-purchase').map(section => ({
+        title: content(section.getElementsByClassName('movie-offers__modal-purchase-title')[0]),
+        offers: byClass(section, 'movie-offers__modal-purchase-offers-offer').map(block => ({
+            quality: content(block.getElementsByClassName('movie-offers__modal-purchase-offers-offer-title')[0]),
+            price: content(block.getElementsByClassName('movie-offers__modal-purchase-offers-offer-price-amount')[0])
+        }))
+    })),
+    ready: document.readyState
+};
+"""
+
+# Усі поля фільму за один виклик execute_script (null, якщо елемент відсутній)
+SWEETTV_FILM_JS = """
+const text = sel => { const el = document.querySelector(sel); return el ? (el.innerText || '').trim() : null; };
+const texts = sel => Array.from(document.querySelectorAll(sel)).map(el => (el.innerText || '').trim());
+return {
+    name: text('h1.movie__title'),
+    description: text('p#film_description'),
+    imdb_rating: text("span[data-movie-el='16']"),
+    countries: texts('p.desc-film-countries a'),
+    genres: texts('p.desc-film-page-genre'),
+    age_limit: text("span[data-movie-el='25']"),
+    duration: text('span#timeCount'),
+    duration_unit: text('span#timeLabel'),
+    release_year: text("span[data-movie-el='14']")
+};
+"""
+
+_sweettv_wait_lock = threading.Lock()
+_sweettv_wait_stats = {"pages": 0, "total_seconds": 0.0, "wait_seconds": 0.0, "budget_exceeded": 0}
+
+def get_sweettv_wait_stats():
+    with _sweettv_wait_lock:
+        return dict(_sweettv_wait_stats)
+
+class _PageBudget:
+    """Бюджет часу на одну сторінку Sweet.tv та облік часу, витраченого на очікування DOM."""
+
+    def __init__(self, seconds):
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.waited = 0.0
+
+    def remaining(self, cap=None):
+        left = max(self.deadline - time.monotonic(), 0.0)
+        return min(left, cap) if cap is not None else left
+
+    def wait_state(self, driver, condition, cap=None):
+        timeout = self.remaining(cap)
+        start = time.monotonic()
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=SWEETTV_POLL_INTERVAL).until(
+                lambda d: (state := d.execute_script(SWEETTV_STATE_JS)) and condition(state) and state
+            )
+        finally:
+            self.waited += time.monotonic() - start
+
+    def finish(self):
+        total = time.monotonic() - self.started
+        exceeded = time.monotonic() > self.deadline
+        with _sweettv_wait_lock:
+            _sweettv_wait_stats["pages"] += 1
+            _sweettv_wait_stats["total_seconds"] += total
+            _sweettv_wait_stats["wait_seconds"] += self.waited
+            if exceeded:
+                _sweettv_wait_stats["budget_exceeded"] += 1
+        metrics.observe("sweettv_dom_wait", self.waited)
+        if exceeded:
+            metrics.count("sweettv_budget_exceeded")
+        print(f"    > [Sweet.tv] Час сторінки: {total:.2f} с, з них очікування: {self.waited:.2f} с.")
+
+def _prices_outcome(json_prices):
+    return "no_prices" if json.loads(json_prices) == {"M": "0 грн"} else "prices"
+
+@metrics.timed("sweettv_prices", outcome=_prices_outcome)
+def parse_sweettv_prices(driver, budget_seconds=SWEETTV_PAGE_BUDGET):
     access_data = {}
+    budget = _PageBudget(budget_seconds)
     try:
+        # Чекаємо, поки з'явиться або вікова модалка, або кнопки/блоки цін, без фіксованих пауз
         try:
-            age_modal = WebDriverWait(driver, 2).until( 
-                EC.presence_of_element_located((By.ID, "movieBlocked"))
-            )
+            state = budget.wait_state(driver, lambda st: st['modal'] or st['buttons'] or st['offers'],
+                                      cap=SWEETTV_FIRST_WAIT)
+        except TimeoutException:
+            metrics.count("timeouts", stage="sweettv_prices")
+            state = driver.execute_script(SWEETTV_STATE_JS)
+
+        if state['modal']:
             print("    > Виявлено вікове обмеження доступу.")
-            confirm_btn = age_modal.find_element(By.CSS_SELECTOR, ".btn")
-            confirm_btn.click()
-            WebDriverWait(driver, 5).until(
-                EC.invisibility_of_element_located((By.ID, "movieBlocked"))
-            )
-            print("    > Вікове обмеження пройдено")
-        except:
-            pass
+            try:
+                driver.find_element(By.CSS_SELECTOR, "#movieBlocked .btn").click()
+                budget.wait_state(driver, lambda st: not st['modal'], cap=5)
+                print("    > Вікове обмеження пройдено")
+            except Exception:
+                pass
+            state = driver.execute_script(SWEETTV_STATE_JS)
 
-        buttons = driver.find_elements(By.CLASS_NAME, "movie-info__buttons-button")
         clicked = False
 
-        for watch_button in buttons:
-            button_text = watch_button.get_attribute("textContent").strip().lower()
+        for index, button_text in enumerate(state['buttons']):
             if "незабаром" in button_text: continue
 
             if "у передплаті" in button_text:
                 print(f"    > Знайдено передплату: «{button_text}».")
                 
                 try: 
-                    watch_button.click()
-                    WebDriverWait(driver, 10).until( 
-                        EC.presence_of_element_located((By.CLASS_NAME, "subscriptions__cards-card")) 
-                    )
+                    driver.find_elements(By.CLASS_NAME, "movie-info__buttons-button")[index].click()
+                    subs = budget.wait_state(driver, lambda st: st['subs'], cap=10)['subs']
                     
-                    subs = driver.find_elements(By.CLASS_NAME, "subscriptions__cards-card")
                     if subs:
                         print(f"    > Знайдено {len(subs)} пакет(ів) підписки:")
                         for sub in subs:
-                            name = "N/A"
-                            price = "N/A"
-                            try:
-                                name = sub.find_element(By.CLASS_NAME, "subscriptions__cards-card-title").text.strip()
-                            except NoSuchElementException: pass
-                            
-                            try:
-                                price = sub.find_element(By.CLASS_NAME, "subscriptions__cards-card-discount-price").get_attribute("textContent").strip()
-                            except NoSuchElementException: pass
-                                
+                            name = sub['name'] if sub['name'] is not None else "N/A"
+                            price = sub['price'] if sub['price'] is not None else "N/A"
                             access_data[name] = price
                             print(f"    >  - {name}: {price}")
                     try:
-                        close_btn = driver.find_element(By.CSS_SELECTOR, ".modal-content .close")
-                        close_btn.click()
-                        WebDriverWait(driver, 5).until(
-                            EC.invisibility_of_element_located((By.CLASS_NAME, "subscriptions__cards-card"))
-                        )
-                    except: 
-                        driver.back() 
-                        time.sleep(2)
+                        driver.find_element(By.CSS_SELECTOR, ".modal-content .close").click()
+                        budget.wait_state(driver, lambda st: not st['subs'], cap=5)
+                    except Exception:
+                        driver.back()
+                        budget.wait_state(driver, lambda st: st['ready'] == 'complete', cap=5)
                         
                 except Exception as e:
+                    metrics.set_outcome("modal_error")
                     print(f"    [!] Помилка під час обробки модального вікна підписки: {e}")
                 
                 clicked = True
                 break
 
-        if not clicked:
-            offer_sections = driver.find_elements(By.CLASS_NAME, "movie-offers__modal-purchase")
-            if offer_sections:
-                print("    > Знайдено пропозиції Покупки/Оренди:")
-                for section in offer_sections:
-                    try:
-                        section_title = section.find_element(By.CLASS_NAME, "movie-offers__modal-purchase-title").get_attribute("textContent").strip()
-                        offer_blocks = section.find_elements(By.CLASS_NAME, "movie-offers__modal-purchase-offers-offer")
-                        section_data = {}
-                        for block in offer_blocks:
-                            quality = block.find_element(By.CLASS_NAME, "movie-offers__modal-purchase-offers-offer-title").get_attribute("textContent").strip()
-                            price = block.find_element(By.CLASS_NAME, "movie-offers__modal-purchase-offers-offer-price-amount").get_attribute("textContent").strip()
-                            section_data[quality] = price
-                        if section_data:
-                            access_data[section_title] = section_data
-                    except Exception as e:
-                        print(f"    [!] Помилка парсингу блоку покупки/оренди: {e}")
+        if not clicked and state['offers']:
+            print("    > Знайдено пропозиції Покупки/Оренди:")
+            for section in state['offers']:
+                if section['title'] is None:
+                    print("    [!] Помилка парсингу блоку покупки/оренди: немає заголовка.")
+                    continue
+                if any(block['quality'] is None or block['price'] is None for block in section['offers']):
+                    print(f"    [!] Помилка парсингу блоку покупки/оренди: неповний блок у «{section['title']}».")
+                    continue
+                section_data = {block['quality']: block['price'] for block in section['offers']}
+                if section_data:
+                    access_data[section['title']] = section_data
                         
     except Exception as e:
+        metrics.set_outcome("error")
         print(f"    [!] Загальна помилка у parse_sweettv_prices: {e}")
+    finally:
+        budget.finish()
 
     if not access_data:
         print("    > Ціни на Sweet.tv не знайдено (можливо, доступно у базовій підписці).")
@@ -234,61 +447,124 @@ def parse_sweettv_options(film_id, platform_id, json_str):
         print(f"    [!] Помилка JSON-парсингу Sweet.tv (parse_options): {json_str}")
     return rows_to_insert
 
-def parse_film_page_megogo(url):
+def unchanged_megogo_data(url):
+    """Позначка для save_and_normalize_data: сторінка Megogo не змінилась, її дані в БД актуальні."""
+    return {"url": url, "unchanged": True}
+
+def _parsed(film_data):
+    return "parsed" if film_data else "error"
+
+@metrics.timed("megogo_page", outcome=_parsed)
+def parse_film_page_megogo(url, page_cache=None, skip_unchanged=False):
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status() 
-        soup = bs(r.text, "html.parser")
-    except requests.RequestException as e:
+        if page_cache is not None:
+            html, changed = page_cache.fetch(url)
+        else:
+            r = http_get(url)
+            r.raise_for_status() 
+            html, changed = r.text, True
+    except (requests.RequestException, OSError) as e:
         print(f"    [!] Не вдалося завантажити сторінку {url}: {e}")
         return None
+    if skip_unchanged and not changed:
+        print(f"    > [Megogo] Сторінка не змінилась з минулого оновлення: {url}")
+        metrics.set_outcome("unchanged")
+        return unchanged_megogo_data(url)
+    return parse_megogo_film_html(html, url)
+
+# Класи елементів, у яких лежать усі поля сторінки фільму Megogo; решта сторінки
+# (меню, схожі фільми, скрипти) при розборі пропускається
+MEGOGO_FILM_ROOT_CLASSES = frozenset({
+    'video-title', 'player-poster', 'videoInfoPanel-age-limit', 'videoInfoPanel-rating',
+    'video-genre', 'video-info', 'video-duration', 'video-description', 'trailer-overlay',
+})
+
+def _has_class(names):
+    # Під час розбору strainer отримує весь атрибут class одним рядком ("card videoItem")
+    return lambda value: value is not None and not names.isdisjoint(value.split())
+
+MEGOGO_FILM_STRAINER = SoupStrainer(class_=_has_class(MEGOGO_FILM_ROOT_CLASSES))
+MEGOGO_CARD_STRAINER = SoupStrainer('div', class_=_has_class(frozenset({'card'})))
 
-    name_tag = soup.select_one('h1.video-title[itemprop="name"]')
+MEGOGO_SELECTORS = {name: sv.compile(selector) for name, selector in {
+    'name': 'h1.video-title[itemprop="name"]',
+    'poster': '.player-poster img[itemprop="url"]',
+    'age': '.videoInfoPanel-age-limit',
+    'rating': '.videoInfoPanel-rating',
+    'value': '.value',
+    'genre': 'a.video-genre',
+    'duration': '.video-duration span[itemprop="duration"]',
+    'year': '.video-info .video-year',
+    'country': '.video-info .video-country',
+    'description': '.video-description .show-more',
+    'svod': '.trailer-overlay.svod',
+    'svod_description': '.stub-description',
+    'tvod': '.trailer-overlay.tvod',
+    'tvod_block': '.pQuality__1',
+    'tvod_title': '.pQuality__title',
+    'tvod_item': '.pQuality__item',
+    'quality': '.pQualityItem__quality',
+    'item_duration': '.pQualityItem__duration',
+    'price': '.pQualityItemPrice__value',
+    'currency': '.pQualityItemPrice__currency',
+    'card_poster': 'div.thumb img[data-original]',
+    'card_link': 'a.card-content-title',
+    'card_title': 'h3.card-title',
+    'card_thumb_link': 'div.thumb a',
+}.items()}
+
+@metrics.timed("megogo_parse")
+def parse_megogo_film_html(html, url):
+    return extract_megogo_film(bs(html, "lxml", parse_only=MEGOGO_FILM_STRAINER), url)
+
+def extract_megogo_film(soup, url):
+    sel = MEGOGO_SELECTORS
+    name_tag = sel['name'].select_one(soup)
     name = name_tag.get_text(strip=True) if name_tag else None
     if not name: return None
         
     normalized_name = normalize_title(name)
-    poster_tag = soup.select_one('.player-poster img[itemprop="url"]')
+    poster_tag = sel['poster'].select_one(soup)
     poster_url = poster_tag['src'] if poster_tag else None
-    age_tag = soup.select_one('.videoInfoPanel-age-limit')
+    age_tag = sel['age'].select_one(soup)
     age_limit = age_tag.get_text(strip=True) if age_tag else None
-    rating_tags = soup.select('.videoInfoPanel-rating')
+    rating_tags = sel['rating'].select(soup)
     imdb_rating = None
     for tag in rating_tags:
         if 'IMDb' in tag.get_text():
-            value_span = tag.select_one('.value')
+            value_span = sel['value'].select_one(tag)
             imdb_rating = value_span.get_text(strip=True).strip(',') if value_span else None
             break
-    genre_tags = soup.select('a.video-genre')
+    genre_tags = sel['genre'].select(soup)
     genres = ', '.join(tag.get_text(strip=True) for tag in genre_tags)
-    duration_tag = soup.select_one('.video-duration span[itemprop="duration"]')
+    duration_tag = sel['duration'].select_one(soup)
     film_duration = duration_tag.get_text(strip=True) if duration_tag else None
-    year_tag = soup.select_one('.video-info .video-year')
+    year_tag = sel['year'].select_one(soup)
     release_year = year_tag.get_text(strip=True) if year_tag else None
-    country_tag = soup.select_one('.video-info .video-country')
+    country_tag = sel['country'].select_one(soup)
     country = country_tag.get_text(strip=True) if country_tag else None
-    description_tag = soup.select_one('.video-description .show-more')
+    description_tag = sel['description'].select_one(soup)
     description = description_tag.get_text(separator=' ', strip=True) if description_tag else None
     
     access_options_megogo_obj = []
-    subscription_overlay = soup.select_one('.trailer-overlay.svod')
+    subscription_overlay = sel['svod'].select_one(soup)
     if subscription_overlay:
-        desc = subscription_overlay.select_one('.stub-description')
+        desc = sel['svod_description'].select_one(subscription_overlay)
         if desc: access_options_megogo_obj.append({"type": "Передплата", "description": desc.get_text(separator=' ', strip=True)})
     
-    tvod_overlay = soup.select_one('.trailer-overlay.tvod')
+    tvod_overlay = sel['tvod'].select_one(soup)
     if tvod_overlay:
-        blocks = tvod_overlay.select('.pQuality__1')
+        blocks = sel['tvod_block'].select(tvod_overlay)
         for block in blocks:
-            title = block.select_one('.pQuality__title')
+            title = sel['tvod_title'].select_one(block)
             if not title: continue
             access_type = title.get_text(strip=True)
-            items = block.select('.pQuality__item')
+            items = sel['tvod_item'].select(block)
             for item in items:
-                quality = item.select_one('.pQualityItem__quality')
-                duration = item.select_one('.pQualityItem__duration')
-                price = item.select_one('.pQualityItemPrice__value')
-                currency = item.select_one('.pQualityItemPrice__currency')
+                quality = sel['quality'].select_one(item)
+                duration = sel['item_duration'].select_one(item)
+                price = sel['price'].select_one(item)
+                currency = sel['currency'].select_one(item)
                 access_options_megogo_obj.append({
                     'type': access_type,
                     'quality': quality.get_text(strip=True) if quality else None,
@@ -312,6 +588,47 @@ def parse_film_page_megogo(url):
         "country": country
     }
 
+def extract_sweettv_film_fields(fields):
+    """Перетворює результат SWEETTV_FILM_JS у поля film_data (ключі лише для знайдених елементів)."""
+    film_data = {}
+    if fields.get("name") is not None:
+        film_data["name"] = fields["name"]
+        film_data["normalized_name"] = normalize_title(fields["name"])
+        print(f"    > Знайдено Name: {film_data['name']}")
+    else:
+        print("    [!] Назву не знайдено.")
+    if fields.get("description") is not None:
+        film_data["description"] = fields["description"]
+        print(f"    > Знайдено Description: {fields['description'][:50]}...")
+    else:
+        print("    [!] Опис не знайдено.")
+    if fields.get("imdb_rating") is not None:
+        film_data["imdb_rating"] = fields["imdb_rating"]
+        print(f"    > Знайдено IMDb Rating: {fields['imdb_rating']}")
+    else:
+        print("    [!] Рейтинг IMDb не знайдено.")
+    film_data["country"] = ', '.join(fields.get("countries") or [])
+    print(f"    > Знайдено Country: {film_data['country']}")
+    film_data["geners"] = ', '.join(fields.get("genres") or [])
+    print(f"    > Знайдено Genres: {film_data['geners']}")
+    if fields.get("age_limit") is not None:
+        film_data["age_limit"] = fields["age_limit"]
+        print(f"    > Знайдено Age Limit: {fields['age_limit']}")
+    else:
+        print("    [!] Вікове обмеження не знайдено.")
+    if fields.get("duration") is not None and fields.get("duration_unit") is not None:
+        film_data["duration"] = f"{fields['duration']} {fields['duration_unit']}"
+        print(f"    > Знайдено Duration: {film_data['duration']}")
+    else:
+        print("    [!] Тривалість не знайдено.")
+    if fields.get("release_year") is not None:
+        film_data["release_year"] = fields["release_year"]
+        print(f"    > Знайдено Release Year: {fields['release_year']}")
+    else:
+        print("    [!] Рік випуску не знайдено.")
+    return film_data
+
+@metrics.timed("sweettv_page", outcome=_parsed, mode="browser")
 def parse_film_page_sweettv(driver, parse_full_data):
     try:
         WebDriverWait(driver, 15).until(
@@ -320,6 +637,7 @@ def parse_film_page_sweettv(driver, parse_full_data):
         print("    > [Sweet.tv] Сторінка динамічно завантажена.")
     except TimeoutException:
         print("    > [Sweet.tv] Не вдалося дочекатися завантаження заголовку. Парсинг неможливий.")
+        metrics.set_outcome("timeout")
         return None
     except Exception as e:
         print(f"    > [Sweet.tv] Помилка під час очікування: {e}")
@@ -336,244 +654,384 @@ def parse_film_page_sweettv(driver, parse_full_data):
     }
 
     if parse_full_data:
-        print("    > Megogo не знайдено. Парсинг всіх даних з Sweet.tv...")
+        print("    > [Sweet.tv] Парсинг всіх даних фільму...")
         try:
-            try:
-                film_data["name"] = driver.find_element(By.CSS_SELECTOR, "h1.movie__title").text.strip()
-                film_data["normalized_name"] = normalize_title(film_data["name"])
-                print(f"    > Знайдено Name: {film_data['name']}")
-            except NoSuchElementException:
-                print("    [!] Назву не знайдено.")
-            try:
-                description = driver.find_element(By.CSS_SELECTOR, "p#film_description").text.strip()
-                film_data["description"] = description
-                print(f"    > Знайдено Description: {description[:50]}...")
-            except NoSuchElementException:
-                print("    [!] Опис не знайдено.")
-            try:
-                imdb_rating = driver.find_element(By.CSS_SELECTOR, "span[data-movie-el='16']").text.strip()
-                film_data["imdb_rating"] = imdb_rating
-                print(f"    > Знайдено IMDb Rating: {imdb_rating}")
-            except NoSuchElementException:
-                print("    [!] Рейтинг IMDb не знайдено.")
-            try:
-                country_tags = driver.find_elements(By.CSS_SELECTOR, "p.desc-film-countries a")
-                countries = [tag.text.strip() for tag in country_tags]
-                film_data["country"] = ', '.join(countries)
-                print(f"    > Знайдено Country: {film_data['country']}")
-            except NoSuchElementException:
-                print("    [!] Країну не знайдено.")
-            try:
-                genre_tags = driver.find_elements(By.CSS_SELECTOR, "p.desc-film-page-genre")
-                genres = [tag.text.strip() for tag in genre_tags]
-                film_data["geners"] = ', '.join(genres)
-                print(f"    > Знайдено Genres: {film_data['geners']}")
-            except NoSuchElementException:
-                print("    [!] Жанри не знайдено.")
-            try:
-                age_limit = driver.find_element(By.CSS_SELECTOR, "span[data-movie-el='25']").text.strip()
-                film_data["age_limit"] = age_limit
-                print(f"    > Знайдено Age Limit: {age_limit}")
-            except NoSuchElementException:
-                print("    [!] Вікове обмеження не знайдено.")
-            try:
-                duration = driver.find_element(By.CSS_SELECTOR, "span#timeCount").text.strip()
-                duration_unit = driver.find_element(By.CSS_SELECTOR, "span#timeLabel").text.strip()
-                film_data["duration"] = f"{duration} {duration_unit}"
-                print(f"    > Знайдено Duration: {film_data['duration']}")
-            except NoSuchElementException:
-                print("    [!] Тривалість не знайдено.")
-            try:
-                release_year = driver.find_element(By.CSS_SELECTOR, "span[data-movie-el='14']").text.strip()
-                film_data["release_year"] = release_year
-                print(f"    > Знайдено Release Year: {release_year}")
-            except NoSuchElementException:
-                print("    [!] Рік випуску не знайдено.")
-
+            film_data.update(extract_sweettv_film_fields(driver.execute_script(SWEETTV_FILM_JS)))
         except Exception as e:
             print(f"    [!] Загальна помилка парсингу повних даних з Sweet.tv: {e}")
 
     return film_data
 
 
-def search_megogo(film_name_to_search):
+def lookup_resolution(resolution_cache, platform, query, need_poster=False):
+    """Перевіряє кеш пошуку (ResolutionCache) перед запитом до платформи. Повертає (hit, match)."""
+    if resolution_cache is None:
+        return False, None
+    try:
+        hit, match = resolution_cache.get(platform, query)
+    except sqlite3.Error as e:
+        # Недоступний кеш — це промах, а не помилка пошуку
+        print(f"    [!] [{platform}] Кеш пошуку недоступний: {e}")
+        metrics.count("resolution_cache", platform=platform, result="error")
+        return False, None
+    if hit and match and need_poster and not match.get('poster_url'):
+        hit, match = False, None
+    metrics.count("resolution_cache", platform=platform, result="hit" if hit else "miss")
+    if hit:
+        print(f"    > [{platform}] Результат пошуку з кешу: {match['url'] if match else 'збігів немає'}")
+        metrics.set_outcome("cached")
+    return hit, match
+
+def remember_resolution(resolution_cache, platform, query, match):
+    if resolution_cache is None:
+        return
+    try:
+        resolution_cache.put(platform, query, match)
+    except sqlite3.Error as e:
+        print(f"    [!] [{platform}] Не вдалося зберегти результат пошуку в кеш: {e}")
+
+def forget_resolution(resolution_cache, platform, query):
+    """Сторінка за збереженим URL могла зникнути — наступного разу шукаємо заново."""
+    if resolution_cache is None:
+        return
     try:
-        search_query = urllib.parse.quote(film_name_to_search)
-        search_url = f"https://megogo.net/ua/search-extended?q={search_query}"
+        resolution_cache.invalidate(platform, query)
+    except sqlite3.Error as e:
+        print(f"    [!] [{platform}] Не вдалося скинути результат пошуку в кеші: {e}")
+
+def megogo_search_url(film_name_to_search):
+    search_query = urllib.parse.quote(film_name_to_search)
+    return megogo_url(f"/ua/search-extended?q={search_query}")
+
+@metrics.timed("megogo_search", outcome=metrics.found)
+def search_megogo(film_name_to_search, resolution_cache=None):
+    try:
+        hit, cached = lookup_resolution(resolution_cache, 'Megogo', film_name_to_search)
+        if hit:
+            return cached
+        search_url = megogo_search_url(film_name_to_search)
         print(f"    > [Megogo] Пошуковий URL: {search_url}")
         
-        r = requests.get(search_url, timeout=10)
+        r = http_get(search_url)
         r.raise_for_status()
-        soup = bs(r.text, "html.parser")
+        match = match_megogo_search_results(r.text, film_name_to_search)
+        remember_resolution(resolution_cache, 'Megogo', film_name_to_search, match)
+        return match
+
+    except Exception as e:
+        print(f"    > [Megogo]  Помилка пошуку: {e}")
+        metrics.set_outcome("error")
+        return None
+
+def match_megogo_search_results(html, film_name_to_search):
+    return match_megogo_cards(bs(html, "lxml", parse_only=MEGOGO_CARD_STRAINER), film_name_to_search)
+
+def match_megogo_cards(soup, film_name_to_search):
+    sel = MEGOGO_SELECTORS
+    cards = soup.find_all('div', class_='card')[:7] 
     
-        cards = soup.find_all('div', class_='card')[:7] 
-        
-        if not cards:
-            print("    > [Megogo] На сторінці пошуку нічого не знайдено.")
-            return None
+    if not cards:
+        print("    > [Megogo] На сторінці пошуку нічого не знайдено.")
+        return None
+    
+    candidates = []
+    for card in cards:
+        site_title, film_url, poster_url = None, None, None
         
-        for card in cards:
-            site_title, film_url, poster_url = None, None, None
-            
-            img_tag = card.select_one('div.thumb img[data-original]')
-            if img_tag:
-                poster_url = img_tag.get('data-original')
+        img_tag = sel['card_poster'].select_one(card)
+        if img_tag:
+            poster_url = img_tag.get('data-original')
 
-            link_tag = card.select_one('a.card-content-title')
+        link_tag = sel['card_link'].select_one(card)
+        if link_tag:
+            title_tag = sel['card_title'].select_one(link_tag)
+            if title_tag:
+                site_title = title_tag.get_text(strip=True)
+                film_url = link_tag.get('href')
+        
+        if not site_title:
+            link_tag = sel['card_thumb_link'].select_one(card) 
             if link_tag:
-                title_tag = link_tag.select_one('h3.card-title')
-                if title_tag:
-                    site_title = title_tag.get_text(strip=True)
-                    film_url = link_tag.get('href')
-            
-            if not site_title:
-                link_tag = card.select_one('div.thumb a') 
-                if link_tag:
-                    site_title = link_tag.get('title')
-                    if not site_title:
-                        img_tag_alt = link_tag.find('img')
-                        if img_tag_alt: site_title = img_tag_alt.get('alt')
-                    film_url = link_tag.get('href')
-            
-            if not site_title or not film_url:
-                continue
-            
-            sim_score = similarity(film_name_to_search, site_title)
-            print(f"    > [Megogo] Знайдено: '{site_title}' | Схожість: {sim_score:.2f}")
-
-            if sim_score > 0.85:
-                if film_url.startswith('/'):
-                    film_url = "https://megogo.net" + film_url
-                print(f"    > [Megogo]  Збіг знайдено: {film_url}")
-                return {"url": film_url, "title": site_title, "poster_url": poster_url}
+                site_title = link_tag.get('title')
+                if not site_title:
+                    img_tag_alt = link_tag.find('img')
+                    if img_tag_alt: site_title = img_tag_alt.get('alt')
+                film_url = link_tag.get('href')
         
-        print("    > [Megogo] Не знайдено збігів з високою схожістю.")
-        return None
+        if not site_title or not film_url:
+            continue
+        candidates.append({"url": film_url, "title": site_title, "poster_url": poster_url})
 
-    except Exception as e:
-        print(f"    > [Megogo]  Помилка пошуку: {e}")
+    best, scores = best_title_match(film_name_to_search, [c["title"] for c in candidates])
+    for candidate, sim_score in zip(candidates, scores):
+        print(f"    > [Megogo] Знайдено: '{candidate['title']}' | Схожість: {sim_score:.2f}")
+
+    if best is not None:
+        match = candidates[best]
+        if match["url"].startswith('/'):
+            match["url"] = megogo_url(match["url"])
+        print(f"    > [Megogo]  Збіг знайдено: {match['url']}")
+        return match
+    
+    print("    > [Megogo] Не знайдено збігів з високою схожістю.")
+    return None
+
+SWEETTV_CARDS_JS = """
+return Array.from(document.querySelectorAll('div.swiper-slide a.swiper-slide-wrap')).slice(0, 5).map(a => {
+    const title = a.getElementsByClassName('movie-card__title')[0];
+    const img = a.getElementsByTagName('img')[0];
+    return {
+        href: a.href || null,
+        title: title ? (title.innerText || '').trim() : null,
+        src: img ? img.src : null,
+        data_src: img ? img.getAttribute('data-src') : null
+    };
+});
+"""
+SWEETTV_TITLE_JS = "const el = document.querySelector('h1.movie__title'); return el ? (el.innerText || '').trim() : null;"
+SWEETTV_TAB_POLL_INTERVAL = 0.2
+
+def resolve_titles_in_tabs(driver, hrefs, is_match, timeout=10):
+    """
+    Відкриває всі сторінки одразу в окремих вкладках (вони вантажаться паралельно) і по черзі
+    опитує їх заголовки. Повертає (href, title) першої сторінки, для якої is_match(title) істинне, або None.
+    """
+    original_window = driver.current_window_handle
+    tabs = {}
+    try:
+        for href in hrefs:
+            known = set(driver.window_handles)
+            driver.execute_script("window.open(arguments[0]);", href)
+            for handle in driver.window_handles:
+                if handle not in known:
+                    tabs[handle] = href
+
+        deadline = time.monotonic() + timeout
+        pending = list(tabs)
+        while pending and time.monotonic() < deadline:
+            for handle in list(pending):
+                driver.switch_to.window(handle)
+                title = driver.execute_script(SWEETTV_TITLE_JS)
+                if not title:
+                    continue
+                pending.remove(handle)
+                if is_match(title):
+                    return tabs[handle], title
+            if pending:
+                time.sleep(SWEETTV_TAB_POLL_INTERVAL)
+        if pending:
+            print(f"    > [Sweet.tv] Не дочекалися назви для {len(pending)} сторінок.")
         return None
+    finally:
+        for handle in tabs:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception:
+                pass
+        driver.switch_to.window(original_window)
 
-def search_sweettv(driver, film_name_to_search, get_poster=False):
+@metrics.timed("sweettv_search", outcome=metrics.found, mode="browser")
+def search_sweettv(driver, film_name_to_search, get_poster=False, resolution_cache=None):
     try:
-        search_url = f"https://sweet.tv/search?q={urllib.parse.quote(film_name_to_search)}"
+        hit, cached = lookup_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, need_poster=get_poster)
+        if hit:
+            return cached
+        search_url = sweettv_url(f"/search?q={urllib.parse.quote(film_name_to_search)}")
         print(f"    > [Sweet.tv] Пошуковий URL: {search_url}")
         driver.get(search_url)
 
-        results = WebDriverWait(driver, 10).until(
+        WebDriverWait(driver, 10).until(
             EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.swiper-slide a.swiper-slide-wrap"))
         )
-        
-        for result in results[:5]: 
-            href = result.get_attribute("href")
-            if not href: continue
-            
-            site_title = None
-            poster_url = None 
-
-            try:
-                site_title = result.find_element(By.CLASS_NAME, "movie-card__title").text.strip()
-            except NoSuchElementException:
-                pass 
+        cards = [card for card in driver.execute_script(SWEETTV_CARDS_JS) if card['href']]
 
+        posters = {}
+        for card in cards:
+            poster_url = None
             if get_poster:
-                try:
-                    img_tag = result.find_element(By.TAG_NAME, "img")
-                    poster_url = img_tag.get_attribute("src")
-                    if 'data:image' in poster_url: 
-                        poster_url = img_tag.get_attribute("data-src") or poster_url
+                poster_url = card['src']
+                if poster_url and 'data:image' in poster_url:
+                    poster_url = card['data_src'] or poster_url
+                if poster_url:
                     print("    > [Sweet.tv] Знайдено запасний постер.")
-                except NoSuchElementException:
+                else:
                     print("    > [Sweet.tv] Не знайдено <img> на картці.")
-            
-            if not site_title:
-                try:
-                    original_window = driver.current_window_handle
-                    driver.execute_script("window.open(arguments[0]);", href)
-                    driver.switch_to.window(driver.window_handles[1])
-                    
-                    movie_title_element = WebDriverWait(driver, 10).until(
-                        lambda d: (el := d.find_element(By.CSS_SELECTOR, "h1.movie__title")) and el.text.strip() != "" and el or None
-                    )
-                    site_title = movie_title_element.text.strip()
-                    
-                    driver.close()
-                    driver.switch_to.window(original_window)
-                    
-                except Exception as e:
-                    print(f"    > [Sweet.tv] Помилка при отриманні назви з суб-сторінки: {e}")
-                    if len(driver.window_handles) > 1:
-                        driver.close()
-                        driver.switch_to.window(original_window)
-                    continue
-            
+            posters[card['href']] = poster_url
+
+        def is_match(site_title):
             sim_score = similarity(film_name_to_search, site_title)
             print(f"    > [Sweet.tv] Знайдено: '{site_title}' | Схожість: {sim_score:.2f}")
-            
-            if sim_score > 0.85:
+            return sim_score > TITLE_MATCH_THRESHOLD
+
+        titled = [card for card in cards if card['title']]
+        best, scores = best_title_match(film_name_to_search, [card['title'] for card in titled])
+        for card, sim_score in zip(titled, scores):
+            print(f"    > [Sweet.tv] Знайдено: '{card['title']}' | Схожість: {sim_score:.2f}")
+        if best is not None:
+            card = titled[best]
+            print(f"    > [Sweet.tv] Збіг знайдено: {card['href']}")
+            match = {"url": card['href'], "title": card['title'], "poster_url": posters[card['href']]}
+            remember_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, match)
+            return match
+
+        untitled = [card['href'] for card in cards if not card['title']]
+        if untitled:
+            matched = resolve_titles_in_tabs(driver, untitled, is_match)
+            if matched:
+                href, site_title = matched
                 print(f"    > [Sweet.tv] Збіг знайдено: {href}")
-                return {"url": href, "title": site_title, "poster_url": poster_url} 
+                match = {"url": href, "title": site_title, "poster_url": posters[href]}
+                remember_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, match)
+                return match
         
         print("    > [Sweet.tv]  Не знайдено збігів з високою схожістю.")
+        remember_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, None)
         return None
 
     except TimeoutException:
         print(f"    > [Sweet.tv]  Нічого не знайдено для '{film_name_to_search}'")
+        metrics.set_outcome("timeout")
         return None
     except Exception as e:
         print(f"    > [Sweet.tv] Помилка пошуку: {e}")
+        metrics.set_outcome("error")
         return None
 
-def save_and_normalize_data(cursor, film_id, megogo_data, sweettv_data, genre_cache, platform_cache, megogo_poster_url_fallback=None, sweettv_poster_url_fallback=None):
-    try:
-        full_data = megogo_data if megogo_data else sweettv_data
-        
-        poster_to_save = None
-        if full_data: poster_to_save = full_data.get('poster_url')
-        if not poster_to_save and megogo_poster_url_fallback: poster_to_save = megogo_poster_url_fallback
-        if not poster_to_save and sweettv_poster_url_fallback: poster_to_save = sweettv_poster_url_fallback
-
-        if full_data:
-            cursor.execute("""
-                UPDATE films 
-                SET url = %s, poster_url = %s, age_limit = %s, imdb_rating = %s,
-                    description = %s, duration = %s, 
-                    release_year = %s, country = %s
-                WHERE id = %s
-            """, (
-                full_data.get('url'), poster_to_save, full_data.get('age_limit'),
-                full_data.get('imdb_rating'), full_data.get('description'),
-                full_data.get('duration'), full_data.get('release_year'), 
-                full_data.get('country'), film_id 
-            ))
-            
-            cursor.execute("DELETE FROM film_genre WHERE film_id = %s", (film_id,))
-            if full_data.get('geners'):
-                genre_names = full_data['geners'].split(',')
-                film_genre_rows = []
-                for name in genre_names:
-                    genre_id = get_or_create_genre(cursor, genre_cache, name)
-                    if genre_id: film_genre_rows.append((film_id, genre_id))
-                if film_genre_rows:
-                    cursor.executemany("INSERT INTO film_genre (film_id, genre_id) VALUES (%s, %s)", film_genre_rows)
-        
-        platform_id_megogo = platform_cache['Megogo']
-        cursor.execute("DELETE FROM film_platform WHERE film_id = %s AND platform_id = %s", (film_id, platform_id_megogo))
-        if megogo_data and megogo_data.get('access_options_megogo'):
-            megogo_rows = parse_megogo_options(film_id, platform_id_megogo, megogo_data['access_options_megogo'])
-            if megogo_rows:
-                cursor.executemany("INSERT INTO film_platform (film_id, platform_id, access_type, price) VALUES (%s, %s, %s, %s)", megogo_rows)
-        
-        platform_id_sweettv = platform_cache['Sweet.tv']
-        cursor.execute("DELETE FROM film_platform WHERE film_id = %s AND platform_id = %s", (film_id, platform_id_sweettv))
-        if sweettv_data and sweettv_data.get('access_options_PK'):
-            cursor.execute("UPDATE films SET url_sweet_tv = %s WHERE id = %s", (sweettv_data.get('url_sweet_tv'), film_id))
-            sweettv_rows = parse_sweettv_options(film_id, platform_id_sweettv, sweettv_data['access_options_PK'])
-            if sweettv_rows:
-                cursor.executemany("INSERT INTO film_platform (film_id, platform_id, access_type, price) VALUES (%s, %s, %s, %s)", sweettv_rows)
-        
-        print(f"     Дані для ID {film_id} успішно оновлено.")
-        
-    except Exception as e:
-        print(f"    [!] Помилка save_and_normalize_data: {e}")
-        raise
+FILM_FIELDS = ('url', 'poster_url', 'age_limit', 'imdb_rating', 'description', 'duration', 'release_year', 'country')
+
+def _price_key(price):
+    return None if price is None else round(float(price), 2)
+
+def diff_platform_rows(current_rows, new_rows):
+    """
+    Мінімальний набір змін film_platform для одного фільму й платформи.
+    Рядки — (access_type, price); рядок визначається повністю, тож кілька пропозицій
+    одного типу доступу з різними цінами — різні рядки. Повертає (inserts, updates, deletes),
+    де updates — (access_type, old_price, new_price) для того самого типу доступу.
+    Однакові рядки в current_rows рахуються один раз: видалення за повним рядком прибирає всі копії.
+    """
+    remaining = {}
+    for access_type, price in {(a, _price_key(p)): (a, p) for a, p in current_rows}.values():
+        remaining.setdefault(access_type, []).append(price)
+    added = []
+    for access_type, price in new_rows:
+        prices = remaining.get(access_type, [])
+        same = next((i for i, old in enumerate(prices) if _price_key(old) == _price_key(price)), None)
+        if same is None:
+            added.append((access_type, price))
+        else:
+            prices.pop(same)
+
+    inserts, updates = [], []
+    for access_type, price in added:
+        prices = remaining.get(access_type)
+        if prices:
+            updates.append((access_type, prices.pop(0), price))
+        else:
+            inserts.append((access_type, price))
+    deletes = [(access_type, price) for access_type, prices in remaining.items() for price in prices]
+    return inserts, updates, deletes
+
+def diff_genre_ids(current_ids, new_ids):
+    """Повертає (додати, прибрати) для film_genre одного фільму."""
+    current_ids = set(current_ids)
+    wanted = list(dict.fromkeys(new_ids))
+    return [g for g in wanted if g not in current_ids], [g for g in current_ids if g not in wanted]
+
+def empty_change_summary(film_id):
+    return {"film_id": film_id, "genres_added": [], "genres_removed": [], "platforms": {}, "prices_changed": False}
+
+def add_platform_diff(summary, platform_id, inserts, updates, deletes):
+    if inserts or updates or deletes:
+        summary["platforms"][platform_id] = {"inserted": inserts, "updated": updates, "deleted": deletes}
+        summary["prices_changed"] = True
+
+def is_changed(summary):
+    return bool(summary["genres_added"] or summary["genres_removed"] or summary["platforms"])
+
+def platform_diff_params(film_id, platform_id, inserts, updates, deletes):
+    """
+    Параметри execute_platform_diff для змін одного фільму й платформи:
+    (повні рядки для вставки, повні рядки для видалення). Унікального ключа на тип доступу
+    немає, тож зміна ціни — це видалення старого рядка й вставка нового.
+    """
+    insert_rows = [(film_id, platform_id, access_type, price) for access_type, price in inserts]
+    insert_rows.extend((film_id, platform_id, access_type, new) for access_type, old, new in updates)
+    delete_rows = [(film_id, platform_id, access_type, price) for access_type, price in deletes]
+    delete_rows.extend((film_id, platform_id, access_type, old) for access_type, old, new in updates)
+    return insert_rows, delete_rows
+
+def _row_values_sql(columns, rows):
+    """(col, ...) IN ((%s, ...), ...) та параметри до нього — набір рядків одним порівнянням."""
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(rows))
+    return f"({', '.join(columns)}) IN ({placeholders})", [value for row in rows for value in row]
+
+def execute_platform_diff(cursor, insert_rows, delete_rows):
+    """
+    Застосовує зміни film_platform двома запитами на весь набір: DELETE за повними рядками
+    (ціна порівнюється округленою до копійок, рядки без ціни — через IS NULL) та
+    багаторядковий INSERT (pymysql збирає executemany з INSERT ... VALUES в один запит).
+    """
+    if delete_rows:
+        priced = [(f, p, a, _price_key(price)) for f, p, a, price in delete_rows if price is not None]
+        unpriced = [(f, p, a) for f, p, a, price in delete_rows if price is None]
+        conditions, params = [], []
+        if priced:
+            sql, values = _row_values_sql(("film_id", "platform_id", "access_type", "ROUND(price, 2)"), priced)
+            conditions.append(sql); params.extend(values)
+        if unpriced:
+            sql, values = _row_values_sql(("film_id", "platform_id", "access_type"), unpriced)
+            conditions.append(f"(price IS NULL AND {sql})"); params.extend(values)
+        cursor.execute(f"DELETE FROM film_platform WHERE {' OR '.join(conditions)}", params)
+    if insert_rows:
+        cursor.executemany(
+            "INSERT INTO film_platform (film_id, platform_id, access_type, price) VALUES (%s, %s, %s, %s)",
+            insert_rows
+        )
+
+def delete_film_genres(cursor, rows):
+    """Прибирає пари (film_id, genre_id) одним DELETE."""
+    if rows:
+        sql, params = _row_values_sql(("film_id", "genre_id"), rows)
+        cursor.execute(f"DELETE FROM film_genre WHERE {sql}", params)
+
+@metrics.timed("db_write", mode="film")
+def apply_film_changes(cursor, changes, genre_cache):
+    """Записує зміни одного фільму, чіпаючи лише ті рядки, що справді змінились. Повертає підсумок змін."""
+    film_id = changes["film_id"]
+    summary = empty_change_summary(film_id)
+    film_fields = changes["film_fields"]
+    if film_fields is not None:
+        cursor.execute("""
+            UPDATE films 
+            SET url = %s, poster_url = %s, age_limit = %s, imdb_rating = %s,
+                description = %s, duration = %s, 
+                release_year = %s, country = %s
+            WHERE id = %s
+        """, tuple(film_fields[field] for field in FILM_FIELDS) + (film_id,))
+
+    if changes["genres"] is not None:
+        new_ids = resolve_genres(cursor, genre_cache, changes["genres"])
+        cursor.execute("SELECT genre_id FROM film_genre WHERE film_id = %s", (film_id,))
+        added, removed = diff_genre_ids([row['genre_id'] for row in cursor.fetchall()], new_ids)
+        delete_film_genres(cursor, [(film_id, g) for g in removed])
+        if added:
+            cursor.executemany("INSERT INTO film_genre (film_id, genre_id) VALUES (%s, %s)", [(film_id, g) for g in added])
+        summary["genres_added"], summary["genres_removed"] = added, removed
+
+    for platform_id, rows in changes["platform_rows"].items():
+        cursor.execute("SELECT access_type, price FROM film_platform WHERE film_id = %s AND platform_id = %s", (film_id, platform_id))
+        current = [(row['access_type'], row['price']) for row in cursor.fetchall()]
+        diff = diff_platform_rows(current, [(access_type, price) for _, _, access_type, price in rows])
+        execute_platform_diff(cursor, *platform_diff_params(film_id, platform_id, *diff))
+        add_platform_diff(summary, platform_id, *diff)
+
+    for column, url in changes["film_urls"].items():
+        cursor.execute(f"UPDATE films SET {column} = %s WHERE id = %s", (url, film_id))
+
+    if summary["prices_changed"]:
+        cursor.execute("UPDATE films SET last_refreshed_at = NOW(), last_price_change_at = NOW() WHERE id = %s", (film_id,))
+    else:
+        cursor.execute("UPDATE films SET last_refreshed_at = NOW() WHERE id = %s", (film_id,))
+    return summary
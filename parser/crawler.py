@@ -0,0 +1,94 @@
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future
+from core import HTTP_POOL_SIZE, get_http_session, get_http_stats
+from platforms import empty_result, get_platforms
+
+# Скільки фільмів може одночасно перебувати "в польоті" до запису в БД
+MAX_PENDING = 32
+
+
+class CrawlEngine:
+    """
+    Паралельний обхід фільмів: кожна зареєстрована платформа (platforms.PLATFORMS) працює
+    у власному пулі, і для одного фільму всі платформи опитуються одночасно, тож фільм
+    чекає на найповільнішу платформу, а не на суму їхніх затримок. Результати віддаються
+    у порядку вхідного списку, щоб запис у БД лишався послідовним.
+    З megogo_async=True Megogo-запити йдуть через один asyncio-клієнт
+    замість пулу потоків, а megogo_workers задає ліміт запитів "у польоті".
+    Sweet.tv спершу пробується звичайним HTTP, браузер із пулу — лише за потреби.
+    З page_cache незмінені з минулого запису сторінки Megogo не розбираються повторно.
+    platforms обмежує набір платформ, platform_options — додаткові параметри адаптерів за назвою.
+    Кількість потоків і мінімальний інтервал між запитами (None) беруться з класу адаптера.
+    """
+
+    def __init__(self, cookies, megogo_workers=None, sweettv_workers=None,
+                 megogo_min_interval=None, sweettv_min_interval=None,
+                 max_pending=MAX_PENDING, megogo_async=False, sweettv_http_first=True, page_cache=None,
+                 resolution_cache=None, driver_factory=None, platforms=None, platform_options=None):
+        self.max_pending = max_pending
+        options = {
+            'Megogo': {"workers": megogo_workers, "min_interval": megogo_min_interval, "use_async": megogo_async},
+            'Sweet.tv': {"workers": sweettv_workers, "min_interval": sweettv_min_interval,
+                         "http_first": sweettv_http_first, "driver_factory": driver_factory},
+        }
+        for name, extra in (platform_options or {}).items():
+            options.setdefault(name, {}).update(extra)
+        self.adapters = []
+        try:
+            for adapter_cls in get_platforms(platforms):
+                self.adapters.append(adapter_cls(cookies, page_cache=page_cache, resolution_cache=resolution_cache,
+                                                 **options.get(adapter_cls.name, {})))
+        except Exception:
+            self.close()
+            raise
+        # Спільна HTTP-сесія створюється один раз на процес, з пулом не меншим за найбільший пул потоків платформи
+        get_http_session(pool_size=max([HTTP_POOL_SIZE] + [adapter.workers for adapter in self.adapters]))
+
+    def _submit(self, film):
+        result = Future()
+        film_result = empty_result(film)
+        pending = set(self.adapters)
+        lock = threading.Lock()
+
+        def on_platform_done(adapter, future):
+            try:
+                data, poster_url = future.result()
+            except Exception as e:
+                print(f"    [!] Помилка {adapter.name} для '{film['name']}': {e}")
+                data, poster_url = None, None
+            with lock:
+                film_result[adapter.data_key], film_result[adapter.poster_key] = data, poster_url
+                pending.discard(adapter)
+                done = not pending
+            if done:
+                result.set_result(film_result)
+
+        if not self.adapters:
+            result.set_result(film_result)
+        for adapter in self.adapters:
+            adapter.submit(film['name']).add_done_callback(functools.partial(on_platform_done, adapter))
+        return result
+
+    def crawl(self, films):
+        """Генерує результати для кожного фільму в тому ж порядку, в якому їх передано."""
+        pending = deque()
+        for film in films:
+            pending.append(self._submit(film))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def http_stats(self):
+        """Сумарні лічильники HTTP: спільна сесія core плюс власні клієнти адаптерів (asyncio Megogo)."""
+        stats = get_http_stats()
+        for adapter in self.adapters:
+            for key, value in (adapter.http_stats() or {}).items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    def close(self):
+        for adapter in self.adapters:
+            adapter.close()
@@ -0,0 +1,184 @@
+import metrics
+from core import (
+    FILM_FIELDS, apply_film_changes, resolve_genres,
+    diff_genre_ids, diff_platform_rows, platform_diff_params, execute_platform_diff, delete_film_genres,
+    empty_change_summary, add_platform_diff, is_changed
+)
+from platforms import build_film_changes
+from search_index import affects_search, refresh_search_index
+
+# Скільки фільмів збирається перед записом однією транзакцією
+FILM_BATCH_SIZE = 50
+
+
+def _rows_table(columns, rows):
+    """Похідна таблиця з рядків параметрів: SELECT ... UNION ALL SELECT ... для JOIN в UPDATE."""
+    first = "SELECT " + ", ".join(f"%s AS {column}" for column in columns)
+    rest = "SELECT " + ", ".join(["%s"] * len(columns))
+    sql = " UNION ALL ".join([first] + [rest] * (len(rows) - 1))
+    params = [value for row in rows for value in row]
+    return sql, params
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+@metrics.timed("db_write", mode="batch")
+def apply_film_changes_batch(cursor, batch, genre_cache):
+    """
+    Записує зміни кількох фільмів (результати build_film_changes) кількома
+    set-based запитами на таблицю: поточні жанри й ціни читаються одним SELECT,
+    а пишуться лише відмінності. Транзакцією керує викликач. Повертає підсумки змін.
+    """
+    film_rows = [
+        (changes["film_id"],) + tuple(changes["film_fields"][field] for field in FILM_FIELDS)
+        for changes in batch if changes["film_fields"] is not None
+    ]
+    if film_rows:
+        values_sql, params = _rows_table(('id',) + FILM_FIELDS, film_rows)
+        assignments = ", ".join(f"f.{field} = v.{field}" for field in FILM_FIELDS)
+        cursor.execute(f"UPDATE films f JOIN ({values_sql}) v ON f.id = v.id SET {assignments}", params)
+
+    summaries = {changes["film_id"]: empty_change_summary(changes["film_id"]) for changes in batch}
+
+    genre_batch = [changes for changes in batch if changes["genres"] is not None]
+    if genre_batch:
+        resolve_genres(cursor, genre_cache, [name for changes in genre_batch for name in changes["genres"]])
+        film_ids = [changes["film_id"] for changes in genre_batch]
+        cursor.execute(f"SELECT film_id, genre_id FROM film_genre WHERE film_id IN ({_in_list(film_ids)})", film_ids)
+        current = {}
+        for row in cursor.fetchall():
+            current.setdefault(row['film_id'], []).append(row['genre_id'])
+        insert_rows, delete_rows = [], []
+        for changes in genre_batch:
+            film_id = changes["film_id"]
+            new_ids = resolve_genres(cursor, genre_cache, changes["genres"])
+            added, removed = diff_genre_ids(current.get(film_id, []), new_ids)
+            insert_rows.extend((film_id, g) for g in added)
+            delete_rows.extend((film_id, g) for g in removed)
+            summaries[film_id]["genres_added"], summaries[film_id]["genres_removed"] = added, removed
+        delete_film_genres(cursor, delete_rows)
+        if insert_rows:
+            cursor.executemany("INSERT INTO film_genre (film_id, genre_id) VALUES (%s, %s)", insert_rows)
+
+    platform_batch = [changes for changes in batch if changes["platform_rows"]]
+    if platform_batch:
+        film_ids = [changes["film_id"] for changes in platform_batch]
+        cursor.execute(
+            f"SELECT film_id, platform_id, access_type, price FROM film_platform WHERE film_id IN ({_in_list(film_ids)})",
+            film_ids
+        )
+        current = {}
+        for row in cursor.fetchall():
+            current.setdefault((row['film_id'], row['platform_id']), []).append((row['access_type'], row['price']))
+        insert_rows, delete_rows = [], []
+        for changes in platform_batch:
+            film_id = changes["film_id"]
+            for platform_id, rows in changes["platform_rows"].items():
+                diff = diff_platform_rows(
+                    current.get((film_id, platform_id), []),
+                    [(access_type, price) for _, _, access_type, price in rows]
+                )
+                inserts, deletes = platform_diff_params(film_id, platform_id, *diff)
+                insert_rows.extend(inserts); delete_rows.extend(deletes)
+                add_platform_diff(summaries[film_id], platform_id, *diff)
+        execute_platform_diff(cursor, insert_rows, delete_rows)
+
+    url_columns = dict.fromkeys(column for changes in batch for column in changes["film_urls"])
+    for column in url_columns:
+        url_rows = [(changes["film_id"], changes["film_urls"][column]) for changes in batch if column in changes["film_urls"]]
+        values_sql, params = _rows_table(('id', column), url_rows)
+        cursor.execute(f"UPDATE films f JOIN ({values_sql}) v ON f.id = v.id SET f.{column} = v.{column}", params)
+
+    film_ids = [changes["film_id"] for changes in batch]
+    cursor.execute(f"UPDATE films SET last_refreshed_at = NOW() WHERE id IN ({_in_list(film_ids)})", film_ids)
+    repriced = [film_id for film_id in film_ids if summaries[film_id]["prices_changed"]]
+    if repriced:
+        cursor.execute(f"UPDATE films SET last_price_change_at = NOW() WHERE id IN ({_in_list(repriced)})", repriced)
+    refresh_search_index(cursor, [changes["film_id"] for changes in batch if affects_search(changes, summaries[changes["film_id"]])])
+    return [summaries[changes["film_id"]] for changes in batch]
+
+
+class FilmBatchWriter:
+    """
+    Буферизований запис результатів парсингу: add() збирає зміни, а кожні batch_size
+    фільмів вони пишуться однією транзакцією. Якщо пакет падає, він відкочується
+    і записується по одному фільму, щоб один зламаний фільм не тягнув за собою інші.
+    on_commit викликається лише після того, як зміни фільму зафіксовано в БД, on_error(помилка) —
+    якщо фільм не записався і поодинці, on_flush — після кожного пакета з кількістю записаних фільмів.
+    """
+
+    def __init__(self, conn, cursor, genre_cache, platform_cache, batch_size=FILM_BATCH_SIZE, on_flush=None):
+        self.conn = conn
+        self.cursor = cursor
+        self.genre_cache = genre_cache
+        self.platform_cache = platform_cache
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.written = 0
+        self.failed = 0
+        # Підсумки змін лише тих фільмів, де щось змінилось у жанрах чи цінах
+        self.changed = []
+        self._pending = []
+
+    def add(self, film_id, result, on_commit=None, on_error=None):
+        """result — дані платформ у форматі результату CrawlEngine (megogo_data, m_poster, ...)."""
+        self._queue(build_film_changes(film_id, result, self.platform_cache), on_commit, on_error)
+
+    def mark_refreshed(self, film_id, on_commit=None, on_error=None):
+        """Фільм перевірено, але даних немає: лише оновлюємо last_refreshed_at, щоб не брати його знову."""
+        self._queue({"film_id": film_id, "film_fields": None, "genres": None, "platform_rows": {}, "film_urls": {}},
+                    on_commit, on_error)
+
+    def _queue(self, changes, on_commit, on_error):
+        self._pending.append((changes, on_commit, on_error))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _rollback(self, genre_snapshot):
+        self.conn.rollback()
+        # Жанри, створені у відкоченій транзакції, в БД вже не існують
+        self.genre_cache.clear()
+        self.genre_cache.update(genre_snapshot)
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        genre_snapshot = dict(self.genre_cache)
+        try:
+            summaries = apply_film_changes_batch(self.cursor, [changes for changes, _, _ in batch], self.genre_cache)
+            with metrics.timer("db_commit"):
+                self.conn.commit()
+            committed = [(summary, on_commit) for summary, (_, on_commit, _) in zip(summaries, batch)]
+            print(f"     Пакет із {len(batch)} фільмів записано.")
+        except Exception as e:
+            self._rollback(genre_snapshot)
+            print(f"    [!] Пакет не записано ({e}). Записуємо по одному фільму...")
+            metrics.count("db_batch_fallbacks")
+            committed = []
+            for changes, on_commit, on_error in batch:
+                genre_snapshot = dict(self.genre_cache)
+                try:
+                    summary = apply_film_changes(self.cursor, changes, self.genre_cache)
+                    if affects_search(changes, summary):
+                        refresh_search_index(self.cursor, [changes["film_id"]])
+                    with metrics.timer("db_commit"):
+                        self.conn.commit()
+                    committed.append((summary, on_commit))
+                except Exception as e:
+                    self._rollback(genre_snapshot)
+                    self.failed += 1
+                    print(f"    [!] Не вдалося записати ID {changes['film_id']}: {e}")
+                    if on_error: on_error(e)
+
+        self.written += len(committed)
+        metrics.count("films_written", len(committed))
+        if len(committed) < len(batch):
+            metrics.count("films_failed", len(batch) - len(committed))
+        for summary, on_commit in committed:
+            if is_changed(summary):
+                self.changed.append(summary)
+            if on_commit: on_commit()
+        if self.on_flush: self.on_flush(len(committed))
@@ -0,0 +1,146 @@
+import queue
+import threading
+from contextlib import contextmanager
+from core import create_sweettv_driver
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DRIVER_POOL_SIZE = 2
+# Після скількох сторінок драйвер перезапускається
+DRIVER_MAX_PAGES = 200
+# Наскільки може зрости пам'ять (RSS) chromedriver разом з усіма процесами Chrome відносно
+# першого заміру, перш ніж драйвер перезапуститься. Без psutil — лише перезапуск за кількістю сторінок
+DRIVER_MAX_RSS_GROWTH_MB = 500
+DRIVER_BORROW_TIMEOUT = 600
+
+
+class DriverPool:
+    """
+    Пул прогрітих (з cookies Sweet.tv) браузерів. Драйвер береться через
+    `with pool.driver() as driver:` і повертається автоматично; зламані,
+    "розрослі" або відпрацьовані драйвери замінюються новими.
+    Браузери запускаються ліниво, під час першого borrow (не більше size), тож прогони,
+    яким вистачило HTTP, Chrome не запускають зовсім.
+    """
+
+    def __init__(self, cookies, size=DRIVER_POOL_SIZE, max_pages=DRIVER_MAX_PAGES,
+                 max_rss_growth_mb=DRIVER_MAX_RSS_GROWTH_MB, driver_factory=create_sweettv_driver):
+        self.cookies = cookies
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_growth = max_rss_growth_mb * 1024 * 1024
+        self.driver_factory = driver_factory
+        self.recycled = 0
+        self._idle = queue.LifoQueue()
+        self._state = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # None — вільне місце без браузера, _borrow запускає на ньому драйвер за потреби;
+        # LIFO: спершу повторно беруться вже запущені браузери
+        for _ in range(size):
+            self._idle.put(None)
+
+    def _create(self):
+        try:
+            driver = self.driver_factory(self.cookies)
+        except Exception as e:
+            print(f"    [!] [Sweet.tv] Не вдалося запустити браузер: {e}")
+            return None
+        with self._lock:
+            self._state[id(driver)] = {"pages": 0, "rss_baseline": None}
+        return driver
+
+    def _discard(self, driver):
+        if driver is None:
+            return
+        with self._lock:
+            self._state.pop(id(driver), None)
+        try: driver.quit()
+        except: pass
+
+    def _browser_rss(self, driver):
+        """RSS процесу chromedriver і всіх його нащадків (Chrome, рендерери) у байтах або None."""
+        if psutil is None:
+            return None
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except Exception:
+            return None
+
+    def _is_healthy(self, driver):
+        try:
+            driver.execute_script("return document.readyState;")
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, driver):
+        state = self._state.get(id(driver))
+        if state is None:
+            return True
+        if state["pages"] >= self.max_pages:
+            return True
+        rss = self._browser_rss(driver)
+        if rss is None:
+            return False
+        if state["rss_baseline"] is None:
+            state["rss_baseline"] = rss
+            return False
+        return rss - state["rss_baseline"] > self.max_rss_growth
+
+    def _borrow(self):
+        driver = self._idle.get(timeout=DRIVER_BORROW_TIMEOUT)
+        if driver is not None and not self._is_healthy(driver):
+            print("    [!] [Sweet.tv] Сесія браузера не відповідає, створюємо нову.")
+            self._discard(driver)
+            driver = None
+        if driver is None:
+            driver = self._create()
+        if driver is None:
+            # Повертаємо "порожнє" місце, щоб наступний виклик спробував ще раз
+            self._idle.put(None)
+            raise RuntimeError("Немає доступного браузера Sweet.tv")
+        return driver
+
+    def _release(self, driver, pages, failed):
+        state = self._state.get(id(driver))
+        if state is not None:
+            state["pages"] += pages
+        if self._closed:
+            self._discard(driver)
+            return
+        if failed and not self._is_healthy(driver):
+            print("    [!] [Sweet.tv] Сесія браузера впала, замінюємо.")
+            self._discard(driver)
+            driver = None
+        elif self._needs_recycle(driver):
+            self._discard(driver)
+            driver = None
+            self.recycled += 1
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, pages=1):
+        driver = self._borrow()
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(driver, pages, failed)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
@@ -0,0 +1,297 @@
+import argparse
+import hashlib
+import math
+import pymysql.cursors
+import metrics
+from core import create_connection
+from schema import ensure_schema
+
+# Скільки схожих фільмів зберігається для кожного фільму
+SIMILARITY_TOP_K = 20
+# Оцінки 1..5 центруються відносно нейтральної трійки: 4-5 — "подобається", 1-2 — "ні"
+RATING_CENTER = 3
+# Згладжування косинуса за кількістю спільних оцінювачів: n / (n + RATING_SHRINKAGE)
+RATING_SHRINKAGE = 5
+# Внесок складових у підсумкову схожість
+RATING_WEIGHT = 0.6
+GENRE_WEIGHT = 0.2
+MOOD_WEIGHT = 0.2
+# Жанр, у якому більше фільмів, дає кандидатів лише через свою "голову" — стільки найбільш
+# оцінюваних фільмів: інакше популярні жанри ("драма") давали б O(N^2) пар
+SIMILARITY_GENRE_BUCKET = 500
+# Різниця, меншу за яку, вважаємо тим самим значенням (score зберігається як FLOAT)
+SCORE_EPSILON = 1e-6
+# Скільки фільмів записується за одну транзакцію
+SIMILARITY_WRITE_CHUNK = 500
+
+
+def _rank_key(item):
+    other_id, score = item
+    return (-score, other_id)
+
+
+def top_k(scores, k):
+    """Найсхожіші k фільмів зі словника film_id -> score; рівні бали — за меншим film_id."""
+    return sorted(((other_id, score) for other_id, score in scores.items() if score > 0), key=_rank_key)[:k]
+
+
+class SimilarityModel:
+    """
+    Розріджені вектори фільмів у пам'яті: оцінки користувачів (центровані), жанри та
+    кількість відміток кожної емоції, плюс зворотні індекси user/genre/mood -> фільми.
+    Схожість фільму рахується лише з кандидатами, що мають з ним щось спільне,
+    тож перерахунок кількох змінених фільмів не зачіпає решту матриці.
+
+    Кандидати за жанром обмежені: якщо в жанрі більше genre_bucket фільмів, пара стає кандидатом
+    через нього, лише коли хоч один з двох фільмів у "голові" жанру (genre_bucket найбільш
+    оцінюваних). Так пар лінійно, а не квадратично багато, і правило симетричне.
+    """
+
+    def __init__(self, film_ids, ratings=(), genres=(), moods=(), genre_bucket=SIMILARITY_GENRE_BUCKET):
+        self.film_ids = set(film_ids)
+        self.film_users = {}
+        self.user_films = {}
+        self.film_genres = {}
+        self.genre_films = {}
+        self.film_moods = {}
+        self.mood_films = {}
+        self._fingerprint_parts = {}
+        for user_id, film_id, rating in ratings:
+            value = float(rating) - RATING_CENTER
+            self.film_users.setdefault(film_id, {})[user_id] = value
+            self.user_films.setdefault(user_id, {})[film_id] = value
+            self._fingerprint_parts.setdefault(film_id, []).append(f"r{user_id}:{rating}")
+        for film_id, genre_id in genres:
+            self.film_genres.setdefault(film_id, set()).add(genre_id)
+            self.genre_films.setdefault(genre_id, set()).add(film_id)
+            self._fingerprint_parts.setdefault(film_id, []).append(f"g{genre_id}")
+        for film_id, mood_tag_id, count in moods:
+            self.film_moods.setdefault(film_id, {})[mood_tag_id] = float(count)
+            self.mood_films.setdefault(mood_tag_id, set()).add(film_id)
+            self._fingerprint_parts.setdefault(film_id, []).append(f"m{mood_tag_id}:{count}")
+        self.rating_norms = {film_id: math.sqrt(sum(v * v for v in users.values())) for film_id, users in self.film_users.items()}
+        self.mood_norms = {film_id: math.sqrt(sum(v * v for v in tags.values())) for film_id, tags in self.film_moods.items()}
+        self.genre_heads = {}
+        for genre_id, films in self.genre_films.items():
+            if len(films) <= genre_bucket:
+                self.genre_heads[genre_id] = films
+            else:
+                ranked = sorted(films, key=lambda film_id: (-len(self.film_users.get(film_id, ())), film_id))
+                self.genre_heads[genre_id] = set(ranked[:genre_bucket])
+
+    @classmethod
+    def load(cls, conn):
+        """Читає films, ratings, film_genre і film_mood_ratings серверними курсорами."""
+        def stream(sql):
+            with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(sql)
+                return list(cursor)
+
+        with metrics.timer("similarity_load"):
+            return cls(
+                [film_id for (film_id,) in stream("SELECT id FROM films")],
+                stream("SELECT user_id, film_id, rating FROM ratings"),
+                stream("SELECT film_id, genre_id FROM film_genre"),
+                stream("SELECT film_id, mood_tag_id, COUNT(*) FROM film_mood_ratings GROUP BY film_id, mood_tag_id"),
+            )
+
+    def fingerprint(self, film_id):
+        """
+        Змінюється разом з будь-якою оцінкою, емоцією чи жанром фільму (зокрема після видалення),
+        а також коли фільм потрапляє в "голову" жанру чи випадає з неї — від цього залежить,
+        з ким він взагалі порівнюється.
+        """
+        parts = self._fingerprint_parts.get(film_id, [])
+        parts = sorted(parts + [f"h{genre_id}" for genre_id in self.film_genres.get(film_id, ())
+                                if film_id in self.genre_heads[genre_id]])
+        if film_id not in self.film_ids:
+            parts.append("deleted")
+        return hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
+    def scores(self, film_id):
+        """Схожість фільму з усіма кандидатами, що мають спільних оцінювачів, жанри чи емоції."""
+        dots, common = {}, {}
+        for user_id, value in self.film_users.get(film_id, {}).items():
+            for other_id, other_value in self.user_films[user_id].items():
+                dots[other_id] = dots.get(other_id, 0.0) + value * other_value
+                common[other_id] = common.get(other_id, 0) + 1
+
+        genres = self.film_genres.get(film_id, set())
+        genre_candidates = set()
+        for genre_id in genres:
+            head = self.genre_heads[genre_id]
+            genre_candidates |= self.genre_films[genre_id] if film_id in head else head
+
+        moods = self.film_moods.get(film_id, {})
+        mood_dots = {}
+        for mood_tag_id, count in moods.items():
+            for other_id in self.mood_films[mood_tag_id]:
+                mood_dots[other_id] = mood_dots.get(other_id, 0.0) + count * self.film_moods[other_id][mood_tag_id]
+
+        scores = {}
+        norm = self.rating_norms.get(film_id, 0.0)
+        mood_norm = self.mood_norms.get(film_id, 0.0)
+        for other_id in set(dots) | genre_candidates | set(mood_dots):
+            if other_id == film_id or other_id not in self.film_ids:
+                continue
+            score = 0.0
+            other_norm = self.rating_norms.get(other_id, 0.0)
+            if other_id in dots and norm and other_norm:
+                n = common[other_id]
+                score += RATING_WEIGHT * dots[other_id] / (norm * other_norm) * n / (n + RATING_SHRINKAGE)
+            other_genres = self.film_genres.get(other_id)
+            if genres and other_genres:
+                shared = len(genres & other_genres)
+                if shared:
+                    score += GENRE_WEIGHT * shared / (len(genres) + len(other_genres) - shared)
+            if other_id in mood_dots and mood_norm:
+                score += MOOD_WEIGHT * mood_dots[other_id] / (mood_norm * self.mood_norms[other_id])
+            scores[other_id] = score
+        return scores
+
+
+def update_neighbor_lists(model, old_lists, dirty, k=SIMILARITY_TOP_K):
+    """
+    Нові списки схожих фільмів після змін у dirty (film_id -> [(other_id, score)]; лише змінені).
+    Змінені фільми рахуються повністю. Схожість двох незмінених фільмів не змінюється,
+    тож їхні старі списки лише доповнюються новими балами змінених фільмів; повний
+    перерахунок потрібен, лише коли змінений фільм зі списку став менш схожим.
+    """
+    dirty = set(dirty)
+    new_lists = {}
+    dirty_scores = {}
+    for film_id in dirty:
+        scores = model.scores(film_id) if film_id in model.film_ids else {}
+        dirty_scores[film_id] = scores
+        neighbors = top_k(scores, k)
+        if neighbors != old_lists.get(film_id, []):
+            new_lists[film_id] = neighbors
+
+    affected = set()
+    for film_id, neighbors in old_lists.items():
+        if dirty.intersection(other_id for other_id, _ in neighbors):
+            affected.add(film_id)
+    for film_id in dirty:
+        affected.update(dirty_scores[film_id])
+    affected -= dirty
+
+    for film_id in affected:
+        if film_id not in model.film_ids:
+            continue
+        current = dict(old_lists.get(film_id, []))
+        recompute = False
+        for dirty_id in dirty:
+            new_score = dirty_scores[dirty_id].get(film_id, 0.0)
+            if dirty_id in current:
+                if new_score < current[dirty_id] - SCORE_EPSILON:
+                    recompute = True
+                    break
+                current[dirty_id] = new_score
+            elif new_score > 0:
+                current[dirty_id] = new_score
+        neighbors = top_k(model.scores(film_id), k) if recompute else top_k(current, k)
+        if neighbors != old_lists.get(film_id, []):
+            new_lists[film_id] = neighbors
+    return new_lists
+
+
+def load_neighbor_lists(conn):
+    lists = {}
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute("SELECT film_id, similar_film_id, score FROM film_similarity")
+        for film_id, other_id, score in cursor:
+            lists.setdefault(film_id, []).append((other_id, float(score)))
+    return {film_id: sorted(neighbors, key=_rank_key) for film_id, neighbors in lists.items()}
+
+
+def load_fingerprints(cursor):
+    cursor.execute("SELECT film_id, fingerprint FROM film_similarity_state")
+    return {row['film_id']: row['fingerprint'] for row in cursor.fetchall()}
+
+
+def save_neighbor_lists(cursor, lists):
+    film_ids = list(lists)
+    if not film_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(film_ids))
+    cursor.execute(f"DELETE FROM film_similarity WHERE film_id IN ({placeholders})", film_ids)
+    rows = [(film_id, other_id, score) for film_id, neighbors in lists.items() for other_id, score in neighbors]
+    if rows:
+        cursor.executemany("INSERT INTO film_similarity (film_id, similar_film_id, score) VALUES (%s, %s, %s)", rows)
+
+
+def save_fingerprints(cursor, fingerprints):
+    if not fingerprints:
+        return
+    cursor.executemany("""
+        INSERT INTO film_similarity_state (film_id, fingerprint, computed_at) VALUES (%s, %s, NOW())
+        ON DUPLICATE KEY UPDATE fingerprint = VALUES(fingerprint), computed_at = VALUES(computed_at)
+    """, list(fingerprints.items()))
+
+
+def delete_fingerprints(cursor, film_ids):
+    if film_ids:
+        placeholders = ", ".join(["%s"] * len(film_ids))
+        cursor.execute(f"DELETE FROM film_similarity_state WHERE film_id IN ({placeholders})", list(film_ids))
+
+
+def refresh_similarity(conn, full=False, k=SIMILARITY_TOP_K):
+    """
+    Оновлює film_similarity: за замовчуванням лише для фільмів, чий відбиток змінився
+    з минулого запуску (і тих, у чиїх списках вони є); full=True перераховує все.
+    Повертає (кількість змінених фільмів, кількість переписаних списків).
+    """
+    with conn.cursor() as cursor:
+        ensure_schema(cursor)
+        stored = {} if full else load_fingerprints(cursor)
+        conn.commit()
+    model = SimilarityModel.load(conn)
+    old_lists = load_neighbor_lists(conn)
+
+    current = {film_id: model.fingerprint(film_id) for film_id in model.film_ids}
+    removed = (set(stored) | set(old_lists)) - model.film_ids
+    dirty = {film_id for film_id, fingerprint in current.items() if stored.get(film_id) != fingerprint} | removed
+
+    with metrics.timer("similarity_compute"):
+        new_lists = update_neighbor_lists(model, old_lists, dirty, k)
+    metrics.count("similarity_films", len(dirty), outcome="dirty")
+    metrics.count("similarity_films", len(new_lists), outcome="rewritten")
+
+    film_ids = sorted(new_lists)
+    dirty_ids = sorted(dirty - removed)
+    with conn.cursor() as cursor, metrics.timer("similarity_write"):
+        for start in range(0, len(film_ids), SIMILARITY_WRITE_CHUNK):
+            chunk = film_ids[start:start + SIMILARITY_WRITE_CHUNK]
+            save_neighbor_lists(cursor, {film_id: new_lists[film_id] for film_id in chunk})
+            conn.commit()
+        if full:
+            cursor.execute("DELETE s FROM film_similarity s LEFT JOIN films f ON f.id = s.film_id WHERE f.id IS NULL")
+            conn.commit()
+        # Відбитки — лише після всіх списків: якщо запуск обірветься раніше, ці фільми лишаться
+        # "зміненими" і наступний запуск перерахує їх знову
+        for start in range(0, len(dirty_ids), SIMILARITY_WRITE_CHUNK):
+            save_fingerprints(cursor, {film_id: current[film_id] for film_id in dirty_ids[start:start + SIMILARITY_WRITE_CHUNK]})
+            conn.commit()
+        delete_fingerprints(cursor, sorted(removed))
+        conn.commit()
+    return len(dirty), len(new_lists)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перерахунок схожих фільмів для рекомендацій")
+    parser.add_argument("--full", action="store_true", help="перерахувати всі фільми, а не лише змінені")
+    parser.add_argument("--top-k", type=int, default=SIMILARITY_TOP_K)
+    args = parser.parse_args()
+
+    print(f"--- Метрики запуску: {metrics.start_run('similarity')} ---")
+    conn = create_connection()
+    try:
+        dirty, rewritten = refresh_similarity(conn, full=args.full, k=args.top_k)
+        print(f"--- Змінених фільмів: {dirty}, переписано списків схожих: {rewritten} ---")
+    finally:
+        conn.close()
+        metrics.finish_run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import re
+from rapidfuzz import fuzz, process
+
+TITLE_MATCH_THRESHOLD = 0.85
+# Кандидати, що відстають від найкращого не більше ніж на стільки, вважаються рівними,
+# і між ними вирішує рік
+YEAR_TIE_MARGIN = 0.03
+# Токен-сет застосовується, лише якщо коротша назва покриває щонайменше таку частку довшої
+TOKEN_SET_MIN_COVERAGE = 0.75
+# Множник для назв з різними номерами частин ("Форсаж" і "Форсаж 7")
+SEQUEL_PENALTY = 0.8
+# Зайві слова, які означають інший фільм франшизи, а не ту саму назву з уточненням
+SEQUEL_MARKERS = {
+    "частина", "розділ", "глава", "сезон", "серія", "повернення",
+    "друга", "другий", "третя", "третій", "четверта", "четвертий",
+    "part", "chapter", "season", "episode", "returns",
+}
+ROMAN_NUMERALS = {"ii": "2", "iii": "3", "iv": "4", "v": "5", "vi": "6", "vii": "7", "viii": "8", "ix": "9", "x": "10"}
+
+_PUNCTUATION_RE = re.compile(r'["\'"“”’‘:,\-\s]+')
+_PARENTHESES_RE = re.compile(r'\([^)]*\)')
+_YEAR_RE = re.compile(r'\b(19\d{2}|20\d{2})\b')
+
+
+def normalize_title(title):
+    if not title: return None
+    title = title.lower()
+    title = _PUNCTUATION_RE.sub(' ', title)
+    title = _PARENTHESES_RE.sub('', title)
+    return title.strip()
+
+
+def title_year(title):
+    """Рік випуску з назви на кшталт "Дюна (2021)", якщо він там є."""
+    match = _YEAR_RE.search(title or "")
+    return int(match.group(1)) if match else None
+
+
+def _part_numbers(title):
+    """Номери частин у назві; "1" не рахується, бо першу частину зазвичай пишуть без номера."""
+    numbers = {ROMAN_NUMERALS.get(token, token) for token in title.split()}
+    return {token for token in numbers if token.isdigit() and token != "1" and not _YEAR_RE.fullmatch(token)}
+
+
+def _token_set_allowed(query, candidate):
+    query_tokens, candidate_tokens = set(query.split()), set(candidate.split())
+    if len(query_tokens) < 2 or len(candidate_tokens) < 2:
+        return False
+    extra = query_tokens ^ candidate_tokens
+    if any(token.isdigit() or token in SEQUEL_MARKERS or token in ROMAN_NUMERALS for token in extra):
+        return False
+    return min(len(query), len(candidate)) / max(len(query), len(candidate)) >= TOKEN_SET_MIN_COVERAGE
+
+
+def _score_normalized(query, candidate, ratio, token_sort):
+    score = max(ratio, token_sort)
+    if score < 100 and _token_set_allowed(query, candidate):
+        score = max(score, fuzz.token_set_ratio(query, candidate))
+    if _part_numbers(query) != _part_numbers(candidate):
+        score *= SEQUEL_PENALTY
+    return score / 100
+
+
+def similarity(a, b):
+    """Схожість двох назв від 0 до 1 після normalize_title."""
+    a, b = normalize_title(a), normalize_title(b)
+    if not a or not b: return 0
+    return _score_normalized(a, b, fuzz.ratio(a, b), fuzz.token_sort_ratio(a, b))
+
+
+def _batch_scores(query, choices, scorer):
+    scores = [0] * len(choices)
+    for _, score, index in process.extract(query, choices, scorer=scorer, limit=None):
+        scores[index] = score
+    return scores
+
+
+def score_titles(query, titles):
+    """Схожість одного запиту з багатьма назвами за один прохід (0 для порожніх назв)."""
+    normalized_query = normalize_title(query)
+    normalized = [normalize_title(title) or "" for title in titles]
+    if not normalized_query or not normalized:
+        return [0] * len(titles)
+    ratios = _batch_scores(normalized_query, normalized, fuzz.ratio)
+    token_sorts = _batch_scores(normalized_query, normalized, fuzz.token_sort_ratio)
+    return [
+        _score_normalized(normalized_query, title, ratio, token_sort) if title else 0
+        for title, ratio, token_sort in zip(normalized, ratios, token_sorts)
+    ]
+
+
+def best_title_match(query, titles, threshold=TITLE_MATCH_THRESHOLD, year=None, years=None):
+    """
+    Обирає найкращу назву серед кандидатів. Повертає (index, scores), де index — None,
+    якщо жодна назва не перевищує threshold. Серед майже рівних кандидатів перевага
+    тому, чий рік (years або рік із назви) збігається з роком запиту.
+    """
+    scores = score_titles(query, titles)
+    eligible = [i for i, score in enumerate(scores) if score > threshold]
+    if not eligible:
+        return None, scores
+    best = max(scores[i] for i in eligible)
+    tied = [i for i in eligible if best - scores[i] <= YEAR_TIE_MARGIN]
+
+    year = year or title_year(query)
+    if year and len(tied) > 1:
+        years = years or [title_year(title) for title in titles]
+        same_year = [i for i in tied if years[i] == year]
+        if same_year:
+            tied = same_year
+    return max(tied, key=lambda i: scores[i]), scores
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import threading
+import time
+import urllib.parse
+import aiohttp
+import metrics
+from core import (
+    HTTP_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_BACKOFF_JITTER, HTTP_RETRY_STATUSES,
+    megogo_search_url, match_megogo_search_results, parse_megogo_film_html, unchanged_megogo_data,
+    lookup_resolution, remember_resolution, forget_resolution
+)
+
+MEGOGO_MAX_IN_FLIGHT = 16
+MEGOGO_MIN_INTERVAL = 0.05
+
+
+class _Limiter:
+    """Обмеження кількості запитів "у польоті" та мінімального інтервалу між ними в межах одного event loop."""
+
+    def __init__(self, max_in_flight, min_interval):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.min_interval = min_interval
+        self.requests = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self._next_at = 0.0
+
+    async def pace(self):
+        now = time.monotonic()
+        start_at = max(now, self._next_at)
+        self._next_at = start_at + self.min_interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+async def _fetch(session, limiter, url, headers=None):
+    """GET з повторами на 429/5xx. Повертає (status, headers, text); 304 не вважається помилкою."""
+    for attempt in range(HTTP_RETRIES + 1):
+        async with limiter.semaphore:
+            await limiter.pace()
+            async with session.get(url, headers=headers) as r:
+                limiter.requests += 1
+                metrics.count("http_requests", host=urllib.parse.urlsplit(url).hostname, status=r.status)
+                if r.status not in HTTP_RETRY_STATUSES or attempt == HTTP_RETRIES:
+                    r.raise_for_status()
+                    return r.status, r.headers, await r.text()
+                retry_after = r.headers.get("Retry-After")
+        limiter.retries += 1
+        metrics.count("http_retries", host=urllib.parse.urlsplit(url).hostname)
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = HTTP_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+        await asyncio.sleep(delay)
+
+
+async def _fetch_text(session, limiter, url):
+    _, _, text = await _fetch(session, limiter, url)
+    return text
+
+
+async def _fetch_cached(session, limiter, url, page_cache):
+    cached = page_cache.fresh(url)
+    if cached is not None:
+        return cached
+    if page_cache.offline:
+        return page_cache.fetch(url)
+    status, headers, text = await _fetch(session, limiter, url, page_cache.conditional_headers(url))
+    result = page_cache.store(url, status, headers, text)
+    if result is None:
+        status, headers, text = await _fetch(session, limiter, url)
+        result = page_cache.store(url, status, headers, text)
+    if result is None:
+        raise ValueError(f"304 без збереженої копії сторінки: {url}")
+    return result
+
+
+@metrics.timed("megogo_search", outcome=metrics.found, mode="async")
+async def search_megogo_async(session, limiter, film_name_to_search, resolution_cache=None):
+    hit, cached = lookup_resolution(resolution_cache, 'Megogo', film_name_to_search)
+    if hit:
+        return cached
+    try:
+        search_url = megogo_search_url(film_name_to_search)
+        print(f"    > [Megogo] Пошуковий URL: {search_url}")
+        html = await _fetch_text(session, limiter, search_url)
+        match = match_megogo_search_results(html, film_name_to_search)
+        remember_resolution(resolution_cache, 'Megogo', film_name_to_search, match)
+        return match
+    except Exception as e:
+        print(f"    > [Megogo]  Помилка пошуку: {e}")
+        metrics.set_outcome("error")
+        return None
+
+
+@metrics.timed("megogo_page", outcome=lambda film_data: "parsed" if film_data else "error", mode="async")
+async def parse_film_page_megogo_async(session, limiter, url, page_cache=None, skip_unchanged=False):
+    try:
+        if page_cache is not None:
+            html, changed = await _fetch_cached(session, limiter, url, page_cache)
+        else:
+            html, changed = await _fetch_text(session, limiter, url), True
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+        print(f"    [!] Не вдалося завантажити сторінку {url}: {e}")
+        return None
+    if skip_unchanged and not changed:
+        print(f"    > [Megogo] Сторінка не змінилась з минулого оновлення: {url}")
+        metrics.set_outcome("unchanged")
+        return unchanged_megogo_data(url)
+    return parse_megogo_film_html(html, url)
+
+
+async def megogo_leg_async(session, limiter, film_name, page_cache=None, skip_unchanged=False, resolution_cache=None):
+    """Пошук + сторінка фільму. Повертає (megogo_data, poster_url з картки пошуку)."""
+    m_match = await search_megogo_async(session, limiter, film_name, resolution_cache)
+    if not m_match:
+        return None, None
+    megogo_data = await parse_film_page_megogo_async(session, limiter, m_match['url'], page_cache, skip_unchanged)
+    if megogo_data is None:
+        forget_resolution(resolution_cache, 'Megogo', film_name)
+    return megogo_data, m_match.get('poster_url')
+
+
+def _connection_trace(limiter):
+    """Рахує нові та повторно використані з'єднання конектора в лічильниках limiter."""
+    async def on_create(session, ctx, params):
+        limiter.connections_opened += 1
+
+    async def on_reuse(session, ctx, params):
+        limiter.connections_reused += 1
+
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_end.append(on_create)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+
+def _create_session(max_in_flight, limiter):
+    connector = aiohttp.TCPConnector(limit=max_in_flight, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[_connection_trace(limiter)])
+
+
+class MegogoAsyncClient:
+    """
+    Фоновий event loop з одним aiohttp-клієнтом для потокового коду:
+    submit() повертає concurrent.futures.Future з (megogo_data, poster_url).
+    """
+
+    def __init__(self, max_in_flight=MEGOGO_MAX_IN_FLIGHT, min_interval=MEGOGO_MIN_INTERVAL):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="megogo-async", daemon=True)
+        self._thread.start()
+        self._session, self._limiter = asyncio.run_coroutine_threadsafe(
+            self._open(max_in_flight, min_interval), self._loop
+        ).result()
+
+    async def _open(self, max_in_flight, min_interval):
+        limiter = _Limiter(max_in_flight, min_interval)
+        return _create_session(max_in_flight, limiter), limiter
+
+    @property
+    def retries(self):
+        return self._limiter.retries
+
+    @property
+    def stats(self):
+        """Ті самі лічильники, що й core.get_http_stats, для asyncio-клієнта."""
+        limiter = self._limiter
+        return {"requests": limiter.requests, "retries": limiter.retries,
+                "connections_opened": limiter.connections_opened, "connections_reused": limiter.connections_reused}
+
+    def submit(self, film_name, page_cache=None, skip_unchanged=False, resolution_cache=None):
+        return asyncio.run_coroutine_threadsafe(
+            megogo_leg_async(self._session, self._limiter, film_name, page_cache, skip_unchanged, resolution_cache),
+            self._loop
+        )
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
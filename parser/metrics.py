@@ -0,0 +1,237 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+METRICS_DIR = os.path.join(base_dir, 'metrics')
+METRIC_PREFIX = "parser"
+# Межі гістограм тривалостей етапів (секунди) для Prometheus
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_span = contextvars.ContextVar("metrics_span", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Span:
+    """Один вимір етапу; outcome можна уточнити зсередини через set_outcome()."""
+    __slots__ = ("stage", "labels", "outcome")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.outcome = None
+
+
+class Metrics:
+    """
+    Реєстр метрик одного запуску: тривалості етапів (з міткою outcome) та лічильники.
+    Кожна подія може писатись у JSON-lines лог, а наприкінці запуску все зведене
+    зберігається у текстовий файл у форматі Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._log = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+            self.run_name = None
+            self.started_at = time.perf_counter()
+
+    def _emit(self, event):
+        if self._log is None:
+            return
+        event["ts"] = datetime.now().isoformat(timespec='milliseconds')
+        self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def count(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self._emit({"type": "counter", "name": name, "value": value, **dict(key[1])})
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, _label_key(labels))
+        with self._lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(DURATION_BUCKETS)}
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    timing["buckets"][i] += 1
+            self._emit({"type": "timer", "stage": stage, "seconds": round(seconds, 6), **dict(key[1])})
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        span = Span(stage, labels)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = span.outcome or "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.observe(stage, time.perf_counter() - start, outcome=span.outcome or "ok", **labels)
+
+    def timed(self, stage, outcome=None, **labels):
+        """
+        Декоратор для timer(). outcome(result) визначає мітку за результатом функції,
+        якщо її не встановлено через set_outcome(). Працює і для корутин.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(stage, **labels) as span:
+                        result = await func(*args, **kwargs)
+                        if span.outcome is None and outcome is not None:
+                            span.outcome = outcome(result)
+                        return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage, **labels) as span:
+                    result = func(*args, **kwargs)
+                    if span.outcome is None and outcome is not None:
+                        span.outcome = outcome(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def start_run(self, name, directory=METRICS_DIR):
+        """Починає запуск: скидає лічильники й відкриває JSON-lines лог metrics/<name>-<час>.jsonl."""
+        self.close()
+        self.reset()
+        os.makedirs(directory, exist_ok=True)
+        self.run_name = name
+        path = os.path.join(directory, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl")
+        self._log = open(path, 'a', encoding='utf-8')
+        return path
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def wall_seconds(self):
+        return time.perf_counter() - self.started_at
+
+    def prometheus_text(self):
+        with self._lock:
+            timings = sorted(self.timings.items())
+            counters = sorted(self.counters.items())
+        lines = []
+        if timings:
+            metric = f"{METRIC_PREFIX}_stage_seconds"
+            lines += [f"# HELP {metric} Тривалість етапів парсера", f"# TYPE {metric} histogram"]
+            for (stage, labels), timing in timings:
+                pairs = (("stage", stage),) + labels
+                for bound, cumulative in zip(DURATION_BUCKETS, timing["buckets"]):
+                    lines.append(f"{metric}_bucket{_format_labels(pairs + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(pairs + (('le', '+Inf'),))} {timing['count']}")
+                lines.append(f"{metric}_sum{_format_labels(pairs)} {timing['sum']:.6f}")
+                lines.append(f"{metric}_count{_format_labels(pairs)} {timing['count']}")
+        names = sorted({name for (name, _), _ in counters})
+        for name in names:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in counters:
+                if counter_name == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+        metric = f"{METRIC_PREFIX}_run_seconds"
+        lines += [f"# TYPE {metric} gauge", f"{metric}{_format_labels((('run', self.run_name or 'unknown'),))} {self.wall_seconds():.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def stage_summary(self):
+        """stage -> {"count", "seconds", "max", "outcomes": {outcome: count}}, за спаданням сумарного часу."""
+        with self._lock:
+            timings = list(self.timings.items())
+        stages = {}
+        for (stage, labels), timing in timings:
+            summary = stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max": 0.0, "outcomes": {}})
+            summary["count"] += timing["count"]
+            summary["seconds"] += timing["sum"]
+            summary["max"] = max(summary["max"], timing["max"])
+            outcome = dict(labels).get("outcome", "ok")
+            summary["outcomes"][outcome] = summary["outcomes"].get(outcome, 0) + timing["count"]
+        return dict(sorted(stages.items(), key=lambda item: -item[1]["seconds"]))
+
+    def print_summary(self):
+        wall = self.wall_seconds()
+        print(f"\n--- Де пішов час: {wall:.1f} с загалом ---")
+        print("    (етапи вкладені й виконуються паралельно, тож частки не сумуються до 100%)")
+        print(f"    {'етап':<22} {'викликів':>8} {'всього, с':>10} {'середнє, с':>11} {'макс, с':>8} {'частка':>7}  результати")
+        for stage, summary in self.stage_summary().items():
+            outcomes = ", ".join(f"{name} {count}" for name, count in sorted(summary["outcomes"].items()))
+            share = summary["seconds"] / wall if wall else 0
+            print(f"    {stage:<22} {summary['count']:>8} {summary['seconds']:>10.1f} "
+                  f"{summary['seconds'] / summary['count']:>11.2f} {summary['max']:>8.2f} {share:>7.0%}  {outcomes}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for (name, labels), value in counters:
+            label_text = ", ".join(f"{k}={v}" for k, v in labels)
+            print(f"    {name}{f' ({label_text})' if label_text else ''}: {value}")
+
+    def finish_run(self, directory=METRICS_DIR):
+        """Завершує запуск: підсумковий рядок у лог, metrics/<name>.prom і зведення в консоль."""
+        name = self.run_name or "run"
+        with self._lock:
+            self._emit({"type": "summary", "run": name, "wall_seconds": round(self.wall_seconds(), 3)})
+        os.makedirs(directory, exist_ok=True)
+        self.write_prometheus(os.path.join(directory, f"{name}.prom"))
+        self.print_summary()
+        self.close()
+
+
+REGISTRY = Metrics()
+
+count = REGISTRY.count
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+start_run = REGISTRY.start_run
+finish_run = REGISTRY.finish_run
+
+
+def set_outcome(outcome):
+    """Уточнює мітку outcome поточного етапу (якщо код виконується всередині timer())."""
+    span = _current_span.get()
+    if span is not None:
+        span.outcome = outcome
+
+
+def found(result):
+    return "found" if result else "not_found"
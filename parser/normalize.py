@@ -0,0 +1,126 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+# Скорочення одиниць тривалості, які трапляються на Megogo та Sweet.tv
+HOURS_RE = re.compile(r'(\d+)\s*(?:год|h)', re.IGNORECASE)
+MINUTES_RE = re.compile(r'(\d+)\s*(?:хв|min|m\b)', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+YEAR_RE = re.compile(r'\b(1[89]\d\d|2\d\d\d)\b')
+SPACES_RE = re.compile(r'\s+')
+
+RATING_STEP = Decimal("0.1")
+PRICE_STEP = Decimal("0.01")
+# Як тривалість зберігається в films.duration (веб читає провідне число як хвилини)
+DURATION_FORMAT = "{} хв"
+# Синоніми типів доступу -> канонічна назва в film_platform
+ACCESS_TYPE_ALIASES = {
+    "передплата": "Підписка",
+}
+
+
+def duration_minutes(text):
+    """"169 хв", "2 год 5 хв", "1 h 30 min" або просто "169" -> хвилини (int) чи None."""
+    if text is None or text == "":
+        return None
+    if isinstance(text, int):
+        return text
+    text = str(text)
+    hours = HOURS_RE.search(text)
+    minutes = MINUTES_RE.search(text)
+    if not hours and not minutes:
+        number = NUMBER_RE.search(text)
+        return int(float(number.group().replace(',', '.'))) if number else None
+    return (int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0)
+
+
+def release_year(text):
+    if isinstance(text, int):
+        return text
+    match = YEAR_RE.search(str(text)) if text else None
+    return int(match.group(1)) if match else None
+
+
+def imdb_rating(text):
+    """"7,5" чи "7.5," -> Decimal('7.5'); значення поза 0..10 відкидаються."""
+    if isinstance(text, Decimal):
+        return text
+    match = NUMBER_RE.search(str(text)) if text is not None else None
+    if not match:
+        return None
+    try:
+        rating = Decimal(match.group().replace(',', '.')).quantize(RATING_STEP)
+    except InvalidOperation:
+        return None
+    return rating if 0 <= rating <= 10 else None
+
+
+def split_list(text):
+    """Рядок через кому (або вже список) -> список без повторів і порожніх значень."""
+    if not text:
+        return []
+    parts = text if isinstance(text, (list, tuple)) else str(text).split(',')
+    return list(dict.fromkeys(SPACES_RE.sub(' ', part).strip() for part in parts if part and part.strip()))
+
+
+def price_value(price):
+    """Ціна з film_platform -> Decimal з двома знаками (None — ціни немає)."""
+    if price is None or price == "":
+        return None
+    try:
+        return Decimal(str(price).replace(',', '.')).quantize(PRICE_STEP)
+    except InvalidOperation:
+        return None
+
+
+def access_type_name(access_type):
+    name = SPACES_RE.sub(' ', access_type or "").strip()
+    return ACCESS_TYPE_ALIASES.get(name.lower(), name)
+
+
+# Поле сирого запису -> парсер у типізоване значення
+FIELD_PARSERS = {
+    "duration": duration_minutes,
+    "release_year": release_year,
+    "imdb_rating": imdb_rating,
+    "country": split_list,
+    "geners": split_list,
+}
+
+
+def normalize_records(records):
+    """
+    Приводить пакет сирих записів парсера до типізованих значень, поле за полем:
+    duration — хвилини (int), release_year — int, imdb_rating — Decimal,
+    country і geners — списки. Решта полів копіюється як є; вхідні записи не змінюються.
+    """
+    normalized = [dict(record) for record in records]
+    for field, parse in FIELD_PARSERS.items():
+        for record, value in zip(normalized, map(parse, [record.get(field) for record in records])):
+            record[field] = value
+    return normalized
+
+
+def normalize_record(record):
+    return normalize_records([record])[0]
+
+
+def film_column_values(record):
+    """Типізований запис -> значення текстових колонок films у канонічному вигляді."""
+    values = dict(record)
+    values["duration"] = DURATION_FORMAT.format(record["duration"]) if record.get("duration") is not None else None
+    values["release_year"] = str(record["release_year"]) if record.get("release_year") is not None else None
+    values["imdb_rating"] = str(record["imdb_rating"]) if record.get("imdb_rating") is not None else None
+    values["country"] = ", ".join(record["country"]) if record.get("country") else None
+    return values
+
+
+def normalize_platform_rows(rows):
+    """
+    Рядки film_platform (film_id, platform_id, access_type, price) з канонічною назвою
+    типу доступу та ціною Decimal(0.01). Прибираються лише точні повтори: кілька
+    пропозицій одного типу доступу з різними цінами (оренда на різний строк) лишаються.
+    """
+    return list(dict.fromkeys(
+        (film_id, platform_id, access_type_name(access_type), price_value(price))
+        for film_id, platform_id, access_type, price in rows
+    ))
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from core import http_get
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+PAGE_CACHE_DIR = os.path.join(base_dir, 'page_cache')
+PAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Скільки сторінка вважається свіжою і віддається без жодного запиту
+PAGE_CACHE_TTL = 3 * 24 * 3600
+# Записи, які не використовувались довше, видаляються при прибиранні
+PAGE_CACHE_MAX_AGE = 90 * 24 * 3600
+# Прибирання сканує весь каталог, тому запускається раз на стільки записів
+PAGE_CACHE_EVICT_EVERY = 200
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """
+    Дисковий кеш сторінок: entries/<sha256(url)>.json зберігає ETag/Last-Modified і хеш тіла,
+    а саме тіло лежить у bodies/<sha256(html)>.html. fetch() повертає (html, changed), де
+    changed показує, чи відрізняється тіло від того, що вже було оброблено (mark_processed).
+
+    У режимі offline сторінки беруться з fixture_dir (index.json: {url: ім'я файлу}) без мережі.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES, ttl=PAGE_CACHE_TTL,
+                 max_age=PAGE_CACHE_MAX_AGE, fixture_dir=None, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_age = max_age
+        self.fixture_dir = fixture_dir
+        self.offline = offline
+        self.stats = {"fresh": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "evicted": 0}
+        self._lock = threading.RLock()
+        self._stores = 0
+        self._fixtures = None
+        os.makedirs(os.path.join(directory, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+
+    def _entry_path(self, url):
+        return os.path.join(self.directory, 'entries', url_key(url) + '.json')
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest + '.html')
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _load_entry(self, url):
+        try:
+            with open(self._entry_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_entry(self, url, entry):
+        self._write_atomic(self._entry_path(url), json.dumps(entry, ensure_ascii=False))
+
+    def _read_body(self, entry):
+        try:
+            with open(self._body_path(entry['content_hash']), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _result(self, url, entry, html):
+        changed = entry.get('content_hash') != entry.get('processed_hash')
+        self._count("changed" if changed else "unchanged")
+        entry['used_at'] = time.time()
+        self._save_entry(url, entry)
+        return html, changed
+
+    def fresh(self, url):
+        """Сторінка з кешу без запиту, якщо вона ще в межах TTL; інакше None."""
+        with self._lock:
+            entry = self._load_entry(url)
+            if not entry or time.time() - entry.get('validated_at', 0) > self.ttl:
+                return None
+            html = self._read_body(entry)
+            if html is None:
+                return None
+            self._count("fresh")
+            return self._result(url, entry, html)
+
+    def conditional_headers(self, url):
+        entry = self._load_entry(url)
+        headers = {}
+        if entry and self._read_body(entry) is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, status, headers, html):
+        """
+        Оновлює кеш відповіддю сервера (200 або 304) і повертає (html, changed).
+        None — 304, а збереженої копії вже немає (прибрана між запитом і відповіддю):
+        сторінку треба перезапитати без умовних заголовків.
+        """
+        with self._lock:
+            entry = self._load_entry(url) or {"url": url}
+            now = time.time()
+            if status == 304:
+                html = self._read_body(entry) if entry.get('content_hash') else None
+                if html is None:
+                    return None
+                self._count("not_modified")
+            else:
+                digest = content_hash(html)
+                body_path = self._body_path(digest)
+                if not os.path.exists(body_path):
+                    self._write_atomic(body_path, html)
+                entry['content_hash'] = digest
+                entry['etag'] = headers.get('ETag')
+                entry['last_modified'] = headers.get('Last-Modified')
+                entry['fetched_at'] = now
+            entry['validated_at'] = now
+            result = self._result(url, entry, html)
+            self._stores += 1
+            if self._stores % PAGE_CACHE_EVICT_EVERY == 0:
+                self.evict()
+        return result
+
+    def _fixture(self, url):
+        if self._fixtures is None:
+            with open(os.path.join(self.fixture_dir, 'index.json'), 'r', encoding='utf-8') as f:
+                self._fixtures = json.load(f)
+        name = self._fixtures.get(url)
+        if name is None:
+            raise FileNotFoundError(f"Немає фікстури для {url}")
+        with open(os.path.join(self.fixture_dir, name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def fetch(self, url):
+        cached = self.fresh(url)
+        if cached is not None:
+            return cached
+        if self.offline:
+            return self.store(url, 200, {}, self._fixture(url))
+        r = http_get(url, headers=self.conditional_headers(url))
+        if r.status_code != 304:
+            r.raise_for_status()
+        result = self.store(url, r.status_code, r.headers, r.text)
+        if result is None:
+            r = http_get(url)
+            r.raise_for_status()
+            result = self.store(url, r.status_code, r.headers, r.text)
+        if result is None:
+            raise ValueError(f"304 без збереженої копії сторінки: {url}")
+        return result
+
+    def mark_processed(self, url):
+        """Фіксує, що поточну версію сторінки вже записано в БД."""
+        with self._lock:
+            entry = self._load_entry(url)
+            if entry and entry.get('content_hash'):
+                entry['processed_hash'] = entry['content_hash']
+                self._save_entry(url, entry)
+
+    def evict(self):
+        """Видаляє застарілі записи, а потім найдавніше використані, поки кеш не влізе в max_bytes."""
+        with self._lock:
+            entries_dir = os.path.join(self.directory, 'entries')
+            now = time.time()
+            entries = []
+            for name in os.listdir(entries_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(entries_dir, name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                if now - entry.get('used_at', 0) > self.max_age:
+                    os.remove(path)
+                    self.stats["evicted"] += 1
+                    continue
+                entries.append((entry.get('used_at', 0), path, entry.get('content_hash')))
+
+            sizes = {}
+            for _, _, digest in entries:
+                if digest and digest not in sizes:
+                    try:
+                        sizes[digest] = os.path.getsize(self._body_path(digest))
+                    except OSError:
+                        sizes[digest] = 0
+            total = sum(sizes.values())
+
+            refs = {}
+            for _, _, digest in entries:
+                refs[digest] = refs.get(digest, 0) + 1
+            entries.sort()
+            for _, path, digest in entries:
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                self.stats["evicted"] += 1
+                refs[digest] -= 1
+                if refs[digest] == 0:
+                    total -= sizes.get(digest, 0)
+
+            bodies_dir = os.path.join(self.directory, 'bodies')
+            for name in os.listdir(bodies_dir):
+                if name.endswith('.html') and refs.get(name[:-5], 0) == 0:
+                    os.remove(os.path.join(bodies_dir, name))
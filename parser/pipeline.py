@@ -0,0 +1,216 @@
+import argparse
+import multiprocessing
+import time
+import metrics
+from core import create_connection, load_cookies, load_genre_cache
+from crawler import CrawlEngine
+from db_writer import FILM_BATCH_SIZE, FilmBatchWriter
+from platforms import has_platform_data, result_fields
+from refresh import stream_stale_films
+from resolution_cache import ResolutionCache
+from run_daily import claim_queries, close_known_queries, mark_processed, save_search_result
+from schema import ensure_schema
+from title_index import TitleIndex
+from work_queue import JOB_FILM, JOB_QUERY, WORK_QUEUE_PATH, WorkQueue, worker_name
+
+# Скільки завдань воркер забирає за раз (стільки фільмів одночасно проходить через CrawlEngine)
+WORKER_CLAIM_BATCH = 16
+# Пауза між перевірками порожньої черги в режимі --follow (секунди)
+QUEUE_POLL_INTERVAL = 5
+# На скільки планувальник забирає запити search_log у run_daily: поки конвеєр їх парсить і пише,
+# run_daily їх не бере; якщо запит так і не записано, після оренди його буде заплановано знову
+PIPELINE_CLAIM_LEASE = 12 * 3600
+# Скільки запитів планується за один запуск
+PIPELINE_SCHEDULE_LIMIT = 10000
+
+
+def schedule_daily(queue, conn):
+    """
+    Ставить у чергу необроблені запити з search_log (пріоритет — search_count); відомі індексу
+    назв закриває одразу. Запити забираються тим самим атомарним UPDATE, що й у run_daily
+    (claim_queries), тож паралельний run_daily не парситиме їх удруге, а зайняті ним — пропускаються.
+    """
+    with conn.cursor() as cursor:
+        ensure_schema(cursor)
+        logs = claim_queries(cursor, f"{worker_name()}#schedule-{int(time.time())}", PIPELINE_SCHEDULE_LIMIT,
+                             lease=PIPELINE_CLAIM_LEASE)
+        title_index = TitleIndex.load()
+        title_index.refresh(cursor)
+        pending_logs = close_known_queries(cursor, title_index, logs)
+        conn.commit()
+    title_index.save()
+    return sum(queue.enqueue(JOB_QUERY, log['log_id'], {"log_id": log['log_id'], "name": log['query_text']},
+                             priority=log['search_count'] or 0)
+               for log in pending_logs)
+
+
+def schedule_monthly(queue, conn):
+    """Ставить у чергу фільми, яким настав час оновлення."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT NOW() AS now")
+        now = cursor.fetchone()['now']
+    return sum(queue.enqueue(JOB_FILM, film['id'], {"film_id": film['id'], "name": film['name']})
+               for film in stream_stale_films(conn, now))
+
+
+def run_worker(index=0, kinds=None, follow=False, queue_path=WORK_QUEUE_PATH):
+    """
+    Воркер парсингу: забирає завдання з черги, проганяє їх через CrawlEngine і кладе результати назад.
+    До БД не звертається, тож воркерів можна запускати скільки завгодно, зокрема в окремих процесах.
+    """
+    worker = worker_name(index)
+    metrics.start_run(f"worker-{index}")
+    queue = WorkQueue(queue_path)
+    resolution_cache = ResolutionCache()
+    engine = CrawlEngine(load_cookies(), megogo_async=True, resolution_cache=resolution_cache)
+    scraped = 0
+    try:
+        while True:
+            jobs = queue.claim(worker, kinds, limit=WORKER_CLAIM_BATCH)
+            if not jobs:
+                if not follow:
+                    break
+                time.sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            unfinished = {job['job_id'] for job in jobs}
+            try:
+                for result in engine.crawl({"id": job['job_id'], "name": job['payload']['name']} for job in jobs):
+                    job_id = result['film']['id']
+                    if queue.complete(job_id, worker, {field: result[field] for field in result_fields()}):
+                        scraped += 1
+                    unfinished.discard(job_id)
+            except Exception as e:
+                print(f"    [!] Воркер {worker}: пакет завдань перервано ({e}), повертаємо їх у чергу.")
+                for job_id in unfinished:
+                    queue.fail(job_id, worker, e)
+            metrics.count("jobs", len(jobs) - len(unfinished), outcome="scraped")
+            if unfinished:
+                metrics.count("jobs", len(unfinished), outcome="failed")
+    finally:
+        http_stats = engine.http_stats()
+        engine.close(); resolution_cache.close(); queue.close()
+        metrics.finish_run()
+    print(f"--- Воркер {worker}: оброблено завдань: {scraped}, HTTP: {http_stats} ---")
+    return scraped
+
+
+def run_workers(processes, kinds=None, follow=False, queue_path=WORK_QUEUE_PATH):
+    if processes <= 1:
+        return run_worker(0, kinds, follow, queue_path)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=(i, kinds, follow, queue_path), name=f"worker-{i}")
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+
+def run_writer(follow=False, queue_path=WORK_QUEUE_PATH):
+    """
+    Єдиний записувач у БД: забирає результати з черги, пише фільми пакетами через FilmBatchWriter,
+    а результати пошуку — через save_search_result, і лише після коміту підтверджує їх у черзі.
+    Незаписані результати лишаються в черзі й повторюються при наступному запуску, але не більше
+    JOB_MAX_ATTEMPTS разів (WorkQueue.reject), після чого завдання позначається failed.
+    """
+    metrics.start_run("writer")
+    queue = WorkQueue(queue_path)
+    conn = create_connection()
+    committed = []
+    try:
+        with conn.cursor() as cursor:
+            ensure_schema(cursor)
+            plat_cache = {}
+            cursor.execute("SELECT * FROM platform")
+            for p in cursor.fetchall(): plat_cache[p['name']] = p['platform_id']
+            gen_cache = load_genre_cache(cursor)
+            title_index = TitleIndex.load()
+            title_index.refresh(cursor)
+            film_writer = FilmBatchWriter(conn, cursor, gen_cache, plat_cache)
+
+            last_result_id = 0
+            while True:
+                items = queue.fetch_results(after=last_result_id, limit=FILM_BATCH_SIZE)
+                if not items:
+                    film_writer.flush()
+                    queue.ack(committed); committed.clear()
+                    if not follow:
+                        break
+                    time.sleep(QUEUE_POLL_INTERVAL)
+                    continue
+
+                for item in items:
+                    last_result_id = item['result_id']
+                    payload, result = item['payload'], item['result']
+                    on_commit = lambda result_id=item['result_id']: committed.append(result_id)
+                    on_error = lambda e, result_id=item['result_id']: queue.reject([result_id], e)
+
+                    if item['kind'] == JOB_FILM:
+                        if not has_platform_data(result):
+                            film_writer.mark_refreshed(payload['film_id'], on_commit=on_commit, on_error=on_error)
+                        else:
+                            film_writer.add(payload['film_id'], result, on_commit=on_commit, on_error=on_error)
+                        continue
+
+                    print(f"\n--- Запит: '{payload['name']}' ---")
+                    genre_snapshot = dict(gen_cache)
+                    try:
+                        outcome = save_search_result(cursor, title_index, result, gen_cache, plat_cache)
+                        mark_processed(cursor, payload['log_id'])
+                        with metrics.timer("db_commit"):
+                            conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        gen_cache.clear(); gen_cache.update(genre_snapshot)
+                        print(f"    [!] Не вдалося записати запит '{payload['name']}': {e}")
+                        outcome = "failed"
+                        on_error(e)
+                    else:
+                        on_commit()
+                    metrics.count("queries", outcome=outcome)
+                queue.ack(committed); committed.clear()
+
+            title_index.save()
+            print(f"\n--- Записано фільмів: {film_writer.written}, з помилками: {film_writer.failed} ---")
+    finally:
+        queue.ack(committed)
+        queue.close(); conn.close()
+        metrics.finish_run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Конвеєр парсингу: черга завдань, воркери та записувач у БД")
+    commands = parser.add_subparsers(dest="command", required=True)
+    schedule = commands.add_parser("schedule", help="поставити завдання в чергу")
+    schedule.add_argument("source", choices=("daily", "monthly"))
+    scrape = commands.add_parser("scrape", help="запустити воркери парсингу")
+    scrape.add_argument("--processes", type=int, default=1)
+    scrape.add_argument("--kind", choices=(JOB_FILM, JOB_QUERY), help="брати лише завдання цього типу")
+    scrape.add_argument("--follow", action="store_true", help="не завершуватись, коли черга порожня")
+    write = commands.add_parser("write", help="записати результати в БД")
+    write.add_argument("--follow", action="store_true", help="не завершуватись, коли результатів немає")
+    commands.add_parser("status", help="показати стан черги")
+    parser.add_argument("--queue", default=WORK_QUEUE_PATH, help="шлях до файлу черги")
+    args = parser.parse_args()
+
+    if args.command == "schedule":
+        queue = WorkQueue(args.queue)
+        conn = create_connection()
+        try:
+            added = (schedule_daily if args.source == "daily" else schedule_monthly)(queue, conn)
+            print(f"--- У черзі нових завдань: {added}; видалено старих: {queue.purge()} ---")
+        finally:
+            queue.close(); conn.close()
+    elif args.command == "scrape":
+        run_workers(args.processes, [args.kind] if args.kind else None, args.follow, args.queue)
+    elif args.command == "write":
+        run_writer(args.follow, args.queue)
+    else:
+        queue = WorkQueue(args.queue)
+        print(f"--- Стан черги: {queue.counts()} ---")
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
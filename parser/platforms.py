@@ -0,0 +1,289 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from core import (
+    FILM_FIELDS, apply_film_changes, is_changed, create_sweettv_driver, forget_resolution,
+    search_megogo, parse_film_page_megogo, parse_megogo_options, parse_sweettv_options
+)
+from driver_pool import DriverPool
+from megogo_async import MegogoAsyncClient
+from normalize import film_column_values, normalize_platform_rows, normalize_record
+from search_index import affects_search, refresh_search_index
+from sweettv_http import fetch_sweettv, search_sweettv_http, parse_film_page_sweettv_http
+
+# Зареєстровані платформи: назва (як у таблиці platform) -> клас адаптера.
+# Порядок реєстрації — пріоритет: повні дані фільму та постер беруться з першої платформи, що їх має.
+PLATFORMS = {}
+
+
+def register_platform(adapter_cls):
+    PLATFORMS[adapter_cls.name] = adapter_cls
+    return adapter_cls
+
+
+def get_platforms(names=None):
+    """Класи адаптерів у порядку пріоритету; names обмежує набір платформ."""
+    if names is None:
+        return list(PLATFORMS.values())
+    return [adapter_cls for name, adapter_cls in PLATFORMS.items() if name in names]
+
+
+class HostThrottle:
+    """Обмежує кількість одночасних запитів до хоста та мінімальний інтервал між ними."""
+
+    def __init__(self, max_concurrent, min_interval):
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._min_interval = min_interval
+        self._next_at = 0.0
+
+    def __enter__(self):
+        self._slots.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self._min_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
+
+
+class PlatformAdapter(ABC):
+    """
+    Контракт платформи: search (назва -> збіг з url та poster_url), fetch (збіг -> дані фільму),
+    parse_options (ціни з даних -> рядки film_platform). Адаптер без будь-якого з них не створиться.
+    Усе, що не залежить від з'єднань (ключі результату, розбір цін, колонка з URL), — на рівні
+    класу, тож запис у БД працює без екземплярів адаптерів.
+
+    data_key / poster_key — ключі результату CrawlEngine; options_field — поле даних з цінами;
+    url_field — поле даних з URL сторінки фільму; url_column — колонка films, куди цей URL
+    пишеться (None — не пишеться). Назва платформи має бути в таблиці platform.
+    """
+    name = None
+    host = None
+    data_key = None
+    poster_key = None
+    options_field = None
+    url_field = 'url'
+    url_column = None
+    workers = 2
+    min_interval = 0.5
+
+    def __init__(self, cookies, workers=None, min_interval=None, page_cache=None, resolution_cache=None):
+        self.cookies = cookies
+        self.page_cache = page_cache
+        self.resolution_cache = resolution_cache
+        self.workers = workers or self.workers
+        self.min_interval = self.min_interval if min_interval is None else min_interval
+        self.throttle = HostThrottle(self.workers, self.min_interval)
+        self._pool = self._create_pool()
+
+    def _create_pool(self):
+        """Пул потоків для scrape(); адаптер з власним асинхронним клієнтом повертає None."""
+        return ThreadPoolExecutor(self.workers, thread_name_prefix=self.host)
+
+    @abstractmethod
+    def search(self, film_name):
+        """Назва фільму -> збіг {"url", "poster_url", ...} або None."""
+
+    @abstractmethod
+    def fetch(self, match):
+        """Збіг із search -> дані фільму або None."""
+
+    @staticmethod
+    @abstractmethod
+    def parse_options(film_id, platform_id, options):
+        """Значення options_field -> рядки film_platform (film_id, platform_id, access_type, price)."""
+
+    @classmethod
+    def options_to_rows(cls, film_id, platform_id, data):
+        if data and data.get(cls.options_field):
+            return cls.parse_options(film_id, platform_id, data[cls.options_field])
+        return []
+
+    def scrape(self, film_name):
+        """Пошук + сторінка фільму. Повертає (data, poster_url з картки пошуку)."""
+        with self.throttle:
+            match = self.search(film_name)
+        if not match:
+            return None, None
+        with self.throttle:
+            data = self.fetch(match)
+        if data is None:
+            forget_resolution(self.resolution_cache, self.name, film_name)
+        return data, match.get('poster_url')
+
+    def submit(self, film_name):
+        """concurrent.futures.Future з (data, poster_url)."""
+        return self._pool.submit(self.scrape, film_name)
+
+    def http_stats(self):
+        """Лічильники власного HTTP-клієнта адаптера; None — адаптер ходить через спільну сесію core."""
+        return None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+@register_platform
+class MegogoAdapter(PlatformAdapter):
+    """Megogo — спільна HTTP-сесія core; з use_async=True запити йдуть через один asyncio-клієнт."""
+    name = 'Megogo'
+    host = 'megogo.net'
+    data_key = 'megogo_data'
+    poster_key = 'm_poster'
+    options_field = 'access_options_megogo'
+    workers = 4
+    min_interval = 0.25
+    parse_options = staticmethod(parse_megogo_options)
+
+    def __init__(self, cookies, workers=None, min_interval=None, page_cache=None, resolution_cache=None, use_async=False):
+        self.use_async = use_async
+        super().__init__(cookies, workers, min_interval, page_cache, resolution_cache)
+        self._client = None
+        if use_async:
+            self._client = MegogoAsyncClient(max_in_flight=self.workers, min_interval=self.min_interval)
+
+    def _create_pool(self):
+        return None if self.use_async else super()._create_pool()
+
+    def search(self, film_name):
+        return search_megogo(film_name, self.resolution_cache)
+
+    def fetch(self, match):
+        return parse_film_page_megogo(match['url'], self.page_cache, skip_unchanged=self.page_cache is not None)
+
+    def submit(self, film_name):
+        if self._client is None:
+            return super().submit(film_name)
+        return self._client.submit(film_name, self.page_cache, skip_unchanged=self.page_cache is not None,
+                                   resolution_cache=self.resolution_cache)
+
+    def http_stats(self):
+        return self._client.stats if self._client is not None else None
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        super().close()
+
+
+@register_platform
+class SweetTvAdapter(PlatformAdapter):
+    """Sweet.tv — спершу звичайний HTTP, браузер із пулу лише за потреби."""
+    name = 'Sweet.tv'
+    host = 'sweet.tv'
+    data_key = 'sweettv_data'
+    poster_key = 's_poster'
+    options_field = 'access_options_PK'
+    url_field = 'url_sweet_tv'
+    url_column = 'url_sweet_tv'
+    parse_options = staticmethod(parse_sweettv_options)
+
+    def __init__(self, cookies, workers=None, min_interval=None, page_cache=None, resolution_cache=None,
+                 http_first=True, driver_factory=None):
+        super().__init__(cookies, workers, min_interval, page_cache, resolution_cache)
+        self.http_first = http_first
+        self._driver_pool = DriverPool(cookies, size=self.workers, driver_factory=driver_factory or create_sweettv_driver)
+
+    def search(self, film_name):
+        return search_sweettv_http(film_name, self.cookies, True, self.resolution_cache)
+
+    def fetch(self, match):
+        return parse_film_page_sweettv_http(match['url'], self.cookies, True)
+
+    def scrape(self, film_name):
+        # HTTP і браузер чергуються всередині fetch_sweettv, тож обмежуємо весь етап
+        with self.throttle:
+            return fetch_sweettv(film_name, self.cookies, self._driver_pool,
+                                 http_first=self.http_first, resolution_cache=self.resolution_cache)
+
+    def close(self):
+        super().close()
+        self._driver_pool.close()
+
+
+def empty_result(film):
+    result = {"film": film}
+    for adapter_cls in PLATFORMS.values():
+        result[adapter_cls.data_key] = None
+        result[adapter_cls.poster_key] = None
+    return result
+
+
+def result_fields():
+    """Ключі результату CrawlEngine з даними платформ (без film)."""
+    return tuple(key for adapter_cls in PLATFORMS.values() for key in (adapter_cls.data_key, adapter_cls.poster_key))
+
+
+def has_platform_data(result):
+    return any(result.get(adapter_cls.data_key) for adapter_cls in PLATFORMS.values())
+
+
+def primary_data(result):
+    """Дані першої за пріоритетом платформи, що знайшла фільм, — з них беруться поля films."""
+    return next((result[adapter_cls.data_key] for adapter_cls in PLATFORMS.values() if result.get(adapter_cls.data_key)), None)
+
+
+def platform_urls(result):
+    """URL сторінок фільму на платформах, що його знайшли, у порядку пріоритету."""
+    return [result[adapter_cls.data_key][adapter_cls.url_field] for adapter_cls in PLATFORMS.values()
+            if result.get(adapter_cls.data_key) and result[adapter_cls.data_key].get(adapter_cls.url_field)]
+
+
+def build_film_changes(film_id, result, platform_cache):
+    """
+    Обчислює, що треба записати для фільму, без звернень до БД (поля й ціни — після normalize):
+    поля films, список жанрів (None — жанри не чіпаємо), рядки film_platform по кожній
+    платформі, що перезаписується, та film_urls — колонки films з URL на платформах, які треба оновити.
+    Сторінка, не змінена з минулого запису ('unchanged'), не перезаписує ні поля фільму, ні ціни платформи.
+    """
+    full_data = primary_data(result)
+    if full_data and full_data.get('unchanged'):
+        full_data = None
+    if full_data:
+        full_data = normalize_record(full_data)
+
+    changes = {"film_id": film_id, "film_fields": None, "genres": None, "platform_rows": {}, "film_urls": {}}
+    if full_data:
+        poster_to_save = full_data.get('poster_url')
+        for adapter_cls in PLATFORMS.values():
+            if not poster_to_save:
+                poster_to_save = result.get(adapter_cls.poster_key)
+        columns = film_column_values(full_data)
+        changes["film_fields"] = {field: columns.get(field) for field in FILM_FIELDS}
+        changes["film_fields"]['poster_url'] = poster_to_save
+        changes["genres"] = full_data['geners']
+
+    for adapter_cls in PLATFORMS.values():
+        data = result.get(adapter_cls.data_key)
+        if data and data.get('unchanged'):
+            continue
+        platform_id = platform_cache[adapter_cls.name]
+        changes["platform_rows"][platform_id] = normalize_platform_rows(adapter_cls.options_to_rows(film_id, platform_id, data))
+        if adapter_cls.url_column and data and data.get(adapter_cls.options_field):
+            changes["film_urls"][adapter_cls.url_column] = data.get(adapter_cls.url_field)
+    return changes
+
+
+def save_and_normalize_data(cursor, film_id, result, genre_cache, platform_cache):
+    try:
+        changes = build_film_changes(film_id, result, platform_cache)
+        summary = apply_film_changes(cursor, changes, genre_cache)
+        if affects_search(changes, summary):
+            refresh_search_index(cursor, [film_id])
+        if is_changed(summary):
+            print(f"     Дані для ID {film_id} успішно оновлено.")
+        else:
+            print(f"     Дані для ID {film_id} оновлено, ціни та жанри без змін.")
+        return summary
+
+    except Exception as e:
+        print(f"    [!] Помилка save_and_normalize_data: {e}")
+        raise
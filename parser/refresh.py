@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime, timedelta
+import pymysql.cursors
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+CHECKPOINT_PATH = os.path.join(base_dir, 'monthly_checkpoint.json')
+# Звичайний фільм оновлюється раз на стільки днів
+REFRESH_INTERVAL = timedelta(days=30)
+# Фільм, ціни якого змінювались протягом PRICE_CHANGE_WINDOW, оновлюється частіше
+VOLATILE_REFRESH_INTERVAL = timedelta(days=7)
+PRICE_CHANGE_WINDOW = timedelta(days=60)
+# Скільки фільмів читається з серверного курсора за один запит
+STREAM_PAGE_SIZE = 500
+# Значення last_refreshed_at за замовчуванням (див. schema.FILMS_COLUMNS)
+NEVER_REFRESHED = datetime(1970, 1, 1)
+
+STALE_CONDITION = """
+    last_refreshed_at < %s
+    AND (last_refreshed_at < %s OR (last_price_change_at >= %s AND last_refreshed_at < %s))
+"""
+
+
+def stale_params(run_started_at):
+    """Параметри STALE_CONDITION: хто вже оновлений у цьому запуску — не береться повторно."""
+    return (
+        run_started_at,
+        run_started_at - REFRESH_INTERVAL,
+        run_started_at - PRICE_CHANGE_WINDOW,
+        run_started_at - VOLATILE_REFRESH_INTERVAL,
+    )
+
+
+def count_stale_films(cursor, run_started_at):
+    cursor.execute(f"SELECT COUNT(*) AS total FROM films WHERE {STALE_CONDITION}", stale_params(run_started_at))
+    return cursor.fetchone()['total']
+
+
+def stream_stale_films(conn, run_started_at, page_size=STREAM_PAGE_SIZE):
+    """
+    Генерує {id, name} фільмів, яким пора оновитись, від найдавніше оновлених.
+    Читає серверним курсором сторінками по (last_refreshed_at, id), тому результат
+    не тримається відкритим, поки фільми обробляються. conn має бути окремим
+    з'єднанням: у нього не повинно бути інших запитів під час читання.
+    """
+    last_key = (NEVER_REFRESHED, 0)
+    while True:
+        with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute(
+                f"SELECT id, name, last_refreshed_at FROM films WHERE {STALE_CONDITION} "
+                "AND (last_refreshed_at, id) > (%s, %s) ORDER BY last_refreshed_at, id LIMIT %s",
+                stale_params(run_started_at) + last_key + (page_size,)
+            )
+            page = [row for row in cursor]
+        conn.commit()
+        for row in page:
+            yield {"id": row['id'], "name": row['name']}
+        if len(page) < page_size:
+            return
+        last_key = (page[-1]['last_refreshed_at'], page[-1]['id'])
+
+
+class RunCheckpoint:
+    """
+    Стан щомісячного запуску на диску. Прогрес фіксується в БД через last_refreshed_at,
+    а тут зберігається час старту, щоб після збою продовжити той самий запуск
+    (з тими ж межами свіжості), а не почати новий.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self.state = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        self.resumed = self.state is not None
+
+    def start(self, now):
+        """Повертає час старту запуску: збережений, якщо попередній запуск не завершився."""
+        if self.state is None:
+            self.state = {"started_at": now.isoformat(), "refreshed": 0}
+            self._save()
+        return datetime.fromisoformat(self.state["started_at"])
+
+    def advance(self, count):
+        self.state["refreshed"] += count
+        self._save()
+
+    def finish(self):
+        self.state = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+import time
+from core import normalize_title
+from work_queue import SQLITE_BUSY_TIMEOUT
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+RESOLUTION_CACHE_PATH = os.path.join(base_dir, 'resolution_cache.sqlite')
+# Скільки пам'ятаємо знайдений фільм і скільки — те, що фільму на платформі немає
+RESOLUTION_TTL = 45 * 24 * 3600
+RESOLUTION_MISS_TTL = 7 * 24 * 3600
+
+
+class ResolutionCache:
+    """
+    Постійний кеш "нормалізований запит -> результат пошуку" для кожної платформи.
+    get() повертає (hit, match): match — той самий dict, що й search_*, або None,
+    якщо минулого разу фільм на платформі не знайшли.
+    """
+
+    def __init__(self, path=RESOLUTION_CACHE_PATH, ttl=RESOLUTION_TTL, miss_ttl=RESOLUTION_MISS_TTL):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        # Кеш спільний для воркерів пайплайна й запусків cron: WAL і очікування замість "database is locked"
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS resolutions (
+                platform TEXT NOT NULL,
+                query TEXT NOT NULL,
+                url TEXT,
+                title TEXT,
+                poster_url TEXT,
+                resolved_at REAL NOT NULL,
+                PRIMARY KEY (platform, query)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, platform, query):
+        key = normalize_title(query)
+        if not key:
+            return False, None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, title, poster_url, resolved_at FROM resolutions WHERE platform = ? AND query = ?",
+                (platform, key)
+            ).fetchone()
+            age = time.time() - row[3] if row else None
+            if row is None or age > (self.ttl if row[0] else self.miss_ttl):
+                self.stats["misses"] += 1
+                return False, None
+            self.stats["hits"] += 1
+        if not row[0]:
+            return True, None
+        return True, {"url": row[0], "title": row[1], "poster_url": row[2]}
+
+    def put(self, platform, query, match):
+        key = normalize_title(query)
+        if not key:
+            return
+        match = match or {}
+        with self._lock:
+            self._conn.execute(
+                "REPLACE INTO resolutions (platform, query, url, title, poster_url, resolved_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (platform, key, match.get("url"), match.get("title"), match.get("poster_url"), time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, platform, query):
+        key = normalize_title(query)
+        with self._lock:
+            self._conn.execute("DELETE FROM resolutions WHERE platform = ? AND query = ?", (platform, key))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
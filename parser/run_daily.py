@@ -1,98 +1,214 @@
+import argparse
+import itertools
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from core import (
-    create_connection, load_cookies, save_and_normalize_data, normalize_title,
-    search_megogo, parse_film_page_megogo,
-    search_sweettv, parse_film_page_sweettv
-)
+import metrics
+from core import create_connection, load_cookies, load_genre_cache
+from crawler import CrawlEngine
+from platforms import SweetTvAdapter, has_platform_data, primary_data, save_and_normalize_data
+from resolution_cache import ResolutionCache
+from schema import ensure_schema
+from title_index import TitleIndex
+from work_queue import worker_name
+
+# Скільки часу щоденний запуск може витратити на запити (секунди)
+DAILY_TIME_BUDGET = 40 * 60
+# Межі розміру порції запитів, що забирається за раз
+DAILY_INITIAL_BATCH = 20
+DAILY_MIN_BATCH = 5
+DAILY_MAX_BATCH = 200
+# Скільки запит лишається за воркером; після цього (воркер упав) його може забрати інший
+DAILY_CLAIM_LEASE = 30 * 60
+
+def claim_queries(cursor, token, limit, lease=DAILY_CLAIM_LEASE):
+    """
+    Атомарно забирає до limit необроблених запитів, найпопулярніші й найсвіжіші першими.
+    Один UPDATE ... ORDER BY ... LIMIT, тож кілька воркерів не отримають той самий запит.
+    token має бути унікальним для кожної порції. Коміт — на викликачеві.
+    """
+    cursor.execute("""
+        UPDATE search_log SET claimed_by = %s, claimed_until = NOW() + INTERVAL %s SECOND
+        WHERE is_processed = 0 AND (claimed_until IS NULL OR claimed_until < NOW())
+        ORDER BY search_count DESC, last_searched_at DESC
+        LIMIT %s
+    """, (token, lease, limit))
+    cursor.execute("""
+        SELECT log_id, query_text, search_count FROM search_log
+        WHERE claimed_by = %s AND is_processed = 0
+        ORDER BY search_count DESC, last_searched_at DESC
+    """, (token,))
+    return cursor.fetchall()
+
+def mark_processed(cursor, log_id):
+    cursor.execute("UPDATE search_log SET is_processed = 1, claimed_by = NULL, claimed_until = NULL WHERE log_id = %s", (log_id,))
+
+def release_claims(cursor, worker):
+    """Повертає необроблені запити воркера (наприклад, після збою) іншим воркерам."""
+    cursor.execute("""
+        UPDATE search_log SET claimed_by = NULL, claimed_until = NULL
+        WHERE is_processed = 0 AND claimed_by LIKE %s
+    """, (worker + '#%',))
+    return cursor.rowcount
+
+class BatchSizer:
+    """
+    Розмір наступної порції за фактичною швидкістю обробки та залишком часового бюджету:
+    забираємо стільки, скільки встигнемо обробити, враховуючи запити, що вже "в польоті".
+    """
+
+    def __init__(self, budget=DAILY_TIME_BUDGET, initial=DAILY_INITIAL_BATCH, min_batch=DAILY_MIN_BATCH,
+                 max_batch=DAILY_MAX_BATCH, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.deadline = self.started + budget
+        self.initial = initial
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.claimed = 0
+        self.processed = 0
+
+    def next_size(self):
+        now = self.clock()
+        remaining = self.deadline - now
+        if remaining <= 0:
+            return 0
+        if not self.processed or now <= self.started:
+            return self.initial if not self.claimed else self.min_batch
+        rate = self.processed / (now - self.started)
+        estimate = rate * remaining - (self.claimed - self.processed)
+        if estimate < 1:
+            return 0
+        return int(max(self.min_batch, min(self.max_batch, estimate)))
+
+def iter_claimed_queries(claim, sizer):
+    """Генерує запити порціями, поки вони є і поки бюджет дозволяє; claim(limit) повертає рядки."""
+    while True:
+        size = sizer.next_size()
+        if size <= 0:
+            print("\n--- Часовий бюджет вичерпано, решта запитів лишається на наступний запуск ---")
+            return
+        logs = claim(size)
+        if not logs:
+            return
+        sizer.claimed += len(logs)
+        yield from logs
+
+def close_known_queries(cursor, title_index, logs):
+    """
+    Закриває запити, чия назва точно (з точністю до регістру, пунктуації чи транслітерації)
+    збігається з фільмом у базі, без жодного мережевого виклику. Нечіткий збіг лише
+    логується: схожа назва може бути іншим фільмом (сиквел, рімейк), тож такий запит
+    парситься як звичайно. Повертає решту запитів. Коміт — на викликачеві.
+    """
+    pending_logs = []
+    for log in logs:
+        film_id = title_index.exact_lookup(log['query_text'])
+        if film_id is not None:
+            print(f"     '{log['query_text']}': фільм вже є в базі (ID {film_id}). ПРОПУСКАЄМО.")
+            metrics.count("queries", outcome="indexed")
+            mark_processed(cursor, log['log_id'])
+            continue
+        similar = title_index.lookup(log['query_text'])
+        if similar:
+            print(f"     '{log['query_text']}': схожий фільм у базі (ID {similar[0]}, схожість {similar[1]:.2f}), але назва не збігається — парсимо.")
+            metrics.count("queries", outcome="fuzzy_hint")
+        pending_logs.append(log)
+    return pending_logs
+
+def save_search_result(cursor, title_index, result, genre_cache, platform_cache):
+    """
+    Створює фільм за результатом пошуку (результат CrawlEngine), якщо його ще немає в базі.
+    Коміт — на викликачеві. Повертає підсумок для метрик: not_found, exists або created.
+    """
+    if not has_platform_data(result):
+        print("    [!] Нічого не знайдено.")
+        return "not_found"
+
+    full_data = primary_data(result)
+    norm_name = full_data.get('normalized_name')
+
+    cursor.execute("SELECT id FROM films WHERE normalized_name = %s", (norm_name,))
+    existing = cursor.fetchone()
+    if existing:
+        print(f"     Фільм вже є в базі (ID {existing['id']}). ПРОПУСКАЄМО.")
+        return "exists"
+
+    print(f"    > Створення нового фільму: '{full_data['name']}'...")
+    cursor.execute("""
+        INSERT INTO films (name, normalized_name) VALUES (%s, %s)
+    """, (full_data['name'], norm_name))
+    new_id = cursor.lastrowid
+    title_index.add(new_id, full_data['name'])
+
+    save_and_normalize_data(cursor, new_id, result, genre_cache, platform_cache)
+    return "created"
 
 def main():
+    parser = argparse.ArgumentParser(description="Щоденна обробка пошукових запитів")
+    parser.add_argument("--budget", type=float, default=DAILY_TIME_BUDGET / 60, help="часовий бюджет, хвилин")
+    parser.add_argument("--sweettv-workers", type=int, default=SweetTvAdapter.workers)
+    args = parser.parse_args()
+
+    print(f"--- Метрики запуску: {metrics.start_run('daily')} ---")
+    worker = worker_name()
     conn = create_connection()
+    # Окреме з'єднання для захоплення запитів: claim комітиться одразу, незалежно від записів
+    claim_conn = create_connection()
     cookies = load_cookies()
-    
-    options = Options()
-    options.add_argument("--start-maximized")
-    options.add_argument("--headless") 
-    driver = webdriver.Chrome(options=options)
-    
-    driver.get("https://sweet.tv")
-    time.sleep(2)
-    for cookie in cookies:
-        try: driver.add_cookie(cookie)
-        except: pass
+    resolution_cache = ResolutionCache()
+    engine = CrawlEngine(cookies, sweettv_workers=args.sweettv_workers, megogo_async=True, resolution_cache=resolution_cache)
+    sizer = BatchSizer(budget=args.budget * 60)
 
     try:
-        with conn.cursor() as cursor:
-            plat_cache = {}; gen_cache = {}
+        with conn.cursor() as cursor, claim_conn.cursor() as claim_cursor:
+            ensure_schema(cursor)
+            plat_cache = {}
             cursor.execute("SELECT * FROM platform")
             for p in cursor.fetchall(): plat_cache[p['name']] = p['platform_id']
-            cursor.execute("SELECT * FROM genre")
-            for g in cursor.fetchall(): gen_cache[g['name']] = g['genre_id']
-
-            cursor.execute("SELECT log_id, query_text FROM search_log WHERE is_processed = 0 LIMIT 50")
-            logs = cursor.fetchall()
-            print(f"\n--- Щоденна обробка логів: {len(logs)} запитів ---")
-
-            for log in logs:
-                query = log['query_text']
-                log_id = log['log_id']
-                print(f"\n--- Запит: '{query}' ---")
-
-                megogo_data = None
-                sweettv_data = None
-                m_poster = None; s_poster = None
-
-                m_match = search_megogo(query)
-                if m_match:
-                    megogo_data = parse_film_page_megogo(m_match['url'])
-                    m_poster = m_match.get('poster_url')
-
-                need_s_poster = not m_poster and not (megogo_data and megogo_data.get('poster_url'))
-                s_match = search_sweettv(driver, query, get_poster=need_s_poster)
-                if s_match:
-                    driver.get(s_match['url'])
-                    sweettv_data = parse_film_page_sweettv(driver, megogo_data is None)
-                    if sweettv_data:
-                        sweettv_data['url_sweet_tv'] = s_match['url']
-                        s_poster = s_match.get('poster_url')
-
-                if not megogo_data and not sweettv_data:
-                    print("    [!] Нічого не знайдено.")
-                    cursor.execute("UPDATE search_log SET is_processed = 1 WHERE log_id = %s", (log_id,))
+            gen_cache = load_genre_cache(cursor)
+            conn.commit()
+
+            title_index = TitleIndex.load()
+            print(f"--- Індекс назв: +{title_index.refresh(cursor)} нових фільмів, всього {len(title_index)} ---")
+
+            batches = itertools.count(1)
+
+            def claim(limit):
+                # Запити, відомі індексу назв, закриваються одразу й у швидкість обробки не входять
+                while True:
+                    logs = claim_queries(claim_cursor, f"{worker}#{next(batches)}", limit)
+                    pending_logs = close_known_queries(claim_cursor, title_index, logs)
+                    claim_conn.commit()
+                    if logs:
+                        print(f"\n--- Забрано {len(logs)} запитів (порція до {limit}), до парсингу: {len(pending_logs)} ---")
+                    if pending_logs or not logs:
+                        return pending_logs
+
+            films = ({"id": log['log_id'], "name": log['query_text']} for log in iter_claimed_queries(claim, sizer))
+            for result in engine.crawl(films):
+                log_id = result['film']['id']
+                print(f"\n--- Запит: '{result['film']['name']}' ---")
+                outcome = save_search_result(cursor, title_index, result, gen_cache, plat_cache)
+                metrics.count("queries", outcome=outcome)
+                mark_processed(cursor, log_id)
+                with metrics.timer("db_commit"):
                     conn.commit()
-                    continue
-
-                full_data = megogo_data if megogo_data else sweettv_data
-                norm_name = full_data.get('normalized_name')
-                
-                cursor.execute("SELECT id FROM films WHERE normalized_name = %s", (norm_name,))
-                existing = cursor.fetchone()
-
-                if existing:
-                    print(f"     Фільм вже є в базі (ID {existing['id']}). ПРОПУСКАЄМО.")
-                else:
-
-                    print(f"    > Створення нового фільму: '{full_data['name']}'...")
-                    
-                    cursor.execute("""
-                        INSERT INTO films (name, normalized_name) VALUES (%s, %s)
-                    """, (full_data['name'], norm_name))
-                    new_id = cursor.lastrowid
-                    
-                    save_and_normalize_data(
-                        cursor, new_id, 
-                        megogo_data, sweettv_data, 
-                        gen_cache, plat_cache, 
-                        m_poster, s_poster
-                    )
-
-                cursor.execute("UPDATE search_log SET is_processed = 1 WHERE log_id = %s", (log_id,))
-                conn.commit()
-                time.sleep(1)
+                sizer.processed += 1
+
+            title_index.save()
+            print(f"\n--- Оброблено запитів: {sizer.processed} за {time.monotonic() - sizer.started:.0f} с ---")
+            print(f"--- HTTP: {engine.http_stats()} ---")
 
     finally:
-        driver.quit(); conn.close()
+        engine.close(); resolution_cache.close()
+        try:
+            with claim_conn.cursor() as claim_cursor:
+                released = release_claims(claim_cursor, worker)
+            claim_conn.commit()
+            if released:
+                print(f"--- Повернуто незавершених запитів: {released} ---")
+        finally:
+            claim_conn.close(); conn.close()
+            metrics.finish_run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,78 +1,69 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from core import (
-    create_connection, load_cookies, save_and_normalize_data,
-    search_megogo, parse_film_page_megogo,
-    search_sweettv, parse_film_page_sweettv
-)
+import metrics
+from core import create_connection, load_cookies, load_genre_cache
+from crawler import CrawlEngine
+from db_writer import FilmBatchWriter
+from page_cache import PageCache
+from platforms import has_platform_data, platform_urls
+from refresh import RunCheckpoint, count_stale_films, stream_stale_films
+from resolution_cache import ResolutionCache
+from schema import ensure_schema
 
 def main():
+    print(f"--- Метрики запуску: {metrics.start_run('monthly')} ---")
     conn = create_connection()
+    # Окреме з'єднання для серверного курсора, поки основне пише результати
+    stream_conn = create_connection()
+    checkpoint = RunCheckpoint()
     cookies = load_cookies()
-    
-    options = Options()
-    options.add_argument("--start-maximized")
-    options.add_argument("--headless") 
-    driver = webdriver.Chrome(options=options)
-    driver.get("https://sweet.tv")
-    time.sleep(2)
-    for cookie in cookies:
-        try: driver.add_cookie(cookie)
-        except: pass
+    page_cache = PageCache()
+    resolution_cache = ResolutionCache()
+    engine = CrawlEngine(cookies, megogo_async=True, page_cache=page_cache, resolution_cache=resolution_cache)
     
     try:
         with conn.cursor() as cursor:
-            plat_cache = {}; gen_cache = {}
+            ensure_schema(cursor)
+            plat_cache = {}
             cursor.execute("SELECT * FROM platform")
             for p in cursor.fetchall(): plat_cache[p['name']] = p['platform_id']
-            cursor.execute("SELECT * FROM genre")
-            for g in cursor.fetchall(): gen_cache[g['name']] = g['genre_id']
-            cursor.execute("SELECT id, name FROM films")
-            films = cursor.fetchall()
-            print(f"\n--- Щомісячне оновлення: {len(films)} фільмів ---")
+            gen_cache = load_genre_cache(cursor)
+            cursor.execute("SELECT NOW() AS now")
+            run_started_at = checkpoint.start(cursor.fetchone()['now'])
+            conn.commit()
+            if checkpoint.resumed:
+                print(f"\n--- Продовжуємо запуск від {run_started_at}: вже оновлено {checkpoint.state['refreshed']} фільмів ---")
+            print(f"\n--- Щомісячне оновлення: {count_stale_films(cursor, run_started_at)} фільмів потребують оновлення ---")
+            writer = FilmBatchWriter(conn, cursor, gen_cache, plat_cache, on_flush=checkpoint.advance)
 
-            for film in films:
-                film_id = film['id']
-                film_name = film['name']
+            for result in engine.crawl(stream_stale_films(stream_conn, run_started_at)):
+                film_id = result['film']['id']
+                film_name = result['film']['name']
                 print(f"\n--- Оновлення ID {film_id}: '{film_name}' ---")
 
-                megogo_data = None
-                sweettv_data = None
-                m_poster_fallback = None
-                s_poster_fallback = None
-
-                # Megogo
-                m_match = search_megogo(film_name)
-                if m_match:
-                    megogo_data = parse_film_page_megogo(m_match['url'])
-                    m_poster_fallback = m_match.get('poster_url')
-
-                # Sweet.tv
-                need_s_poster = not m_poster_fallback and not (megogo_data and megogo_data.get('poster_url'))
-                s_match = search_sweettv(driver, film_name, get_poster=need_s_poster)
-                if s_match:
-                    driver.get(s_match['url'])
-                    sweettv_data = parse_film_page_sweettv(driver, megogo_data is None)
-                    if sweettv_data:
-                        sweettv_data['url_sweet_tv'] = s_match['url']
-                        s_poster_fallback = s_match.get('poster_url')
-
-                if not megogo_data and not sweettv_data:
+                if not has_platform_data(result):
                     print("    [!] Дані не знайдено. Пропуск.")
+                    metrics.count("films", outcome="no_data")
+                    writer.mark_refreshed(film_id)
                     continue
+                metrics.count("films", outcome="found")
+
+                def on_commit(urls=platform_urls(result)):
+                    for url in urls:
+                        page_cache.mark_processed(url)
+                writer.add(film_id, result, on_commit=on_commit)
 
-                save_and_normalize_data(
-                    cursor, film_id, 
-                    megogo_data, sweettv_data, 
-                    gen_cache, plat_cache, 
-                    m_poster_fallback, s_poster_fallback
-                )
-                conn.commit()
-                time.sleep(1)
+            writer.flush()
+            checkpoint.finish()
+            print(f"\n--- Записано фільмів: {writer.written}, з помилками: {writer.failed}, зі зміною цін чи жанрів: {len(writer.changed)} ---")
+            page_cache.evict()
+            print(f"\n--- Кеш сторінок: {page_cache.stats} ---")
+            print(f"--- Кеш пошуку: {resolution_cache.stats} ---")
+            print(f"--- HTTP: {engine.http_stats()} ---")
+            for name, value in page_cache.stats.items():
+                metrics.count("page_cache", value, result=name)
 
     finally:
-        driver.quit(); conn.close()
+        engine.close(); resolution_cache.close(); stream_conn.close(); conn.close()
+        metrics.finish_run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+FILMS_COLUMNS = {
+    # Коли фільм востаннє оновлювався (1970 — ще ніколи)
+    "last_refreshed_at": "DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'",
+    # Коли востаннє змінились ціни на будь-якій платформі
+    "last_price_change_at": "DATETIME NULL",
+}
+
+FILMS_INDEXES = {
+    "idx_films_refresh": "(last_refreshed_at, id)",
+}
+
+SEARCH_LOG_COLUMNS = {
+    # Який щоденний воркер забрав запит і до коли (після цього запит можна забрати знову)
+    "claimed_by": "VARCHAR(100) NULL",
+    "claimed_until": "DATETIME NULL",
+}
+
+SEARCH_LOG_INDEXES = {
+    "idx_search_log_priority": "(is_processed, search_count, last_searched_at)",
+    "idx_search_log_claim": "(claimed_by)",
+}
+
+# Типізована проєкція films/film_platform для фільтрів розширеного пошуку (підтримує search_index.py)
+SEARCH_TABLES = {
+    "film_search": """
+        film_id INT NOT NULL PRIMARY KEY,
+        normalized_name VARCHAR(255) NULL,
+        release_year SMALLINT NULL,
+        duration_min SMALLINT UNSIGNED NULL,
+        imdb_rating DECIMAL(3,1) NULL,
+        access_flags TINYINT UNSIGNED NOT NULL DEFAULT 0,
+        INDEX idx_film_search_year (release_year),
+        INDEX idx_film_search_duration (duration_min),
+        INDEX idx_film_search_rating (imdb_rating),
+        INDEX idx_film_search_flags (access_flags)
+    """,
+    "film_search_country": """
+        country VARCHAR(100) NOT NULL,
+        film_id INT NOT NULL,
+        PRIMARY KEY (country, film_id),
+        INDEX idx_film_search_country_film (film_id)
+    """,
+    "film_search_price": """
+        film_id INT NOT NULL,
+        platform_id INT NOT NULL,
+        access_class VARCHAR(16) NOT NULL,
+        min_price DECIMAL(10,2) NULL,
+        PRIMARY KEY (film_id, platform_id, access_class),
+        INDEX idx_film_search_price (access_class, platform_id, min_price)
+    """,
+}
+
+# Готові схожі фільми для рекомендацій (підтримує film_similarity.py)
+SIMILARITY_TABLES = {
+    "film_similarity": """
+        film_id INT NOT NULL,
+        similar_film_id INT NOT NULL,
+        score FLOAT NOT NULL,
+        PRIMARY KEY (film_id, similar_film_id),
+        INDEX idx_film_similarity_score (film_id, score)
+    """,
+    # Відбиток оцінок, емоцій і жанрів фільму на момент останнього розрахунку
+    "film_similarity_state": """
+        film_id INT NOT NULL PRIMARY KEY,
+        fingerprint CHAR(32) NOT NULL,
+        computed_at DATETIME NOT NULL
+    """,
+}
+
+
+def _existing_columns(cursor, table):
+    cursor.execute(
+        "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return {row['name'] for row in cursor.fetchall()}
+
+
+def _existing_indexes(cursor, table):
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return {row['name'] for row in cursor.fetchall()}
+
+
+def ensure_columns(cursor, table, columns):
+    existing = _existing_columns(cursor, table)
+    for name, definition in columns.items():
+        if name not in existing:
+            print(f"    -> Додаємо колонку {table}.{name}")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def ensure_indexes(cursor, table, indexes):
+    existing = _existing_indexes(cursor, table)
+    for name, definition in indexes.items():
+        if name not in existing:
+            print(f"    -> Додаємо індекс {table}.{name}")
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} {definition}")
+
+
+def ensure_tables(cursor, tables):
+    for name, definition in tables.items():
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} ({definition})")
+
+
+def ensure_schema(cursor):
+    """
+    Доповнення схеми, потрібні парсеру. Ідемпотентна: додає лише відсутні колонки,
+    індекси й таблиці, тому її безпечно викликати на початку кожного запуску.
+    """
+    ensure_columns(cursor, "films", FILMS_COLUMNS)
+    ensure_indexes(cursor, "films", FILMS_INDEXES)
+    ensure_columns(cursor, "search_log", SEARCH_LOG_COLUMNS)
+    ensure_indexes(cursor, "search_log", SEARCH_LOG_INDEXES)
+    ensure_tables(cursor, SEARCH_TABLES)
+    ensure_tables(cursor, SIMILARITY_TABLES)
@@ -0,0 +1,149 @@
+from core import create_connection
+from normalize import access_type_name, duration_minutes, imdb_rating, release_year, split_list
+from schema import ensure_schema
+
+# Класи доступу та їхні біти в film_search.access_flags
+ACCESS_FREE = "free"
+ACCESS_SUBSCRIPTION = "subscription"
+ACCESS_RENT = "rent"
+ACCESS_PURCHASE = "purchase"
+ACCESS_FLAGS = {ACCESS_FREE: 1, ACCESS_SUBSCRIPTION: 2, ACCESS_RENT: 4, ACCESS_PURCHASE: 8}
+# Початок access_type у film_platform -> клас доступу
+ACCESS_PREFIXES = (
+    ("безкоштов", ACCESS_FREE),
+    ("підписк", ACCESS_SUBSCRIPTION),
+    ("передплат", ACCESS_SUBSCRIPTION),
+    ("оренд", ACCESS_RENT),
+    ("прокат", ACCESS_RENT),
+    ("купів", ACCESS_PURCHASE),
+    ("покуп", ACCESS_PURCHASE),
+)
+# Скільки фільмів перебудовується за один прохід rebuild_search_index
+SEARCH_INDEX_CHUNK = 500
+
+
+def access_class(access_type):
+    lowered = access_type_name(access_type).lower()
+    return next((cls for prefix, cls in ACCESS_PREFIXES if lowered.startswith(prefix)), None)
+
+
+def build_search_rows(film, platform_rows):
+    """
+    Рядки проєкції для одного фільму без звернень до БД.
+    film — рядок films; platform_rows — (platform_id, access_type, price) з film_platform.
+    Повертає (рядок film_search, рядки film_search_country, рядки film_search_price).
+    """
+    film_id = film['id']
+    min_prices = {}
+    flags = 0
+    for platform_id, access_type, price in platform_rows:
+        cls = access_class(access_type)
+        if cls is None:
+            continue
+        flags |= ACCESS_FLAGS[cls]
+        key = (platform_id, cls)
+        current = min_prices.get(key)
+        if key not in min_prices or (price is not None and (current is None or price < current)):
+            min_prices[key] = price
+
+    search_row = (
+        film_id, film.get('normalized_name'), release_year(film.get('release_year')),
+        duration_minutes(film.get('duration')), imdb_rating(film.get('imdb_rating')), flags
+    )
+    # Колонка country має 100 символів і регістронезалежне порівняння: "США" і "сша" — той самий ключ
+    countries = {}
+    for country in split_list(film.get('country')):
+        country = country[:100].strip()
+        countries.setdefault(country.casefold(), country)
+    country_rows = [(country, film_id) for country in countries.values()]
+    price_rows = [(film_id, platform_id, cls, price) for (platform_id, cls), price in sorted(min_prices.items())]
+    return search_row, country_rows, price_rows
+
+
+def affects_search(changes, summary):
+    """Чи могли зміни фільму (build_film_changes + підсумок запису) змінити його проєкцію."""
+    return changes["film_fields"] is not None or bool(summary["platforms"])
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def refresh_search_index(cursor, film_ids):
+    """
+    Перераховує проєкцію для film_ids з поточних films і film_platform — сталою кількістю
+    запитів на весь список. Транзакцією керує викликач, тож проєкція комітиться разом з даними.
+    """
+    film_ids = list(dict.fromkeys(film_ids))
+    if not film_ids:
+        return 0
+    placeholders = _in_list(film_ids)
+    cursor.execute(f"""
+        SELECT id, normalized_name, release_year, duration, imdb_rating, country
+        FROM films WHERE id IN ({placeholders})
+    """, film_ids)
+    films = cursor.fetchall()
+    cursor.execute(f"SELECT film_id, platform_id, access_type, price FROM film_platform WHERE film_id IN ({placeholders})", film_ids)
+    platform_rows = {}
+    for row in cursor.fetchall():
+        platform_rows.setdefault(row['film_id'], []).append((row['platform_id'], row['access_type'], row['price']))
+
+    search_rows, country_rows, price_rows = [], [], []
+    for film in films:
+        search_row, countries, prices = build_search_rows(film, platform_rows.get(film['id'], []))
+        search_rows.append(search_row)
+        country_rows.extend(countries)
+        price_rows.extend(prices)
+
+    if search_rows:
+        cursor.executemany("""
+            INSERT INTO film_search (film_id, normalized_name, release_year, duration_min, imdb_rating, access_flags)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE normalized_name = VALUES(normalized_name), release_year = VALUES(release_year),
+                duration_min = VALUES(duration_min), imdb_rating = VALUES(imdb_rating), access_flags = VALUES(access_flags)
+        """, search_rows)
+    cursor.execute(f"DELETE FROM film_search_country WHERE film_id IN ({placeholders})", film_ids)
+    cursor.execute(f"DELETE FROM film_search_price WHERE film_id IN ({placeholders})", film_ids)
+    if country_rows:
+        # IGNORE — на випадок інших рівних за правилами порівняння варіантів (наприклад, "Е" і "Ё")
+        cursor.executemany("INSERT IGNORE INTO film_search_country (country, film_id) VALUES (%s, %s)", country_rows)
+    if price_rows:
+        cursor.executemany(
+            "INSERT INTO film_search_price (film_id, platform_id, access_class, min_price) VALUES (%s, %s, %s, %s)",
+            price_rows
+        )
+    return len(search_rows)
+
+
+def rebuild_search_index(conn, chunk=SEARCH_INDEX_CHUNK):
+    """Повна перебудова проєкції (перше заповнення чи після ручних правок films): порціями по chunk фільмів."""
+    total = 0
+    last_id = 0
+    with conn.cursor() as cursor:
+        ensure_schema(cursor)
+        # Фільми, яких уже немає в films
+        for table in ("film_search", "film_search_country", "film_search_price"):
+            cursor.execute(f"DELETE s FROM {table} s LEFT JOIN films f ON f.id = s.film_id WHERE f.id IS NULL")
+        conn.commit()
+        while True:
+            cursor.execute("SELECT id FROM films WHERE id > %s ORDER BY id LIMIT %s", (last_id, chunk))
+            film_ids = [row['id'] for row in cursor.fetchall()]
+            if not film_ids:
+                break
+            total += refresh_search_index(cursor, film_ids)
+            conn.commit()
+            last_id = film_ids[-1]
+            print(f"    > Проєкцію пошуку оновлено для {total} фільмів...")
+    return total
+
+
+def main():
+    conn = create_connection()
+    try:
+        print(f"--- Проєкцію пошуку перебудовано: {rebuild_search_index(conn)} фільмів ---")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import json
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from bs4 import BeautifulSoup as bs
+import metrics
+from core import (
+    TITLE_MATCH_THRESHOLD, http_get, sweettv_url, similarity, best_title_match, extract_sweettv_film_fields,
+    lookup_resolution, remember_resolution, forget_resolution,
+    search_sweettv, parse_film_page_sweettv
+)
+
+# Позначка "сторінку без браузера не розібрати" (дані рендеряться JS або потрібен клік)
+NEEDS_BROWSER = object()
+# Кнопка, за якою фільм точно доступний без оплати
+SWEETTV_FREE_BUTTON = "безкоштовно"
+
+
+def _http_outcome(success):
+    def outcome(result):
+        if result is NEEDS_BROWSER:
+            return "needs_browser"
+        return success if result else "not_found"
+    return outcome
+
+
+def cookie_dict(cookies):
+    return {c['name']: c['value'] for c in cookies if c.get('name') and 'value' in c}
+
+
+def _fetch_soup(url, cookies):
+    r = http_get(url, cookies=cookie_dict(cookies))
+    r.raise_for_status()
+    return bs(r.text, "html.parser")
+
+
+def _text(tag):
+    return tag.get_text(" ", strip=True) if tag else None
+
+
+def _page_title(soup):
+    title = _text(soup.select_one("h1.movie__title"))
+    if title:
+        return title
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.string or "")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and data.get("name"):
+            return data["name"]
+    og_title = soup.select_one('meta[property="og:title"]')
+    return og_title.get("content") if og_title and og_title.get("content") else None
+
+
+def _fetch_title(url, cookies):
+    try:
+        return _page_title(_fetch_soup(url, cookies))
+    except requests.RequestException:
+        return None
+
+
+@metrics.timed("sweettv_search", outcome=_http_outcome("found"), mode="http")
+def search_sweettv_http(film_name_to_search, cookies, get_poster=False, resolution_cache=None):
+    """
+    Пошук на Sweet.tv звичайним HTTP-запитом. Повертає той самий dict, що й search_sweettv,
+    None, якщо збігу немає, або NEEDS_BROWSER, якщо результати рендеряться лише в браузері.
+    """
+    hit, cached = lookup_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, need_poster=get_poster)
+    if hit:
+        return cached
+    search_url = sweettv_url(f"/search?q={urllib.parse.quote(film_name_to_search)}")
+    try:
+        soup = _fetch_soup(search_url, cookies)
+    except requests.RequestException as e:
+        print(f"    > [Sweet.tv] HTTP-пошук недоступний ({e}), перемикаємось на браузер.")
+        metrics.set_outcome("error")
+        return NEEDS_BROWSER
+
+    results = soup.select("div.swiper-slide a.swiper-slide-wrap")
+    if not results:
+        return NEEDS_BROWSER
+    print(f"    > [Sweet.tv] Пошук без браузера: {search_url}")
+
+    cards = []
+    for result in results[:5]:
+        href = result.get("href")
+        if not href: continue
+        href = urllib.parse.urljoin(sweettv_url("/"), href)
+
+        poster_url = None
+        if get_poster:
+            img_tag = result.find("img")
+            if img_tag:
+                poster_url = img_tag.get("src")
+                if not poster_url or 'data:image' in poster_url:
+                    poster_url = img_tag.get("data-src") or poster_url
+        cards.append({"url": href, "title": _text(result.select_one(".movie-card__title")), "poster_url": poster_url})
+
+    def is_match(card):
+        sim_score = similarity(film_name_to_search, card["title"])
+        print(f"    > [Sweet.tv] Знайдено: '{card['title']}' | Схожість: {sim_score:.2f}")
+        return sim_score > TITLE_MATCH_THRESHOLD
+
+    titled = [card for card in cards if card["title"]]
+    best, scores = best_title_match(film_name_to_search, [card["title"] for card in titled])
+    for card, sim_score in zip(titled, scores):
+        print(f"    > [Sweet.tv] Знайдено: '{card['title']}' | Схожість: {sim_score:.2f}")
+    matched = titled[best] if best is not None else None
+    untitled = [card for card in cards if not card["title"]]
+    unresolved = False
+    if not matched and untitled:
+        # Назви з окремих сторінок тягнемо паралельно і зупиняємось на першому збігу
+        executor = ThreadPoolExecutor(len(untitled))
+        futures = {executor.submit(_fetch_title, card["url"], cookies): card for card in untitled}
+        try:
+            for future in as_completed(futures):
+                card = futures[future]
+                card["title"] = future.result()
+                if not card["title"]:
+                    unresolved = True
+                elif is_match(card):
+                    matched = card
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if matched:
+        print(f"    > [Sweet.tv] Збіг знайдено: {matched['url']}")
+        remember_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, matched)
+        return matched
+    if unresolved:
+        return NEEDS_BROWSER
+
+    print("    > [Sweet.tv]  Не знайдено збігів з високою схожістю.")
+    remember_resolution(resolution_cache, 'Sweet.tv', film_name_to_search, None)
+    return None
+
+
+def _prices_from_soup(soup):
+    buttons = [_text(b).lower() for b in soup.select(".movie-info__buttons-button")]
+    if not buttons:
+        return NEEDS_BROWSER
+    if any("у передплаті" in b and "незабаром" not in b for b in buttons):
+        # Пакети підписки відкриваються лише після кліку в модальному вікні
+        return NEEDS_BROWSER
+
+    access_data = {}
+    for section in soup.select(".movie-offers__modal-purchase"):
+        section_title = _text(section.select_one(".movie-offers__modal-purchase-title"))
+        blocks = section.select(".movie-offers__modal-purchase-offers-offer")
+        section_data = {}
+        for block in blocks:
+            quality = _text(block.select_one(".movie-offers__modal-purchase-offers-offer-title"))
+            price = _text(block.select_one(".movie-offers__modal-purchase-offers-offer-price-amount"))
+            if quality is None or price is None:
+                section_data = {}
+                break
+            section_data[quality] = price
+        if section_title and section_data:
+            access_data[section_title] = section_data
+
+    if not access_data:
+        if not any(SWEETTV_FREE_BUTTON in b for b in buttons):
+            # Блоки цін могли не відрендеритись без JS — нульову ціну без доказів не пишемо
+            return NEEDS_BROWSER
+        access_data = {"M": "0 грн"}
+    return json.dumps(access_data, ensure_ascii=False)
+
+
+@metrics.timed("sweettv_page", outcome=_http_outcome("parsed"), mode="http")
+def parse_film_page_sweettv_http(url, cookies, parse_full_data):
+    """HTTP-аналог parse_film_page_sweettv. Повертає film_data або NEEDS_BROWSER."""
+    try:
+        soup = _fetch_soup(url, cookies)
+    except requests.RequestException as e:
+        print(f"    > [Sweet.tv] Сторінка недоступна по HTTP ({e}), перемикаємось на браузер.")
+        metrics.set_outcome("error")
+        return NEEDS_BROWSER
+
+    title = _text(soup.select_one("h1.movie__title"))
+    if not title:
+        return NEEDS_BROWSER
+    json_prices = _prices_from_soup(soup)
+    if json_prices is NEEDS_BROWSER:
+        return NEEDS_BROWSER
+    print("    > [Sweet.tv] Сторінку розібрано без браузера.")
+
+    film_data = {"access_options_PK": json_prices}
+    if parse_full_data:
+        print("    > [Sweet.tv] Парсинг всіх даних фільму...")
+        film_data.update(extract_sweettv_film_fields({
+            "name": title,
+            "description": _text(soup.select_one("p#film_description")),
+            "imdb_rating": _text(soup.select_one("span[data-movie-el='16']")),
+            "countries": [_text(tag) for tag in soup.select("p.desc-film-countries a")],
+            "genres": [_text(tag) for tag in soup.select("p.desc-film-page-genre")],
+            "age_limit": _text(soup.select_one("span[data-movie-el='25']")),
+            "duration": _text(soup.select_one("span#timeCount")),
+            "duration_unit": _text(soup.select_one("span#timeLabel")),
+            "release_year": _text(soup.select_one("span[data-movie-el='14']")),
+        }))
+    return film_data
+
+
+@metrics.timed("sweettv_total", outcome=lambda result: metrics.found(result[0]))
+def fetch_sweettv(film_name, cookies, driver_pool, http_first=True, resolution_cache=None):
+    """
+    Повний Sweet.tv-етап для одного фільму: спершу HTTP, браузер із пулу лише за потреби.
+    Повні дані та постер беруться завжди, бо платформи опитуються паралельно і
+    наперед невідомо, чи знайде фільм Megogo. Повертає (sweettv_data, poster_url).
+    """
+    if http_first:
+        s_match = search_sweettv_http(film_name, cookies, True, resolution_cache)
+    else:
+        s_match = NEEDS_BROWSER
+    sweettv_data = NEEDS_BROWSER
+    if s_match is None:
+        return None, None
+    if s_match is not NEEDS_BROWSER:
+        sweettv_data = parse_film_page_sweettv_http(s_match['url'], cookies, True)
+
+    if sweettv_data is NEEDS_BROWSER:
+        metrics.count("sweettv_browser_fallbacks", stage="search" if s_match is NEEDS_BROWSER else "page")
+        with driver_pool.driver(pages=2 if s_match is NEEDS_BROWSER else 1) as driver:
+            if s_match is NEEDS_BROWSER:
+                s_match = search_sweettv(driver, film_name, get_poster=True, resolution_cache=resolution_cache)
+                if not s_match:
+                    return None, None
+            driver.get(s_match['url'])
+            sweettv_data = parse_film_page_sweettv(driver, True)
+
+    if not sweettv_data:
+        forget_resolution(resolution_cache, 'Sweet.tv', film_name)
+        return None, None
+    sweettv_data['url_sweet_tv'] = s_match['url']
+    return sweettv_data, s_match.get('poster_url')
@@ -0,0 +1,37 @@
+import unittest
+import core
+import requests
+from benchmark import FixtureServer, find_regressions, load_routes, percentile, run_benchmark
+
+class TestBenchmarkHelpers(unittest.TestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertAlmostEqual(percentile([10, 20], 90), 19)
+        self.assertIsNone(percentile([], 50))
+
+    def test_regressions_over_threshold(self):
+        previous = {"films_per_min": 1000, "stages": {"megogo_page": {"p50": 10, "p90": 20}}}
+        current = {"films_per_min": 950, "stages": {"megogo_page": {"p50": 12, "p90": 21}}}
+        self.assertEqual(find_regressions(previous, current), [("megogo_page.p50", 10, 12)])
+
+    def test_fixture_server_serves_routes(self):
+        with FixtureServer(load_routes()) as server:
+            ok = requests.get(server.url + "/ua/search-extended?q=test", timeout=5)
+            missing = requests.get(server.url + "/unknown", timeout=5)
+        self.assertEqual(ok.status_code, 200)
+        self.assertIn("Дюна", ok.text)
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(server.misses, ["/unknown"])
+
+class TestRunBenchmark(unittest.TestCase):
+    def test_replays_pipeline_on_fixtures(self):
+        base_urls = (core.MEGOGO_BASE_URL, core.SWEETTV_BASE_URL)
+        results = run_benchmark(3)
+        self.assertEqual(results["found"], {"megogo": 3, "sweettv": 3})
+        self.assertEqual(results["http_misses"], [])
+        for stage in ("megogo_search", "megogo_page", "sweettv_search", "sweettv_page", "db_write"):
+            self.assertEqual(results["stages"][stage]["count"], 3)
+        self.assertEqual((core.MEGOGO_BASE_URL, core.SWEETTV_BASE_URL), base_urls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,40 @@
 import unittest
 import json
+import os
+import threading
+import time
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bs4 import BeautifulSoup as bs
 # Імпортуємо функції з вашого core.py
-from core import normalize_title, similarity, parse_megogo_options, parse_sweettv_options
+import core
+from core import (
+    normalize_title, similarity, parse_megogo_options, parse_sweettv_options,
+    parse_sweettv_prices, extract_sweettv_film_fields, resolve_titles_in_tabs,
+    parse_megogo_film_html, extract_megogo_film, match_megogo_search_results, match_megogo_cards,
+    SWEETTV_STATE_JS, SWEETTV_TITLE_JS
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = 0
+
+    def do_GET(self):
+        FlakyHandler.hits += 1
+        code = 503 if FlakyHandler.hits == 1 else 200
+        self.send_response(code)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
 
 class TestParserCore(unittest.TestCase):
     def test_normalize_title_basic(self):
@@ -54,5 +87,155 @@ class TestParserCore(unittest.TestCase):
         self.assertEqual(res[0][2], "Покупка (SD)")
         self.assertEqual(res[0][3], 100.0)
 
+class SnapshotDriver:
+    """Драйвер-заглушка: на SWEETTV_STATE_JS повертає заданий знімок DOM."""
+    def __init__(self, state):
+        self.state = state
+        self.calls = 0
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        assert script == SWEETTV_STATE_JS
+        return self.state
+
+class TestSweetTvExtraction(unittest.TestCase):
+    def test_prices_from_offer_snapshot(self):
+        driver = SnapshotDriver({
+            "modal": False, "buttons": ["дивитися трейлер"], "subs": [], "ready": "complete",
+            "offers": [
+                {"title": "Оренда", "offers": [{"quality": "HD", "price": "79 грн"}, {"quality": "SD", "price": "49 грн"}]},
+                {"title": None, "offers": []}
+            ]
+        })
+        result = json.loads(parse_sweettv_prices(driver))
+        self.assertEqual(result, {"Оренда": {"HD": "79 грн", "SD": "49 грн"}})
+        self.assertEqual(driver.calls, 1)
+
+    def test_prices_default_when_nothing_found(self):
+        driver = SnapshotDriver({"modal": False, "buttons": [], "subs": [], "offers": [], "ready": "complete"})
+        result = json.loads(parse_sweettv_prices(driver, budget_seconds=0))
+        self.assertEqual(result, {"M": "0 грн"})
+
+    def test_first_wait_does_not_spend_whole_budget(self):
+        driver = SnapshotDriver({"modal": False, "buttons": [], "subs": [], "offers": [], "ready": "complete"})
+        started = time.monotonic()
+        with patch('core.SWEETTV_FIRST_WAIT', 0.2):
+            parse_sweettv_prices(driver, budget_seconds=8)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_film_fields(self):
+        film_data = extract_sweettv_film_fields({
+            "name": "Дюна: Частина друга", "description": None, "imdb_rating": "8.6",
+            "countries": ["США", "Канада"], "genres": ["Фантастика"], "age_limit": "16+",
+            "duration": "166", "duration_unit": "хв", "release_year": "2024"
+        })
+        self.assertEqual(film_data["normalized_name"], "дюна частина друга")
+        self.assertEqual(film_data["country"], "США, Канада")
+        self.assertEqual(film_data["duration"], "166 хв")
+        self.assertNotIn("description", film_data)
+
+class TabsDriver:
+    """Драйвер-заглушка з вкладками: кожна вкладка "завантажується" після кількох опитувань."""
+    def __init__(self, titles):
+        self.titles = titles
+        self.window_handles = ["main"]
+        self.current_window_handle = "main"
+        self.urls = {}
+        self.polls = {}
+        self.switch_to = self
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    def close(self):
+        self.window_handles.remove(self.current_window_handle)
+
+    def execute_script(self, script, *args):
+        if script.startswith("window.open"):
+            handle = f"tab{len(self.urls)}"
+            self.urls[handle] = args[0]
+            self.window_handles.append(handle)
+            return None
+        assert script == SWEETTV_TITLE_JS
+        handle = self.current_window_handle
+        self.polls[handle] = self.polls.get(handle, 0) + 1
+        return self.titles[self.urls[handle]] if self.polls[handle] > 1 else None
+
+class TestResolveTitlesInTabs(unittest.TestCase):
+    def test_returns_first_match_and_closes_tabs(self):
+        driver = TabsDriver({"/a": "Дюна", "/b": "Матриця", "/c": "Аватар"})
+        with patch('core.SWEETTV_TAB_POLL_INTERVAL', 0):
+            matched = resolve_titles_in_tabs(driver, ["/a", "/b", "/c"], lambda t: t == "Матриця")
+        self.assertEqual(matched, ("/b", "Матриця"))
+        self.assertEqual(driver.window_handles, ["main"])
+        self.assertEqual(driver.current_window_handle, "main")
+        self.assertEqual(len(driver.urls), 3)
+
+    def test_no_match(self):
+        driver = TabsDriver({"/a": "Дюна"})
+        with patch('core.SWEETTV_TAB_POLL_INTERVAL', 0):
+            self.assertIsNone(resolve_titles_in_tabs(driver, ["/a"], lambda t: False))
+        self.assertEqual(driver.window_handles, ["main"])
+
+class TestHttpSession(unittest.TestCase):
+    def test_retry_and_connection_reuse(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        old_factor = core.HTTP_BACKOFF_FACTOR
+        old_session, old_counters = core._http_session, dict(core._http_counters)
+        core.HTTP_BACKOFF_FACTOR = 0
+        try:
+            core.configure_http_session(pool_size=1)
+            for i in range(3):
+                r = core.http_get(f"http://127.0.0.1:{server.server_port}/page{i}")
+                self.assertEqual(r.status_code, 200)
+            stats = core.get_http_stats()
+        finally:
+            core.HTTP_BACKOFF_FACTOR = old_factor
+            # Тестова сесія закривається, глобальна повертається як була
+            core._http_session.close()
+            core._http_session = old_session
+            core._http_counters.update(old_counters)
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connections_reused"], 3)
+
+    def test_session_created_once_across_threads(self):
+        old_session = core._http_session
+        core._http_session = None
+        sessions = []
+        try:
+            threads = [threading.Thread(target=lambda: sessions.append(core.get_http_session())) for _ in range(8)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+        finally:
+            core._http_session = old_session
+        self.assertEqual(len(sessions), 8)
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+
+class TestMegogoParsing(unittest.TestCase):
+    URL = "https://megogo.net/ua/view/200-dyuna-chastina-druga.html"
+
+    def test_scoped_film_parse_matches_full_tree(self):
+        html = read_fixture("megogo_film.html")
+        data = parse_megogo_film_html(html, self.URL)
+        self.assertEqual(data, extract_megogo_film(bs(html, "html.parser"), self.URL))
+        self.assertEqual(data['imdb_rating'], "8,5")
+        self.assertEqual(data['geners'], "Фантастика, Пригоди, Драма")
+        options = json.loads(data['access_options_megogo'])
+        self.assertEqual(len(options), 5)
+        self.assertEqual(options[0]['type'], "Передплата")
+        self.assertEqual(options[-1], {"type": "Оренда", "quality": "HD", "duration": "48 годин", "price": "79", "currency": "грн"})
+
+    def test_scoped_search_matches_full_tree(self):
+        html = read_fixture("megogo_search.html")
+        match = match_megogo_search_results(html, "Дюна: Частина друга (2024)")
+        self.assertEqual(match, match_megogo_cards(bs(html, "html.parser"), "Дюна: Частина друга (2024)"))
+        self.assertEqual(match['url'], self.URL)
+        self.assertEqual(match['poster_url'], "https://s1.megogo.net/p/s1.jpg")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
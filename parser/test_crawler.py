@@ -0,0 +1,127 @@
+import random
+import time
+import unittest
+from unittest.mock import patch
+from crawler import CrawlEngine
+from driver_pool import DriverPool
+from platforms import HostThrottle, MegogoAdapter
+
+class FakeDriver:
+    def __init__(self, cookies=None):
+        self.alive = True
+        self.rss = 200 * 1024 * 1024
+
+    def execute_script(self, script, *args):
+        if not self.alive:
+            raise RuntimeError("session deleted")
+        return "complete"
+
+    def quit(self):
+        self.alive = False
+
+def fake_search_megogo(name, resolution_cache=None):
+    time.sleep(random.uniform(0, 0.01))
+    return {"url": f"https://megogo.net/{name}", "title": name, "poster_url": None}
+
+def fake_parse_megogo(url, *args, **kwargs):
+    return {"name": url.rsplit('/', 1)[-1], "poster_url": "poster.jpg"}
+
+class TestCrawlEngine(unittest.TestCase):
+    @patch('platforms.create_sweettv_driver', side_effect=FakeDriver)
+    @patch('platforms.fetch_sweettv', return_value=(None, None))
+    @patch('platforms.parse_film_page_megogo', side_effect=fake_parse_megogo)
+    @patch('platforms.search_megogo', side_effect=fake_search_megogo)
+    def test_results_keep_input_order(self, *mocks):
+        films = [{"id": i, "name": f"film{i}"} for i in range(20)]
+        engine = CrawlEngine([], megogo_workers=4, sweettv_workers=2,
+                             megogo_min_interval=0, sweettv_min_interval=0, max_pending=5)
+        try:
+            results = list(engine.crawl(films))
+        finally:
+            engine.close()
+        self.assertEqual([r['film']['id'] for r in results], list(range(20)))
+        self.assertEqual(results[3]['megogo_data']['name'], "film3")
+        self.assertIsNone(results[3]['sweettv_data'])
+
+    @patch('platforms.create_sweettv_driver', side_effect=FakeDriver)
+    @patch('platforms.fetch_sweettv', side_effect=RuntimeError("chrome crashed"))
+    @patch('platforms.search_megogo', return_value=None)
+    def test_sweettv_crash_does_not_stop_run(self, *mocks):
+        engine = CrawlEngine([], megogo_min_interval=0, sweettv_min_interval=0)
+        try:
+            results = list(engine.crawl([{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]))
+        finally:
+            engine.close()
+        self.assertEqual(len(results), 2)
+        self.assertIsNone(results[0]['sweettv_data'])
+
+    @patch('platforms.create_sweettv_driver', side_effect=FakeDriver)
+    def test_worker_counts_come_from_adapters(self, _):
+        engine = CrawlEngine([], megogo_async=True, sweettv_workers=3, platforms=['Megogo', 'Sweet.tv'])
+        try:
+            megogo, sweettv = engine.adapters
+            self.assertEqual((megogo.workers, megogo.min_interval), (MegogoAdapter.workers, MegogoAdapter.min_interval))
+            self.assertEqual(sweettv.workers, 3)
+            # Асинхронному Megogo пул потоків не потрібен
+            self.assertIsNone(megogo._pool)
+            self.assertIsNotNone(sweettv._pool)
+        finally:
+            engine.close()
+
+    def test_host_throttle_spacing(self):
+        throttle = HostThrottle(2, 0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            with throttle: pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+class TestDriverPool(unittest.TestCase):
+    def test_recycles_after_max_pages(self):
+        pool = DriverPool([], size=1, max_pages=3, driver_factory=FakeDriver)
+        seen = []
+        for _ in range(4):
+            with pool.driver(pages=2) as driver:
+                seen.append(driver)
+        pool.close()
+        self.assertIs(seen[0], seen[1])
+        self.assertIsNot(seen[1], seen[2])
+        self.assertFalse(seen[1].alive)
+        self.assertEqual(pool.recycled, 2)
+
+    def test_browsers_start_lazily(self):
+        created = []
+        pool = DriverPool([], size=2, driver_factory=lambda cookies: created.append(FakeDriver()) or created[-1])
+        self.assertEqual(created, [])
+        with pool.driver():
+            pass
+        with pool.driver():
+            pass
+        pool.close()
+        self.assertEqual(len(created), 1)
+
+    def test_recycles_on_browser_rss_growth(self):
+        pool = DriverPool([], size=1, max_rss_growth_mb=100, driver_factory=FakeDriver)
+        pool._browser_rss = lambda driver: driver.rss
+        with pool.driver() as first:
+            pass
+        with pool.driver() as driver:
+            driver.rss += 150 * 1024 * 1024
+        with pool.driver() as third:
+            pass
+        pool.close()
+        self.assertIs(first, driver)
+        self.assertIsNot(driver, third)
+
+    def test_crashed_session_is_replaced(self):
+        pool = DriverPool([], size=1, driver_factory=FakeDriver)
+        with self.assertRaises(RuntimeError):
+            with pool.driver() as crashed:
+                crashed.alive = False
+                raise RuntimeError("chrome not reachable")
+        with pool.driver() as driver:
+            self.assertTrue(driver.alive)
+        pool.close()
+        self.assertIsNot(crashed, driver)
+
+if __name__ == '__main__':
+    unittest.main()
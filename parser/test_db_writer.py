@@ -0,0 +1,206 @@
+import unittest
+from decimal import Decimal
+from core import diff_platform_rows, execute_platform_diff, resolve_genres
+from db_writer import FilmBatchWriter
+
+PLATFORMS = {'Megogo': 1, 'Sweet.tv': 2}
+
+class FakeCursor:
+    def __init__(self, fail_on=None, film_genre=(), film_platform=(), films=()):
+        self.statements = []
+        self.params = []
+        self.fail_on = fail_on
+        self.rowcount = 0
+        self.genres = {}
+        self.tables = {"film_genre": list(film_genre), "film_platform": list(film_platform), "films": list(films)}
+        self.result = []
+
+    def _check(self, sql, params):
+        if self.fail_on is not None and self.fail_on in list(params or []):
+            raise RuntimeError("Data too long for column 'description'")
+
+    def execute(self, sql, params=None):
+        self._check(sql, params)
+        self.statements.append(" ".join(sql.split()))
+        self.params.append(params)
+        if sql.startswith("SELECT genre_id, name FROM genre"):
+            self.result = [{"genre_id": self.genres[name], "name": name} for name in params if name in self.genres]
+        if sql.lstrip().startswith("SELECT") and "FROM films " in sql:
+            self.result = [row for row in self.tables["films"] if row['id'] in params]
+        elif sql.startswith("SELECT") and "FROM film_" in sql:
+            table = "film_platform" if "film_platform" in sql else "film_genre"
+            self.result = [row for row in self.tables[table] if row['film_id'] in params]
+
+    def executemany(self, sql, rows):
+        for row in rows:
+            self._check(sql, row)
+        self.statements.append(" ".join(sql.split()))
+        self.params.append(rows)
+        if sql.startswith("INSERT IGNORE INTO genre"):
+            new = [name for name in rows if name not in self.genres]
+            for name in new:
+                self.genres[name] = 100 + len(self.genres)
+            self.rowcount = len(new)
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return self.result
+
+class FakeConn:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def megogo(film_id):
+    return {
+        "url": f"https://megogo.net/{film_id}", "description": f"film {film_id}",
+        "geners": "Драма,Комедія", "access_options_megogo": '[{"type": "Передплата", "description": "Підписка 99 грн"}]'
+    }
+
+class TestFilmBatchWriter(unittest.TestCase):
+    def test_batch_uses_constant_number_of_statements(self):
+        films = [{"id": film_id, "duration": "169 хв", "country": "США"} for film_id in range(1, 11)]
+        conn, cursor = FakeConn(), FakeCursor(films=films)
+        writer = FilmBatchWriter(conn, cursor, {'драма': 1, 'комедія': 2}, PLATFORMS, batch_size=10)
+        for film_id in range(1, 11):
+            writer.add(film_id, {"megogo_data": megogo(film_id)})
+        self.assertEqual(conn.commits, 1)
+        self.assertEqual(writer.written, 10)
+        # UPDATE films, SELECT+INSERT film_genre, SELECT+INSERT film_platform, дві позначки часу,
+        # проєкція пошуку: SELECT films і film_platform, upsert film_search, DELETE+INSERT країн, DELETE цін
+        self.assertEqual(len(cursor.statements), 13)
+        self.assertTrue(cursor.statements[0].startswith("UPDATE films f JOIN (SELECT"))
+        self.assertEqual(len(writer.changed), 10)
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        film_genre = [{"film_id": 7, "genre_id": 1}, {"film_id": 7, "genre_id": 2}]
+        film_platform = [{"film_id": 7, "platform_id": 1, "access_type": "Підписка", "price": Decimal("99.00")}]
+        conn, cursor = FakeConn(), FakeCursor(film_genre=film_genre, film_platform=film_platform)
+        writer = FilmBatchWriter(conn, cursor, {'драма': 1, 'комедія': 2}, PLATFORMS)
+        writer.add(7, {"megogo_data": megogo(7)})
+        writer.flush()
+        self.assertFalse([sql for sql in cursor.statements
+                          if sql.startswith(("INSERT", "DELETE")) and "film_search" not in sql])
+        self.assertEqual(writer.changed, [])
+
+    def test_price_change_replaces_row(self):
+        film_platform = [{"film_id": 7, "platform_id": 1, "access_type": "Підписка", "price": Decimal("79.00")}]
+        conn, cursor = FakeConn(), FakeCursor(film_platform=film_platform)
+        writer = FilmBatchWriter(conn, cursor, {'драма': 1, 'комедія': 2}, PLATFORMS)
+        writer.add(7, {"megogo_data": megogo(7)})
+        writer.flush()
+        platform_writes = [(sql, params) for sql, params in zip(cursor.statements, cursor.params)
+                           if sql.startswith(("INSERT INTO film_platform", "UPDATE film_platform", "DELETE FROM film_platform"))]
+        self.assertEqual(platform_writes, [
+            ("DELETE FROM film_platform WHERE (film_id, platform_id, access_type, ROUND(price, 2)) IN ((%s, %s, %s, %s))",
+             [7, 1, "Підписка", 79.0]),
+            ("INSERT INTO film_platform (film_id, platform_id, access_type, price) VALUES (%s, %s, %s, %s)",
+             [(7, 1, "Підписка", 99.0)]),
+        ])
+        summary = writer.changed[0]
+        self.assertTrue(summary["prices_changed"])
+        self.assertEqual(summary["platforms"][1]["updated"], [("Підписка", Decimal("79.00"), 99.0)])
+
+    def test_diff_platform_rows(self):
+        current = [("Купівля (HD)", 149.0), ("Купівля (HD)", 199.0), ("Оренда", 49.0)]
+        new = [("Купівля (HD)", 199.0), ("Купівля (HD)", 129.0), ("Безкоштовно", None)]
+        inserts, updates, deletes = diff_platform_rows(current, new)
+        self.assertEqual(inserts, [("Безкоштовно", None)])
+        self.assertEqual(updates, [("Купівля (HD)", 149.0, 129.0)])
+        self.assertEqual(deletes, [("Оренда", 49.0)])
+
+    def test_removed_prices_are_one_delete(self):
+        film_platform = [{"film_id": 7, "platform_id": 1, "access_type": "Оренда", "price": Decimal("49.00")},
+                         {"film_id": 8, "platform_id": 1, "access_type": "Оренда", "price": Decimal("49.00")}]
+        conn, cursor = FakeConn(), FakeCursor(film_platform=film_platform)
+        writer = FilmBatchWriter(conn, cursor, {'драма': 1, 'комедія': 2}, PLATFORMS)
+        writer.add(7, {"megogo_data": megogo(7)})
+        writer.add(8, {"megogo_data": megogo(8)})
+        writer.flush()
+        deletes = [sql for sql in cursor.statements if sql.startswith("DELETE FROM film_platform")]
+        self.assertEqual(deletes, ["DELETE FROM film_platform WHERE (film_id, platform_id, access_type, ROUND(price, 2)) "
+                                   "IN ((%s, %s, %s, %s), (%s, %s, %s, %s))"])
+
+    def test_distinct_offers_of_one_access_type_survive(self):
+        current = [("Оренда", Decimal("49.00")), ("Оренда", Decimal("79.00")), ("Оренда", Decimal("79.00"))]
+        self.assertEqual(diff_platform_rows(current, [("Оренда", 79.0), ("Оренда", 49.0)]), ([], [], []))
+        self.assertEqual(diff_platform_rows(current, [("Оренда", 49.0)]), ([], [], [("Оренда", Decimal("79.00"))]))
+
+    def test_unpriced_rows_are_deleted_by_is_null(self):
+        cursor = FakeCursor()
+        execute_platform_diff(cursor, [], [(7, 1, "Безкоштовно", None), (7, 1, "Оренда", Decimal("49.00"))])
+        self.assertEqual(cursor.statements, [
+            "DELETE FROM film_platform WHERE (film_id, platform_id, access_type, ROUND(price, 2)) IN ((%s, %s, %s, %s)) "
+            "OR (price IS NULL AND (film_id, platform_id, access_type) IN ((%s, %s, %s)))"
+        ])
+        self.assertEqual(cursor.params, [[7, 1, "Оренда", 49.0, 7, 1, "Безкоштовно"]])
+
+    def test_removed_genres_are_one_delete(self):
+        film_genre = [{"film_id": 7, "genre_id": 5}, {"film_id": 8, "genre_id": 5}]
+        conn, cursor = FakeConn(), FakeCursor(film_genre=film_genre)
+        writer = FilmBatchWriter(conn, cursor, {'драма': 1, 'комедія': 2}, PLATFORMS)
+        writer.add(7, {"megogo_data": megogo(7)})
+        writer.add(8, {"megogo_data": megogo(8)})
+        writer.flush()
+        deletes = [sql for sql in cursor.statements if sql.startswith("DELETE FROM film_genre")]
+        self.assertEqual(deletes, ["DELETE FROM film_genre WHERE (film_id, genre_id) IN ((%s, %s), (%s, %s))"])
+
+    def test_failed_batch_is_retried_film_by_film(self):
+        conn, cursor = FakeConn(), FakeCursor(fail_on=702)
+        genre_cache = {'драма': 1}
+        committed, errors = [], []
+        writer = FilmBatchWriter(conn, cursor, genre_cache, PLATFORMS, batch_size=3)
+        for film_id in (701, 702, 703):
+            writer.add(film_id, {"megogo_data": megogo(film_id)}, on_commit=lambda film_id=film_id: committed.append(film_id),
+                       on_error=lambda e, film_id=film_id: errors.append(film_id))
+        self.assertEqual(committed, [701, 703])
+        self.assertEqual(errors, [702])
+        self.assertEqual((writer.written, writer.failed), (2, 1))
+        self.assertEqual(conn.rollbacks, 2)
+        self.assertIn('комедія', genre_cache)
+
+    def test_flush_writes_partial_batch(self):
+        conn, cursor = FakeConn(), FakeCursor()
+        writer = FilmBatchWriter(conn, cursor, {}, PLATFORMS, batch_size=50)
+        writer.add(1, {"megogo_data": {"url": "https://megogo.net/1", "unchanged": True}})
+        self.assertEqual(conn.commits, 0)
+        writer.flush()
+        self.assertEqual(conn.commits, 1)
+        # Незмінена сторінка Megogo: films і Megogo-ціни не чіпаємо, а Sweet.tv-цін і так немає
+        self.assertEqual(cursor.statements, [
+            "SELECT film_id, platform_id, access_type, price FROM film_platform WHERE film_id IN (%s)",
+            "UPDATE films SET last_refreshed_at = NOW() WHERE id IN (%s)",
+        ])
+
+    def test_mark_refreshed_only_stamps_film(self):
+        conn, cursor = FakeConn(), FakeCursor()
+        writer = FilmBatchWriter(conn, cursor, {}, PLATFORMS)
+        writer.mark_refreshed(3)
+        writer.mark_refreshed(4)
+        writer.flush()
+        self.assertEqual(cursor.statements, ["UPDATE films SET last_refreshed_at = NOW() WHERE id IN (%s, %s)"])
+        self.assertEqual(writer.written, 2)
+
+class TestResolveGenres(unittest.TestCase):
+    def test_variants_resolve_to_one_genre_in_one_round_trip(self):
+        cursor = FakeCursor()
+        genre_cache = {'драма': 1}
+        ids = resolve_genres(cursor, genre_cache, ["Драма", "Наукова  фантастика", "наукова фантастика ", "Жахи"])
+        self.assertEqual(len(cursor.statements), 2)
+        self.assertEqual(sorted(cursor.genres), ["Жахи", "Наукова фантастика"])
+        self.assertEqual(ids, [1, genre_cache['наукова фантастика'], genre_cache['жахи']])
+
+        cursor.statements.clear()
+        self.assertEqual(resolve_genres(cursor, genre_cache, ["ЖАХИ"]), [genre_cache['жахи']])
+        self.assertEqual(cursor.statements, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import random
+import unittest
+from unittest.mock import patch
+from film_similarity import SIMILARITY_GENRE_BUCKET, SimilarityModel, refresh_similarity, top_k, update_neighbor_lists
+
+def full_lists(model, k):
+    lists = {film_id: top_k(model.scores(film_id), k) for film_id in model.film_ids}
+    return {film_id: neighbors for film_id, neighbors in lists.items() if neighbors}
+
+def rounded(lists):
+    return {film_id: [(other_id, round(score, 6)) for other_id, score in neighbors]
+            for film_id, neighbors in lists.items() if neighbors}
+
+class TestSimilarityModel(unittest.TestCase):
+    def setUp(self):
+        self.model = SimilarityModel(
+            [1, 2, 3, 4],
+            ratings=[(10, 1, 5), (10, 2, 4), (11, 1, 1), (11, 2, 2), (12, 3, 5)],
+            genres=[(1, 7), (2, 7), (3, 8), (4, 7), (4, 8)],
+            moods=[(1, 1, 3), (2, 1, 1), (3, 2, 2)],
+        )
+
+    def test_scores_are_symmetric(self):
+        for film_id in self.model.film_ids:
+            for other_id, score in self.model.scores(film_id).items():
+                with self.subTest(film_id=film_id, other_id=other_id):
+                    self.assertAlmostEqual(score, self.model.scores(other_id)[film_id])
+
+    def test_cold_start_film_gets_neighbors_by_genre(self):
+        # У фільму 4 немає жодної оцінки чи емоції, лише жанри
+        self.assertEqual([other_id for other_id, _ in top_k(self.model.scores(4), 3)], [1, 2, 3])
+
+    def test_fingerprint_changes_when_rating_is_deleted(self):
+        without_rating = SimilarityModel([1, 2, 3, 4], ratings=[(10, 1, 5), (10, 2, 4), (11, 2, 2), (12, 3, 5)],
+                                         genres=[(1, 7), (2, 7), (3, 8), (4, 7), (4, 8)],
+                                         moods=[(1, 1, 3), (2, 1, 1), (3, 2, 2)])
+        self.assertNotEqual(self.model.fingerprint(1), without_rating.fingerprint(1))
+        self.assertEqual(self.model.fingerprint(3), without_rating.fingerprint(3))
+
+    def test_large_genre_pairs_only_through_its_head(self):
+        # Жанр 1 у 100 фільмах; "голова" з 3 фільмів — ті, що мають оцінки (1, 2, 3)
+        ratings = [(10, film_id, 5) for film_id in (1, 2, 3)]
+        model = SimilarityModel(range(1, 101), ratings, [(film_id, 1) for film_id in range(1, 101)], genre_bucket=3)
+        self.assertEqual(set(model.scores(50)), {1, 2, 3})
+        self.assertEqual(len(model.scores(1)), 99)
+        self.assertAlmostEqual(model.scores(50)[1], model.scores(1)[50])
+        self.assertNotEqual(model.fingerprint(3), SimilarityModel(range(1, 101), ratings[:2],
+                                                                  [(film_id, 1) for film_id in range(1, 101)],
+                                                                  genre_bucket=3).fingerprint(3))
+
+class TestIncrementalUpdate(unittest.TestCase):
+    def random_data(self, rng, film_ids):
+        ratings = {(user_id, film_id): rng.randint(1, 5)
+                   for user_id in range(30) for film_id in rng.sample(film_ids, 6)}
+        genres = {(film_id, rng.randint(1, 6)) for film_id in film_ids for _ in range(2)}
+        moods = {(film_id, rng.randint(1, 4)): rng.randint(1, 3) for film_id in rng.sample(film_ids, 15)}
+        return ratings, genres, moods
+
+    def build(self, film_ids, ratings, genres, moods, genre_bucket=SIMILARITY_GENRE_BUCKET):
+        return SimilarityModel(film_ids, [(u, f, r) for (u, f), r in ratings.items()], genres,
+                               [(f, m, c) for (f, m), c in moods.items()], genre_bucket=genre_bucket)
+
+    def test_incremental_matches_full_recompute(self):
+        k = 5
+        # 6 — жанри з ~13 фільмами обрізаються до "голови", і вона зсувається разом з оцінками
+        for seed, genre_bucket in [(seed, bucket) for seed in range(5) for bucket in (SIMILARITY_GENRE_BUCKET, 6)]:
+            with self.subTest(seed=seed, genre_bucket=genre_bucket):
+                rng = random.Random(seed)
+                film_ids = list(range(1, 41))
+                ratings, genres, moods = self.random_data(rng, film_ids)
+                before = self.build(film_ids, ratings, genres, moods, genre_bucket)
+                old_lists = full_lists(before, k)
+
+                for key in rng.sample(sorted(ratings), 10):
+                    ratings[key] = rng.randint(1, 5)
+                for key in rng.sample(sorted(ratings), 5):
+                    del ratings[key]
+                removed_film = rng.choice(film_ids)
+                film_ids.remove(removed_film)
+                genres.add((rng.choice(film_ids), 6))
+                after = self.build(film_ids, ratings, genres, moods, genre_bucket)
+
+                dirty = {film_id for film_id in film_ids if before.fingerprint(film_id) != after.fingerprint(film_id)}
+                dirty.add(removed_film)
+                merged = dict(old_lists)
+                merged.update(update_neighbor_lists(after, old_lists, dirty, k))
+                merged.pop(removed_film, None)
+                self.assertEqual(rounded(merged), rounded(full_lists(after, k)))
+
+    def test_unchanged_model_rewrites_nothing(self):
+        rng = random.Random(42)
+        film_ids = list(range(1, 21))
+        model = self.build(film_ids, *self.random_data(rng, film_ids))
+        old_lists = full_lists(model, 5)
+        self.assertEqual(update_neighbor_lists(model, old_lists, set(film_ids), 5), {})
+
+class RecordingConn:
+    """З'єднання-заглушка: пише послідовність запитів і комітів."""
+    def __init__(self):
+        self.log = []
+
+    def cursor(self, *args):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        self.log.append(" ".join(sql.split()))
+
+    def executemany(self, sql, rows):
+        self.log.append(" ".join(sql.split()))
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        self.log.append("COMMIT")
+
+class TestRefreshSimilarity(unittest.TestCase):
+    @patch('film_similarity.SIMILARITY_WRITE_CHUNK', 2)
+    @patch('film_similarity.load_neighbor_lists', return_value={})
+    @patch('film_similarity.ensure_schema')
+    def test_fingerprints_saved_after_all_lists(self, *mocks):
+        model = SimilarityModel(range(1, 8), [(10, film_id, 5) for film_id in range(1, 8)], [], [])
+        conn = RecordingConn()
+        with patch('film_similarity.SimilarityModel.load', return_value=model):
+            refresh_similarity(conn)
+        list_writes = [i for i, sql in enumerate(conn.log)
+                       if sql.startswith(("DELETE FROM film_similarity WHERE", "INSERT INTO film_similarity ("))]
+        fingerprint_writes = [i for i, sql in enumerate(conn.log) if sql.startswith("INSERT INTO film_similarity_state")]
+        self.assertEqual(len(fingerprint_writes), 4)
+        self.assertIn("COMMIT", conn.log[max(list_writes):min(fingerprint_writes)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import core
+import megogo_async
+
+SEARCH_PAGE = """<html><body>
+<div class="card"><div class="thumb"><img data-original="https://img/{name}.jpg"></div>
+<a class="card-content-title" href="http://127.0.0.1:{port}/film/{name}"><h3 class="card-title">{name}</h3></a></div>
+</body></html>"""
+
+FILM_PAGE = """<html><body>
+<h1 class="video-title" itemprop="name">{name}</h1>
+<div class="video-info"><span class="video-year">2021</span><span class="video-country">США</span></div>
+<a class="video-genre">Драма</a><a class="video-genre">Фантастика</a>
+<div class="trailer-overlay svod"><div class="stub-description">Передплата від 99 грн</div></div>
+</body></html>"""
+
+class MegogoStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        port = self.server.server_port
+        if self.path.startswith("/search/"):
+            name = self.path.rsplit('/', 1)[-1]
+            body = SEARCH_PAGE.format(name=name, port=port)
+        elif self.path.startswith("/film/"):
+            body = FILM_PAGE.format(name=self.path.rsplit('/', 1)[-1])
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestMegogoAsync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MegogoStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def search_url(self, name):
+        return f"{self.base}/search/{name}"
+
+    def test_client_submit(self):
+        client = megogo_async.MegogoAsyncClient(max_in_flight=2, min_interval=0)
+        try:
+            with patch('megogo_async.megogo_search_url', side_effect=self.search_url):
+                megogo_data, _ = client.submit("dune").result(timeout=10)
+            stats = client.stats
+        finally:
+            client.close()
+        self.assertEqual(megogo_data, core.parse_film_page_megogo(f"{self.base}/film/dune"))
+        self.assertEqual(megogo_data["name"], "dune")
+        self.assertEqual(megogo_data["geners"], "Драма, Фантастика")
+        # Пошук і сторінка фільму йдуть одним keep-alive з'єднанням
+        self.assertEqual(stats, {"requests": 2, "retries": 0, "connections_opened": 1, "connections_reused": 1})
+
+if __name__ == '__main__':
+    unittest.main()
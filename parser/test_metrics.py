@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import metrics
+from metrics import Metrics
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def outcomes(self, stage):
+        return self.metrics.stage_summary()[stage]["outcomes"]
+
+    def test_outcome_from_result_set_outcome_and_errors(self):
+        @self.metrics.timed("search", outcome=metrics.found)
+        def search(name):
+            if name == "cached":
+                metrics.set_outcome("cached")
+                return {"url": "x"}
+            if name == "broken":
+                raise RuntimeError("boom")
+            return {"url": name} if name else None
+
+        search("a"); search(""); search("cached")
+        with self.assertRaises(RuntimeError):
+            search("broken")
+        self.assertEqual(self.outcomes("search"), {"found": 1, "not_found": 1, "cached": 1, "error": 1})
+
+    def test_nested_timer_marks_innermost_stage(self):
+        with self.metrics.timer("outer"):
+            with self.metrics.timer("inner"):
+                metrics.set_outcome("timeout")
+        self.assertEqual(self.outcomes("inner"), {"timeout": 1})
+        self.assertEqual(self.outcomes("outer"), {"ok": 1})
+
+    def test_coroutines_are_timed(self):
+        @self.metrics.timed("page", outcome=lambda data: "parsed" if data else "error", mode="async")
+        async def page(ok):
+            await asyncio.sleep(0)
+            return {"ok": True} if ok else None
+
+        async def run():
+            return await asyncio.gather(page(True), page(False), page(True))
+
+        asyncio.run(run())
+        self.assertEqual(self.outcomes("page"), {"parsed": 2, "error": 1})
+
+    def test_prometheus_text(self):
+        self.metrics.observe("megogo_page", 0.2, outcome="parsed")
+        self.metrics.observe("megogo_page", 3.0, outcome="parsed")
+        self.metrics.count("http_requests", host="megogo.net", status=200)
+        self.metrics.count("http_requests", 2, host="megogo.net", status=200)
+        text = self.metrics.prometheus_text()
+        self.assertIn('parser_stage_seconds_bucket{stage="megogo_page",outcome="parsed",le="0.25"} 1', text)
+        self.assertIn('parser_stage_seconds_bucket{stage="megogo_page",outcome="parsed",le="5"} 2', text)
+        self.assertIn('parser_stage_seconds_count{stage="megogo_page",outcome="parsed"} 2', text)
+        self.assertIn('parser_http_requests_total{host="megogo.net",status="200"} 3', text)
+
+    def test_run_writes_log_and_prometheus_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = self.metrics.start_run("daily", directory)
+            self.metrics.count("queries", outcome="created")
+            with self.metrics.timer("db_commit"):
+                pass
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                self.metrics.finish_run(directory)
+            with open(log_path, encoding='utf-8') as f:
+                events = [json.loads(line) for line in f]
+            self.assertEqual([e["type"] for e in events], ["counter", "timer", "summary"])
+            self.assertEqual(events[1]["stage"], "db_commit")
+            self.assertTrue(os.path.exists(os.path.join(directory, "daily.prom")))
+            self.assertIn("db_commit", out.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+from decimal import Decimal
+from core import parse_megogo_film_html, parse_megogo_options, parse_sweettv_options
+from normalize import (
+    duration_minutes, film_column_values, imdb_rating, normalize_platform_rows, normalize_record,
+    normalize_records, release_year, split_list
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Поля так, як їх віддає parse_film_page_sweettv_http / extract_sweettv_film_fields
+SWEETTV_RECORD = {
+    "name": "Дюна: Частина друга", "imdb_rating": "8.5", "country": "США, Канада",
+    "geners": "Фантастика, Пригоди", "duration": "166 хв", "release_year": "2024",
+    "access_options_PK": '{"Купівля": {"HD": "149 грн", "4K": "199 грн"}, "Оренда": {"HD": "69 грн"}}',
+}
+
+class TestFieldParsers(unittest.TestCase):
+    def test_duration(self):
+        cases = {"166 хв": 166, "2 год 46 хв": 166, "1 год": 60, "95": 95, "1 h 30 min": 90, None: None, "": None}
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(duration_minutes(text), expected)
+
+    def test_year_and_rating(self):
+        self.assertEqual(release_year("2024"), 2024)
+        self.assertEqual(release_year("2024 р."), 2024)
+        self.assertIsNone(release_year("N/A"))
+        self.assertEqual(imdb_rating("8,5"), Decimal("8.5"))
+        self.assertEqual(imdb_rating("7.5,"), Decimal("7.5"))
+        self.assertIsNone(imdb_rating("87"))
+        self.assertIsNone(imdb_rating(None))
+
+    def test_lists(self):
+        self.assertEqual(split_list("США, Канада,  США"), ["США", "Канада"])
+        self.assertEqual(split_list(["Драма ", "", "Драма"]), ["Драма"])
+        self.assertEqual(split_list(""), [])
+
+class TestNormalizeRecords(unittest.TestCase):
+    def test_megogo_and_sweettv_records_agree(self):
+        with open(os.path.join(FIXTURES_DIR, 'megogo_film.html'), encoding='utf-8') as f:
+            megogo = parse_megogo_film_html(f.read(), "https://megogo.net/ua/view/200")
+        megogo_typed, sweettv_typed = normalize_records([megogo, SWEETTV_RECORD])
+        for field in ("duration", "release_year", "imdb_rating", "country"):
+            with self.subTest(field=field):
+                self.assertEqual(megogo_typed[field], sweettv_typed[field])
+        self.assertEqual(megogo_typed["duration"], 166)
+        self.assertEqual(megogo_typed["imdb_rating"], Decimal("8.5"))
+        self.assertEqual(megogo_typed["geners"], ["Фантастика", "Пригоди", "Драма"])
+        self.assertEqual(megogo["duration"], "2 год 46 хв")
+
+    def test_film_columns_are_canonical(self):
+        columns = film_column_values(normalize_record({"duration": "2 год 46 хв", "imdb_rating": "8,5",
+                                                       "release_year": "2024", "country": "США,Канада"}))
+        self.assertEqual(columns["duration"], "166 хв")
+        self.assertEqual(columns["imdb_rating"], "8.5")
+        self.assertEqual(columns["release_year"], "2024")
+        self.assertEqual(columns["country"], "США, Канада")
+        self.assertIsNone(film_column_values(normalize_record({}))["duration"])
+
+class TestNormalizePlatformRows(unittest.TestCase):
+    def test_prices_become_decimal(self):
+        rows = normalize_platform_rows(parse_sweettv_options(1, 2, SWEETTV_RECORD["access_options_PK"]))
+        self.assertIn((1, 2, "Купівля (HD)", Decimal("149.00")), rows)
+        self.assertIn((1, 2, "Оренда (HD)", Decimal("69.00")), rows)
+
+    def test_megogo_subscription_and_duplicates(self):
+        options = ('[{"type": "Передплата", "description": "від 149 грн на місяць"},'
+                   ' {"type": "Оренда", "quality": "HD", "price": "79"}, {"type": "Оренда", "quality": "HD", "price": "79"}]')
+        self.assertEqual(normalize_platform_rows(parse_megogo_options(1, 1, options)), [
+            (1, 1, "Підписка", Decimal("149.00")), (1, 1, "Оренда (HD)", Decimal("79.00")),
+        ])
+        self.assertEqual(normalize_platform_rows([(1, 1, " Передплата ", None)]), [(1, 1, "Підписка", None)])
+
+    def test_distinct_offers_are_kept(self):
+        rows = [(1, 1, "Оренда", "49"), (1, 1, "Оренда", "79.00"), (1, 1, " Оренда", 49), (1, 1, "Передплата", "149")]
+        self.assertEqual(normalize_platform_rows(rows), [
+            (1, 1, "Оренда", Decimal("49.00")), (1, 1, "Оренда", Decimal("79.00")), (1, 1, "Підписка", Decimal("149.00")),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
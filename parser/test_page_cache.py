@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from core import parse_film_page_megogo
+from page_cache import PageCache
+import megogo_async
+
+FILM_PAGE = '<h1 class="video-title" itemprop="name">Дюна</h1><a class="video-genre">Драма</a>'
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = FILM_PAGE
+    conditional_hits = 0
+
+    def do_GET(self):
+        etag = f'"{len(EtagHandler.body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            EtagHandler.conditional_hits += 1
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = EtagHandler.body.encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.fixture_dir = os.path.join(self.tmp.name, "fixtures")
+        os.makedirs(self.fixture_dir)
+        with open(os.path.join(self.fixture_dir, "dune.html"), "w", encoding="utf-8") as f:
+            f.write(FILM_PAGE)
+        with open(os.path.join(self.fixture_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"https://megogo.net/ua/view/1-dune.html": "dune.html"}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_offline_unchanged_after_processing(self):
+        url = "https://megogo.net/ua/view/1-dune.html"
+        cache = PageCache(self.cache_dir, ttl=0, fixture_dir=self.fixture_dir, offline=True)
+        first = parse_film_page_megogo(url, cache, skip_unchanged=True)
+        self.assertEqual(first["name"], "Дюна")
+        # Без mark_processed сторінка все ще вважається зміненою (запис у БД міг не відбутися)
+        self.assertEqual(parse_film_page_megogo(url, cache, skip_unchanged=True)["name"], "Дюна")
+        cache.mark_processed(url)
+        self.assertEqual(parse_film_page_megogo(url, cache, skip_unchanged=True), {"url": url, "unchanged": True})
+
+        with open(os.path.join(self.fixture_dir, "dune.html"), "w", encoding="utf-8") as f:
+            f.write(FILM_PAGE.replace("Драма", "Фантастика"))
+        cache = PageCache(self.cache_dir, ttl=0, fixture_dir=self.fixture_dir, offline=True)
+        self.assertEqual(parse_film_page_megogo(url, cache, skip_unchanged=True)["geners"], "Фантастика")
+
+    def test_conditional_revalidation(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/film"
+        hits = EtagHandler.conditional_hits
+        try:
+            cache = PageCache(self.cache_dir, ttl=0)
+            html, changed = cache.fetch(url)
+            self.assertTrue(changed)
+            cache.mark_processed(url)
+            html_again, changed = cache.fetch(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(html_again, html)
+        self.assertFalse(changed)
+        self.assertEqual(EtagHandler.conditional_hits, hits + 1)
+        self.assertEqual(cache.stats["not_modified"], 1)
+
+    def test_not_modified_without_stored_body_refetches(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/film"
+        hits = EtagHandler.conditional_hits
+        try:
+            cache = PageCache(self.cache_dir, ttl=0)
+            headers = {"If-None-Match": f'"{len(EtagHandler.body)}"'}
+            cache.fetch(url)
+            # Тіло прибрали вже після того, як умовні заголовки були відправлені
+            for name in os.listdir(os.path.join(self.cache_dir, "bodies")):
+                os.remove(os.path.join(self.cache_dir, "bodies", name))
+            with patch.object(cache, 'conditional_headers', return_value=headers):
+                html, _ = cache.fetch(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(html, FILM_PAGE)
+        self.assertEqual(EtagHandler.conditional_hits, hits + 1)
+        self.assertEqual(cache.stats["not_modified"], 0)
+
+    def test_async_not_modified_without_stored_body_refetches(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/film"
+        cache = PageCache(self.cache_dir, ttl=0)
+        cache.store(url, 200, {"ETag": f'"{len(EtagHandler.body)}"'}, "стара копія")
+        for name in os.listdir(os.path.join(self.cache_dir, "bodies")):
+            os.remove(os.path.join(self.cache_dir, "bodies", name))
+
+        async def fetch():
+            limiter = megogo_async._Limiter(1, 0)
+            async with megogo_async._create_session(1, limiter) as session:
+                with patch.object(cache, 'conditional_headers', return_value={"If-None-Match": f'"{len(EtagHandler.body)}"'}):
+                    return await megogo_async._fetch_cached(session, limiter, url, cache)
+        try:
+            html, changed = asyncio.run(fetch())
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(html, FILM_PAGE)
+        self.assertTrue(changed)
+
+    def test_eviction_by_size(self):
+        cache = PageCache(self.cache_dir, max_bytes=250)
+        for i in range(5):
+            cache.store(f"https://megogo.net/{i}", 200, {}, str(i) * 100)
+        cache.evict()
+        bodies = os.listdir(os.path.join(self.cache_dir, "bodies"))
+        self.assertEqual(len(bodies), 2)
+        self.assertIsNotNone(cache.fresh("https://megogo.net/4"))
+        self.assertIsNone(cache.fresh("https://megogo.net/0"))
+
+if __name__ == '__main__':
+    unittest.main()
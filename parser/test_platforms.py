@@ -0,0 +1,103 @@
+import time
+import unittest
+from unittest.mock import patch
+from crawler import CrawlEngine
+from platforms import PLATFORMS, PlatformAdapter, build_film_changes, platform_urls, register_platform
+
+PLATFORM_IDS = {'Megogo': 1, 'Sweet.tv': 2, 'Kyivstar TV': 3}
+
+class KyivstarAdapter(PlatformAdapter):
+    name = 'Kyivstar TV'
+    host = 'tv.kyivstar.ua'
+    data_key = 'kyivstar_data'
+    poster_key = 'k_poster'
+    options_field = 'access_options_kyivstar'
+    url_field = 'url_kyivstar'
+    url_column = 'url_kyivstar'
+    min_interval = 0
+
+    @staticmethod
+    def parse_options(film_id, platform_id, options):
+        return [(film_id, platform_id, access_type, price) for access_type, price in options]
+
+    def search(self, film_name):
+        time.sleep(0.2)
+        return {"url": f"https://tv.kyivstar.ua/{film_name}", "poster_url": "k.jpg"}
+
+    def fetch(self, match):
+        return {"name": match['url'].rsplit('/', 1)[-1], "url_kyivstar": match['url'],
+                "access_options_kyivstar": [("Оренда", 59.0)]}
+
+class FakeDriver:
+    def __init__(self, cookies=None):
+        pass
+
+    def execute_script(self, script, *args):
+        return None
+
+    def quit(self):
+        pass
+
+def slow_fetch_sweettv(film_name, *args, **kwargs):
+    time.sleep(0.2)
+    return None, None
+
+class TestPlatformRegistry(unittest.TestCase):
+    def setUp(self):
+        register_platform(KyivstarAdapter)
+
+    def tearDown(self):
+        PLATFORMS.pop(KyivstarAdapter.name)
+
+    def test_new_platform_only_needs_an_adapter(self):
+        result = {"megogo_data": None, "sweettv_data": None, "m_poster": None, "s_poster": None,
+                  "kyivstar_data": {"name": "Дюна", "url_kyivstar": "https://tv.kyivstar.ua/dune",
+                                    "access_options_kyivstar": [("Оренда", 59.0)]},
+                  "k_poster": "k.jpg"}
+        changes = build_film_changes(5, result, PLATFORM_IDS)
+        self.assertEqual(changes["platform_rows"], {1: [], 2: [], 3: [(5, 3, "Оренда", 59.0)]})
+        self.assertEqual(changes["film_urls"], {"url_kyivstar": "https://tv.kyivstar.ua/dune"})
+        self.assertEqual(changes["film_fields"]["poster_url"], "k.jpg")
+
+    def test_full_data_taken_by_platform_priority(self):
+        result = {"megogo_data": {"url": "https://megogo.net/dune", "geners": "Драма"}, "m_poster": None,
+                  "sweettv_data": {"url": "sweet", "access_options_PK": "{}", "url_sweet_tv": "https://sweet.tv/dune"},
+                  "s_poster": "s.jpg"}
+        changes = build_film_changes(5, result, PLATFORM_IDS)
+        self.assertEqual(changes["film_fields"]["url"], "https://megogo.net/dune")
+        self.assertEqual(changes["film_fields"]["poster_url"], "s.jpg")
+        self.assertEqual(changes["genres"], ["Драма"])
+        self.assertEqual(changes["film_urls"], {"url_sweet_tv": "https://sweet.tv/dune"})
+        self.assertEqual(platform_urls(result), ["https://megogo.net/dune", "https://sweet.tv/dune"])
+
+    def test_incomplete_adapter_fails_on_creation(self):
+        class NoFetchAdapter(PlatformAdapter):
+            name = 'NoFetch'
+
+            @staticmethod
+            def parse_options(film_id, platform_id, options):
+                return []
+
+            def search(self, film_name):
+                return None
+
+        with self.assertRaises(TypeError):
+            NoFetchAdapter([])
+
+    @patch('platforms.fetch_sweettv', side_effect=slow_fetch_sweettv)
+    @patch('platforms.search_megogo', side_effect=lambda name, resolution_cache=None: time.sleep(0.2))
+    def test_platforms_are_queried_in_parallel(self, *mocks):
+        engine = CrawlEngine([], megogo_min_interval=0, sweettv_min_interval=0, driver_factory=FakeDriver)
+        try:
+            start = time.monotonic()
+            [result] = list(engine.crawl([{"id": 1, "name": "dune"}]))
+            elapsed = time.monotonic() - start
+        finally:
+            engine.close()
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(result["kyivstar_data"]["name"], "dune")
+        self.assertEqual(result["k_poster"], "k.jpg")
+        self.assertIsNone(result["megogo_data"])
+
+if __name__ == '__main__':
+    unittest.main()
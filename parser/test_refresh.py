@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from refresh import RunCheckpoint, stale_params, stream_stale_films, NEVER_REFRESHED
+
+class PagedCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params):
+        self.conn.queries.append(params)
+        last_key = (params[-3], params[-2])
+        rows = [row for row in self.conn.rows if (row['last_refreshed_at'], row['id']) > last_key]
+        self.rows = rows[:params[-1]]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+class PagedConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def cursor(self, cursor_class=None):
+        return PagedCursor(self)
+
+    def commit(self):
+        pass
+
+class TestStaleFilms(unittest.TestCase):
+    def test_stream_pages_by_refresh_key(self):
+        old = datetime(2026, 1, 1)
+        rows = [{"id": i, "name": f"film{i}", "last_refreshed_at": NEVER_REFRESHED} for i in (3, 5)]
+        rows += [{"id": i, "name": f"film{i}", "last_refreshed_at": old} for i in (1, 2, 4)]
+        conn = PagedConn(rows)
+        films = list(stream_stale_films(conn, datetime(2026, 10, 1), page_size=2))
+        self.assertEqual([f['id'] for f in films], [3, 5, 1, 2, 4])
+        self.assertEqual(len(conn.queries), 3)
+        self.assertEqual(conn.queries[1][-3:-1], (NEVER_REFRESHED, 5))
+
+    def test_volatile_films_have_shorter_interval(self):
+        started = datetime(2026, 10, 1)
+        run_cutoff, static_cutoff, window_start, volatile_cutoff = stale_params(started)
+        self.assertEqual(run_cutoff, started)
+        self.assertLess(static_cutoff, volatile_cutoff)
+        self.assertLess(window_start, volatile_cutoff)
+
+class TestRunCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_crashed_run_is_resumed_with_same_start(self):
+        started = datetime(2026, 10, 1, 3, 0)
+        checkpoint = RunCheckpoint(self.path)
+        self.assertFalse(checkpoint.resumed)
+        self.assertEqual(checkpoint.start(started), started)
+        checkpoint.advance(50)
+
+        resumed = RunCheckpoint(self.path)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.start(started + timedelta(hours=5)), started)
+        self.assertEqual(resumed.state['refreshed'], 50)
+
+        resumed.finish()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(RunCheckpoint(self.path).resumed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from core import search_megogo
+from resolution_cache import ResolutionCache
+
+class TestResolutionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResolutionCache(os.path.join(self.tmp.name, "cache.sqlite"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_normalized_queries_share_entry(self):
+        match = {"url": "https://megogo.net/ua/view/1-dune.html", "title": "Дюна", "poster_url": None}
+        self.cache.put("Megogo", "Dune: Part Two (2024)", match)
+        self.assertEqual(self.cache.get("Megogo", "dune part two"), (True, match))
+        self.assertEqual(self.cache.get("Sweet.tv", "dune part two"), (False, None))
+
+    def test_negative_result_expires_sooner(self):
+        self.cache.put("Megogo", "невідомий фільм", None)
+        self.assertEqual(self.cache.get("Megogo", "невідомий фільм"), (True, None))
+        self.cache.miss_ttl = -1
+        self.assertEqual(self.cache.get("Megogo", "невідомий фільм"), (False, None))
+
+    @patch('core.http_get', side_effect=AssertionError("мережа не повинна викликатись"))
+    def test_search_megogo_uses_cache(self, _):
+        match = {"url": "https://megogo.net/ua/view/2-matrix.html", "title": "Матриця", "poster_url": "p.jpg"}
+        self.cache.put("Megogo", "Матриця", match)
+        self.assertEqual(search_megogo("матриця", self.cache), match)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_wal_journal(self):
+        self.assertEqual(self.cache._conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    @patch('core.http_get')
+    def test_locked_cache_is_a_miss(self, http_get):
+        http_get.return_value.text = "<html></html>"
+        with patch.object(self.cache, 'get', side_effect=sqlite3.OperationalError("database is locked")), \
+                patch.object(self.cache, 'put', side_effect=sqlite3.OperationalError("database is locked")):
+            self.assertIsNone(search_megogo("матриця", self.cache))
+        http_get.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
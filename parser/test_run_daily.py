@@ -0,0 +1,72 @@
+import contextlib
+import io
+import unittest
+from run_daily import BatchSizer, iter_claimed_queries
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestBatchSizer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sizer = BatchSizer(budget=600, initial=20, min_batch=5, max_batch=200, clock=self.clock)
+
+    def test_starts_with_initial_batch(self):
+        self.assertEqual(self.sizer.next_size(), 20)
+        self.sizer.claimed = 20
+        self.assertEqual(self.sizer.next_size(), 5)
+
+    def test_size_follows_throughput_and_remaining_budget(self):
+        self.sizer.claimed, self.sizer.processed = 30, 20
+        self.clock.now = 100
+        # 0.2 запиту/с * 500 с = 100, мінус 10 "в польоті"
+        self.assertEqual(self.sizer.next_size(), 90)
+        self.clock.now = 580
+        self.sizer.processed = 30
+        self.assertEqual(self.sizer.next_size(), 5)
+        self.clock.now = 599
+        self.assertEqual(self.sizer.next_size(), 0)
+
+    def test_capped_by_max_batch(self):
+        self.sizer.claimed = self.sizer.processed = 100
+        self.clock.now = 10
+        self.assertEqual(self.sizer.next_size(), 200)
+
+class TestIterClaimedQueries(unittest.TestCase):
+    def test_claims_until_queue_empty(self):
+        pending = [{"log_id": i, "query_text": f"q{i}"} for i in range(12)]
+        sizes = []
+
+        def claim(limit):
+            sizes.append(limit)
+            batch = pending[:limit]
+            del pending[:limit]
+            return batch
+
+        sizer = BatchSizer(budget=600, initial=5, min_batch=5, clock=FakeClock())
+        logs = list(iter_claimed_queries(claim, sizer))
+        self.assertEqual([log['log_id'] for log in logs], list(range(12)))
+        self.assertEqual(sizes, [5, 5, 5, 5])
+        self.assertEqual(sizer.claimed, 12)
+
+    def test_stops_when_budget_spent(self):
+        clock = FakeClock()
+        sizer = BatchSizer(budget=60, clock=clock)
+        claimed = []
+
+        def claim(limit):
+            clock.now = 61
+            claimed.append(limit)
+            return [{"log_id": len(claimed), "query_text": "q"}]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            logs = list(iter_claimed_queries(claim, sizer))
+        self.assertEqual(len(logs), 1)
+        self.assertEqual(len(claimed), 1)
+
+if __name__ == '__main__':
+    unittest.main()
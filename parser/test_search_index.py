@@ -0,0 +1,39 @@
+import unittest
+from decimal import Decimal
+from search_index import ACCESS_FLAGS, access_class, build_search_rows
+
+class TestAccessClass(unittest.TestCase):
+    def test_access_class(self):
+        self.assertEqual(access_class("Безкоштовно"), "free")
+        self.assertEqual(access_class("Підписка (Преміум)"), "subscription")
+        self.assertEqual(access_class("Оренда (HD)"), "rent")
+        self.assertEqual(access_class("Прокат"), "rent")
+        self.assertEqual(access_class("Купівля (4K)"), "purchase")
+        self.assertIsNone(access_class("N/A"))
+
+class TestBuildSearchRows(unittest.TestCase):
+    def test_min_price_per_platform_and_class(self):
+        film = {"id": 3, "normalized_name": "дюна", "release_year": "2021", "duration": "2 год 35 хв",
+                "imdb_rating": "8,0", "country": "США, Канада"}
+        platform_rows = [
+            (1, "Оренда (HD)", Decimal("99.00")), (1, "Оренда (SD)", Decimal("79.00")),
+            (1, "Підписка", None), (2, "Підписка (Преміум)", Decimal("149.00")), (2, "N/A", Decimal("1.00")),
+        ]
+        search_row, countries, prices = build_search_rows(film, platform_rows)
+        self.assertEqual(search_row, (3, "дюна", 2021, 155, Decimal("8.0"),
+                                      ACCESS_FLAGS["rent"] | ACCESS_FLAGS["subscription"]))
+        self.assertEqual(countries, [("США", 3), ("Канада", 3)])
+        self.assertEqual(prices, [(3, 1, "rent", Decimal("79.00")), (3, 1, "subscription", None),
+                                  (3, 2, "subscription", Decimal("149.00"))])
+
+    def test_countries_deduplicated_case_insensitively(self):
+        _, countries, _ = build_search_rows({"id": 5, "country": "США, сша, " + "Я" * 120 + ", " + "я" * 101}, [])
+        self.assertEqual(countries, [("США", 5), ("Я" * 100, 5)])
+
+    def test_film_without_offers(self):
+        search_row, countries, prices = build_search_rows({"id": 4}, [])
+        self.assertEqual(search_row, (4, None, None, None, None, 0))
+        self.assertEqual((countries, prices), ([], []))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from sweettv_http import NEEDS_BROWSER, search_sweettv_http, parse_film_page_sweettv_http, fetch_sweettv
+
+SEARCH_HTML = """<div class="swiper-slide"><a class="swiper-slide-wrap" href="/uk/movie/123-dune">
+<img src="data:image/gif;base64,xx" data-src="https://static.sweet.tv/dune.jpg">
+<span class="movie-card__title">Дюна</span></a></div>"""
+
+FILM_HTML = """<h1 class="movie__title">Дюна</h1>
+<div class="movie-info__buttons"><button class="movie-info__buttons-button">Орендувати</button></div>
+<div class="movie-offers__modal-purchase"><div class="movie-offers__modal-purchase-title">Оренда</div>
+<div class="movie-offers__modal-purchase-offers-offer"><span class="movie-offers__modal-purchase-offers-offer-title">HD</span>
+<span class="movie-offers__modal-purchase-offers-offer-price-amount">99 грн</span></div></div>
+<p id="film_description">Опис</p><p class="desc-film-countries"><a>США</a></p>"""
+
+def page(html):
+    response = MagicMock()
+    response.text = html
+    return response
+
+class TestSweetTvHttp(unittest.TestCase):
+    @patch('sweettv_http.http_get', return_value=page(SEARCH_HTML))
+    def test_search_without_browser(self, _):
+        match = search_sweettv_http("Дюна", [], get_poster=True)
+        self.assertEqual(match["url"], "https://sweet.tv/uk/movie/123-dune")
+        self.assertEqual(match["poster_url"], "https://static.sweet.tv/dune.jpg")
+
+    @patch('sweettv_http.http_get', return_value=page("<div id='app'></div>"))
+    def test_client_rendered_search_needs_browser(self, _):
+        self.assertIs(search_sweettv_http("Дюна", []), NEEDS_BROWSER)
+
+    @patch('sweettv_http.http_get', return_value=page(FILM_HTML))
+    def test_film_page_offers(self, _):
+        film_data = parse_film_page_sweettv_http("https://sweet.tv/x", [], parse_full_data=True)
+        self.assertEqual(json.loads(film_data["access_options_PK"]), {"Оренда": {"HD": "99 грн"}})
+        self.assertEqual(film_data["country"], "США")
+        self.assertEqual(film_data["description"], "Опис")
+
+    @patch('sweettv_http.http_get', return_value=page(
+        '<h1 class="movie__title">Дюна</h1><button class="movie-info__buttons-button">Дивитися у передплаті</button>'))
+    def test_subscription_page_needs_browser(self, _):
+        self.assertIs(parse_film_page_sweettv_http("https://sweet.tv/x", [], False), NEEDS_BROWSER)
+
+    @patch('sweettv_http.http_get', return_value=page(
+        '<h1 class="movie__title">Дюна</h1><button class="movie-info__buttons-button">Орендувати</button>'))
+    def test_buttons_without_offers_need_browser(self, _):
+        self.assertIs(parse_film_page_sweettv_http("https://sweet.tv/x", [], False), NEEDS_BROWSER)
+
+    @patch('sweettv_http.http_get', return_value=page(
+        '<h1 class="movie__title">Дюна</h1><button class="movie-info__buttons-button">Дивитися безкоштовно</button>'))
+    def test_free_button_is_zero_price(self, _):
+        film_data = parse_film_page_sweettv_http("https://sweet.tv/x", [], False)
+        self.assertEqual(json.loads(film_data["access_options_PK"]), {"M": "0 грн"})
+
+    @patch('sweettv_http._fetch_title', side_effect=lambda url, cookies: {"/1": "Дюна 2", "/2": "Дюна"}.get(url.rsplit('sweet.tv', 1)[-1]))
+    @patch('sweettv_http.http_get', return_value=page(
+        '<div class="swiper-slide"><a class="swiper-slide-wrap" href="/1"></a><a class="swiper-slide-wrap" href="/2"></a></div>'))
+    def test_untitled_cards_resolved_concurrently(self, _, fetch_title):
+        match = search_sweettv_http("Дюна", [])
+        self.assertEqual(match["url"], "https://sweet.tv/2")
+        self.assertEqual(fetch_title.call_count, 2)
+
+    @patch('sweettv_http.parse_film_page_sweettv', return_value={"access_options_PK": "{}"})
+    @patch('sweettv_http.search_sweettv')
+    @patch('sweettv_http.http_get', side_effect=[page(SEARCH_HTML), page("<div id='app'></div>")])
+    def test_falls_back_to_driver_for_page_only(self, _, search_sweettv, parse_page):
+        driver = MagicMock()
+        pool = MagicMock()
+        pool.driver.return_value.__enter__.return_value = driver
+        sweettv_data, _ = fetch_sweettv("Дюна", [], pool)
+        search_sweettv.assert_not_called()
+        driver.get.assert_called_once_with("https://sweet.tv/uk/movie/123-dune")
+        self.assertEqual(sweettv_data["url_sweet_tv"], "https://sweet.tv/uk/movie/123-dune")
+
+if __name__ == '__main__':
+    unittest.main()
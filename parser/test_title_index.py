@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from title_index import TitleIndex, transliterate
+
+FILMS = [
+    {"id": 1, "name": "Матриця"},
+    {"id": 2, "name": "Дюна"},
+    {"id": 3, "name": "Дюна: Частина друга"},
+    {"id": 4, "name": "Оппенгеймер"},
+    {"id": 5, "name": "Гаррі Поттер і філософський камінь"},
+]
+
+class FilmsCursor:
+    def __init__(self, films):
+        self.films = films
+
+    def execute(self, sql, params):
+        max_id = params[0]
+        if "COUNT(*)" in sql:
+            self.result = [{"total": sum(1 for f in self.films if f['id'] <= max_id)}]
+        else:
+            self.result = [f for f in self.films if f['id'] > max_id]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+class TestTitleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TitleIndex()
+        self.index.refresh(FilmsCursor(FILMS))
+
+    def test_typos_and_transliteration(self):
+        self.assertEqual(self.index.lookup("матриця")[0], 1)
+        self.assertEqual(self.index.lookup("Matrytsia")[0], 1)
+        self.assertEqual(self.index.lookup("Опенгеймер")[0], 4)
+        self.assertEqual(self.index.lookup("Гарі Потер і філософський камінь")[0], 5)
+        self.assertEqual(transliterate("щедрик"), "shchedryk")
+
+    def test_sequels_and_unknown_titles_do_not_match(self):
+        self.assertEqual(self.index.lookup("Дюна")[0], 2)
+        self.assertEqual(self.index.lookup("Дюна: Частина друга (2024)")[0], 3)
+        self.assertIsNone(self.index.lookup("Аватар"))
+        self.assertIsNone(self.index.lookup(""))
+
+    def test_exact_lookup(self):
+        self.assertEqual(self.index.exact_lookup("  МАТРИЦЯ "), 1)
+        self.assertEqual(self.index.exact_lookup("matrytsia"), 1)
+        self.assertEqual(self.index.exact_lookup("Дюна - Частина  друга"), 3)
+        self.assertIsNone(self.index.exact_lookup("Опенгеймер"))
+        self.assertIsNone(self.index.exact_lookup("Дюна (1984)"))
+        self.assertIsNone(self.index.exact_lookup("Дюна: Частина третя"))
+
+    def test_persisted_index_is_extended_incrementally(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.json")
+            self.index.save(path)
+            loaded = TitleIndex.load(path)
+            self.assertEqual(loaded.lookup("Оппенгеймер")[0], 4)
+            self.assertEqual(loaded.exact_lookup("Оппенгеймер"), 4)
+            added = loaded.refresh(FilmsCursor(FILMS + [{"id": 6, "name": "Барбі"}]))
+            self.assertEqual(added, 1)
+            self.assertEqual(loaded.lookup("барбі")[0], 6)
+
+    def test_deleted_films_trigger_rebuild(self):
+        self.index.refresh(FilmsCursor(FILMS[1:]))
+        self.assertIsNone(self.index.lookup("Матриця"))
+        self.assertEqual(len(self.index), 4)
+
+    def test_unindexable_names_do_not_trigger_rebuild(self):
+        films = FILMS + [{"id": 6, "name": "  "}, {"id": 7, "name": None}]
+        self.assertEqual(self.index.refresh(FilmsCursor(films)), 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.json")
+            self.index.save(path)
+            loaded = TitleIndex.load(path)
+        with patch('builtins.print') as log:
+            self.assertEqual(loaded.refresh(FilmsCursor(films)), 0)
+        log.assert_not_called()
+        self.assertEqual(loaded.max_film_id, 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pipeline
+from work_queue import JOB_FILM, JOB_QUERY, WorkQueue
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue.sqlite")
+        self.queue = WorkQueue(self.path)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_enqueue_deduplicates_until_done(self):
+        self.assertTrue(self.queue.enqueue(JOB_FILM, 7, {"film_id": 7, "name": "Дюна"}))
+        self.assertFalse(self.queue.enqueue(JOB_FILM, 7, {"film_id": 7, "name": "Дюна"}))
+        self.assertTrue(self.queue.enqueue(JOB_QUERY, 7, {"log_id": 7, "name": "дюна"}))
+
+        [job] = self.queue.claim("w1", kinds=[JOB_FILM])
+        self.queue.complete(job['job_id'], "w1", {"megogo_data": None})
+        [item] = self.queue.fetch_results()
+        self.queue.ack([item['result_id']])
+        self.assertTrue(self.queue.enqueue(JOB_FILM, 7, {"film_id": 7, "name": "Дюна"}))
+
+    def test_claim_is_exclusive_across_connections(self):
+        for i in range(5):
+            self.queue.enqueue(JOB_FILM, i, {"film_id": i, "name": f"film{i}"}, priority=i % 2)
+        other = WorkQueue(self.path)
+        try:
+            first = self.queue.claim("w1", limit=3)
+            second = other.claim("w2", limit=3)
+        finally:
+            other.close()
+        self.assertEqual([job['key'] for job in first], ["1", "3", "0"])
+        self.assertEqual([job['key'] for job in second], ["2", "4"])
+
+    def test_expired_lease_is_reclaimed_and_stale_worker_ignored(self):
+        self.queue.lease = -1
+        self.queue.enqueue(JOB_FILM, 1, {"film_id": 1, "name": "a"})
+        [job] = self.queue.claim("w1")
+        [again] = self.queue.claim("w2")
+        self.assertEqual(again['attempt'], 2)
+        self.assertFalse(self.queue.complete(job['job_id'], "w1", {"megogo_data": None}))
+        self.assertTrue(self.queue.complete(job['job_id'], "w2", {"megogo_data": None}))
+        self.assertEqual(len(self.queue.fetch_results()), 1)
+
+    def test_failed_job_retried_then_given_up(self):
+        self.queue.max_attempts = 2
+        self.queue.enqueue(JOB_QUERY, 1, {"log_id": 1, "name": "a"})
+        for _ in range(2):
+            [job] = self.queue.claim("w1")
+            self.queue.fail(job['job_id'], "w1", RuntimeError("chrome crashed"))
+        self.assertEqual(self.queue.claim("w1"), [])
+        self.assertEqual(self.queue.counts()["failed"], 1)
+
+    def test_result_that_fails_to_write_is_given_up(self):
+        self.queue.max_attempts = 2
+        self.queue.enqueue(JOB_QUERY, 1, {"log_id": 1, "name": "a"})
+        [job] = self.queue.claim("w1")
+        self.queue.complete(job['job_id'], "w1", {"megogo_data": None})
+        [item] = self.queue.fetch_results()
+        self.assertEqual(self.queue.reject([item['result_id']], RuntimeError("Data too long")), 0)
+        self.assertEqual(len(self.queue.fetch_results()), 1)
+        self.assertEqual(self.queue.reject([item['result_id']], RuntimeError("Data too long")), 1)
+        self.assertEqual(self.queue.fetch_results(), [])
+        self.assertEqual(self.queue.counts()["failed"], 1)
+        self.assertTrue(self.queue.is_drained())
+
+    def test_results_fetched_after_last_seen(self):
+        for i in range(3):
+            self.queue.enqueue(JOB_FILM, i, {"film_id": i, "name": f"film{i}"})
+        for job in self.queue.claim("w1", limit=3):
+            self.queue.complete(job['job_id'], "w1", {"megogo_data": {"name": job['key']}})
+        first = self.queue.fetch_results(limit=2)
+        rest = self.queue.fetch_results(after=first[-1]['result_id'])
+        self.assertEqual([item['result']['megogo_data']['name'] for item in first + rest], ["0", "1", "2"])
+        self.queue.ack([item['result_id'] for item in first])
+        self.assertFalse(self.queue.is_drained())
+        self.queue.ack([item['result_id'] for item in rest])
+        self.assertTrue(self.queue.is_drained())
+
+class FakeEngine:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def crawl(self, films):
+        for film in films:
+            if film['name'] == "broken":
+                raise RuntimeError("driver pool exhausted")
+            yield {"film": film, "megogo_data": {"name": film['name']}, "sweettv_data": None,
+                   "m_poster": None, "s_poster": None}
+
+    def http_stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+class TestWorker(unittest.TestCase):
+    @patch('pipeline.metrics')
+    @patch('pipeline.load_cookies', return_value=[])
+    @patch('pipeline.ResolutionCache')
+    @patch('pipeline.CrawlEngine', FakeEngine)
+    def test_worker_pushes_results_and_requeues_interrupted_batch(self, *mocks):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "queue.sqlite")
+            queue = WorkQueue(path)
+            for i, name in enumerate(["a", "broken", "c"]):
+                queue.enqueue(JOB_QUERY, i, {"log_id": i, "name": name})
+            with patch('pipeline.WORKER_CLAIM_BATCH', 2):
+                pipeline.run_worker(queue_path=path)
+            counts = queue.counts()
+            names = sorted(item['payload']['name'] for item in queue.fetch_results())
+            queue.close()
+        self.assertEqual(names, ["a", "c"])
+        self.assertEqual(counts["failed"], 1)
+        self.assertEqual(counts.get("pending", 0), 0)
+
+if __name__ == '__main__':
+    unittest.main()
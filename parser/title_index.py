@@ -0,0 +1,148 @@
+import json
+import os
+from collections import Counter
+from matching import TITLE_MATCH_THRESHOLD, normalize_title, best_title_match, title_year
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+TITLE_INDEX_PATH = os.path.join(base_dir, 'title_index.json')
+# Скільки кандидатів за кількістю спільних триграм переранжовується точним матчером
+TITLE_INDEX_CANDIDATES = 20
+
+# Транслітерація за таблицею КМУ 2010, щоб "matrytsia" знаходило "Матриця"
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh',
+    'з': 'z', 'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n',
+    'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', 'ё': 'e', 'ы': 'y', 'э': 'e', 'ъ': '',
+}
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+
+
+def transliterate(text):
+    return text.translate(_TRANSLIT_TABLE)
+
+
+def exact_key(key):
+    return " ".join(key.split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Триграмний індекс назв фільмів з бази. lookup() знаходить кандидатів за спільними
+    триграмами (у кирилиці та транслітерації), а остаточно їх ранжує best_title_match;
+    exact_lookup() — лише точний збіг нормалізованої назви чи її транслітерації.
+    Індекс зберігається на диск і при наступному запуску лише доповнюється новими фільмами.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.film_ids = []
+        self.keys = []
+        self.postings = {}
+        self.exact = {}
+        self.max_film_id = 0
+        # Скільки рядків films з id <= max_film_id бачив індекс, включно з назвами, яких не проіндексовано
+        self.source_rows = 0
+
+    def __len__(self):
+        return len(set(self.film_ids))
+
+    def _add_key(self, film_id, key):
+        entry = len(self.keys)
+        self.film_ids.append(film_id)
+        self.keys.append(key)
+        self.exact.setdefault(exact_key(key), film_id)
+        for gram in trigrams(key):
+            self.postings.setdefault(gram, []).append(entry)
+
+    def add(self, film_id, name):
+        self.source_rows += 1
+        self.max_film_id = max(self.max_film_id, film_id)
+        key = normalize_title(name)
+        if not key:
+            return
+        self._add_key(film_id, key)
+        latin = transliterate(key)
+        if latin != key:
+            self._add_key(film_id, latin)
+
+    def lookup(self, query, threshold=TITLE_MATCH_THRESHOLD, limit=TITLE_INDEX_CANDIDATES):
+        """Повертає (film_id, score) найкращого збігу або None."""
+        key = normalize_title(query)
+        if not key:
+            return None
+        variants = list(dict.fromkeys([key, transliterate(key)]))
+        hits = Counter()
+        for variant in variants:
+            for gram in trigrams(variant):
+                hits.update(self.postings.get(gram, ()))
+        if not hits:
+            return None
+
+        candidates = [entry for entry, _ in hits.most_common(limit)]
+        candidate_keys = [self.keys[entry] for entry in candidates]
+        for variant in variants:
+            best, scores = best_title_match(variant, candidate_keys, threshold)
+            if best is not None:
+                return self.film_ids[candidates[best]], scores[best]
+        return None
+
+    def exact_lookup(self, query):
+        """
+        film_id фільму, чия нормалізована назва (або транслітерація) збігається із запитом точно.
+        Запит з роком ("Дюна (1984)") точним не вважається: рік у індексі не зберігається,
+        тож рімейк з тією ж назвою не можна відрізнити.
+        """
+        key = normalize_title(query)
+        if not key or title_year(query) is not None:
+            return None
+        for variant in dict.fromkeys([key, transliterate(key)]):
+            film_id = self.exact.get(exact_key(variant))
+            if film_id is not None:
+                return film_id
+        return None
+
+    def refresh(self, cursor):
+        """Доповнює індекс фільмами, доданими після збереження; якщо фільми видалялись — перебудовує."""
+        cursor.execute("SELECT COUNT(*) AS total FROM films WHERE id <= %s", (self.max_film_id,))
+        if cursor.fetchone()['total'] != self.source_rows:
+            print("    -> Фільми видалялись, індекс назв перебудовується.")
+            self._clear()
+        cursor.execute("SELECT id, name FROM films WHERE id > %s ORDER BY id", (self.max_film_id,))
+        rows = cursor.fetchall()
+        for row in rows:
+            self.add(row['id'], row['name'])
+        return len(rows)
+
+    def save(self, path=TITLE_INDEX_PATH):
+        data = {"max_film_id": self.max_film_id, "source_rows": self.source_rows,
+                "film_ids": self.film_ids, "keys": self.keys, "postings": self.postings}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TITLE_INDEX_PATH):
+        index = cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return index
+        index.max_film_id = data["max_film_id"]
+        index.film_ids = data["film_ids"]
+        index.keys = data["keys"]
+        index.postings = data["postings"]
+        index.source_rows = data.get("source_rows", len(index))
+        for film_id, key in zip(index.film_ids, index.keys):
+            index.exact.setdefault(exact_key(key), film_id)
+        return index
@@ -0,0 +1,241 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+WORK_QUEUE_PATH = os.path.join(base_dir, 'work_queue.sqlite')
+# Скільки воркер може тримати завдання, перш ніж воно вважається покинутим і видається знову
+JOB_LEASE = 15 * 60
+# Після стількох невдалих спроб (парсингу чи запису результату в БД) завдання позначається
+# як failed і більше не видається
+JOB_MAX_ATTEMPTS = 3
+# Скільки зберігаються виконані завдання (для дедуплікації та статистики)
+JOB_RETENTION = 7 * 24 * 3600
+SQLITE_BUSY_TIMEOUT = 30
+
+JOB_FILM = "film"
+JOB_QUERY = "query"
+
+
+def worker_name(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+class WorkQueue:
+    """
+    Постійна черга завдань на SQLite між планувальником, воркерами парсингу та записувачем у БД.
+    Завдання (jobs) унікальні за (kind, key): повторне додавання ще не виконаного нічого не робить.
+    Воркери атомарно забирають завдання claim() з орендою на JOB_LEASE і кладуть результат
+    complete(); записувач читає результати fetch_results() і після коміту в MySQL викликає ack(),
+    а якщо запис не вдався — reject().
+    Файл черги можна відкривати з кількох процесів одночасно.
+    """
+
+    def __init__(self, path=WORK_QUEUE_PATH, lease=JOB_LEASE, max_attempts=JOB_MAX_ATTEMPTS):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_by TEXT,
+                lease_until REAL,
+                error TEXT,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (kind, status, priority DESC, job_id);
+            CREATE TABLE IF NOT EXISTS results (
+                result_id INTEGER PRIMARY KEY,
+                job_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            );
+        """)
+        # Файли черги, створені до лічильника невдалих записів
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE одразу бере блокування на запис, тож два процеси не заберуть одне завдання."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, kind, key, payload, priority=0):
+        """
+        Додає завдання. Виконане чи остаточно провалене завдання з тим самим ключем
+        ставиться в чергу знову, а ще не виконане лишається як є.
+        Повертає True, якщо завдання стало (знову) очікуваним.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO jobs (kind, key, payload, priority, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (kind, key) DO UPDATE SET
+                    payload = excluded.payload,
+                    priority = MAX(priority, excluded.priority),
+                    status = 'pending', attempts = 0, error = NULL, claimed_by = NULL, lease_until = NULL,
+                    enqueued_at = excluded.enqueued_at, updated_at = excluded.updated_at
+                WHERE status IN ('done', 'failed')
+            """, (kind, str(key), json.dumps(payload, ensure_ascii=False), priority, now, now))
+            return cursor.rowcount > 0
+
+    def claim(self, worker, kinds=None, limit=1):
+        """Атомарно забирає до limit завдань: очікувані та ті, чия оренда минула (воркер упав)."""
+        now = time.time()
+        kind_filter = ""
+        params = [now]
+        if kinds:
+            kind_filter = f"AND kind IN ({', '.join(['?'] * len(kinds))})"
+            params += list(kinds)
+        with self._transaction() as conn:
+            # Завдання, на якому воркер падав уже max_attempts разів, більше не видаємо
+            conn.execute("""
+                UPDATE jobs SET status = 'failed', claimed_by = NULL, lease_until = NULL,
+                    error = COALESCE(error, 'оренда минула'), updated_at = ?
+                WHERE status = 'claimed' AND lease_until < ? AND attempts >= ?
+            """, (now, now, self.max_attempts))
+            rows = conn.execute(f"""
+                SELECT job_id, kind, key, payload, attempts FROM jobs
+                WHERE (status = 'pending' OR (status = 'claimed' AND lease_until < ?)) {kind_filter}
+                ORDER BY priority DESC, job_id
+                LIMIT ?
+            """, params + [limit]).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'claimed', claimed_by = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                [(worker, now + self.lease, now, row['job_id']) for row in rows]
+            )
+        return [
+            {"job_id": row['job_id'], "kind": row['kind'], "key": row['key'],
+             "payload": json.loads(row['payload']), "attempt": row['attempts'] + 1}
+            for row in rows
+        ]
+
+    def complete(self, job_id, worker, result):
+        """
+        Зберігає результат парсингу; завдання чекає на запис у БД (status = 'scraped').
+        Повертає False, якщо оренда вже минула і завдання забрав інший воркер.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'scraped', lease_until = NULL, updated_at = ? WHERE job_id = ? AND status = 'claimed' AND claimed_by = ?",
+                (now, job_id, worker)
+            ).rowcount
+            if updated:
+                conn.execute("INSERT INTO results (job_id, payload, created_at) VALUES (?, ?, ?)",
+                             (job_id, json.dumps(result, ensure_ascii=False), now))
+        return bool(updated)
+
+    def fail(self, job_id, worker, error):
+        """Повертає завдання в чергу або, після max_attempts спроб, позначає його failed."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    claimed_by = NULL, lease_until = NULL, error = ?, updated_at = ?
+                WHERE job_id = ? AND status = 'claimed' AND claimed_by = ?
+            """, (self.max_attempts, str(error)[:1000], now, job_id, worker))
+
+    def fetch_results(self, after=0, limit=100):
+        """
+        Найстаріші незаписані результати з result_id > after разом із їхніми завданнями.
+        Результат лишається в черзі до ack(), тож після падіння записувача його буде записано знову.
+        """
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT r.result_id, r.payload AS result, j.job_id, j.kind, j.key, j.payload
+                FROM results r JOIN jobs j ON j.job_id = r.job_id
+                WHERE r.result_id > ?
+                ORDER BY r.result_id
+                LIMIT ?
+            """, (after, limit)).fetchall()
+        return [
+            {"result_id": row['result_id'], "job_id": row['job_id'], "kind": row['kind'], "key": row['key'],
+             "payload": json.loads(row['payload']), "result": json.loads(row['result'])}
+            for row in rows
+        ]
+
+    def ack(self, result_ids):
+        """Результати записано в БД: видаляємо їх і закриваємо завдання."""
+        if not result_ids:
+            return
+        now = time.time()
+        placeholders = ", ".join(["?"] * len(result_ids))
+        with self._transaction() as conn:
+            conn.execute(f"""
+                UPDATE jobs SET status = 'done', updated_at = ?
+                WHERE job_id IN (SELECT job_id FROM results WHERE result_id IN ({placeholders}))
+            """, [now] + list(result_ids))
+            conn.execute(f"DELETE FROM results WHERE result_id IN ({placeholders})", list(result_ids))
+
+    def reject(self, result_ids, error):
+        """
+        Результати не вдалося записати в БД. Після max_attempts таких спроб результат видаляється,
+        а завдання позначається failed — інакше "отруйний" результат повторювався б при кожному запуску.
+        Повертає кількість результатів, від яких відмовились.
+        """
+        if not result_ids:
+            return 0
+        now = time.time()
+        placeholders = ", ".join(["?"] * len(result_ids))
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE results SET attempts = attempts + 1 WHERE result_id IN ({placeholders})", list(result_ids))
+            dead = [row['result_id'] for row in conn.execute(
+                f"SELECT result_id FROM results WHERE result_id IN ({placeholders}) AND attempts >= ?",
+                list(result_ids) + [self.max_attempts]
+            )]
+            if dead:
+                dead_placeholders = ", ".join(["?"] * len(dead))
+                conn.execute(f"""
+                    UPDATE jobs SET status = 'failed', error = ?, updated_at = ?
+                    WHERE job_id IN (SELECT job_id FROM results WHERE result_id IN ({dead_placeholders}))
+                """, [f"запис у БД: {error}"[:1000], now] + dead)
+                conn.execute(f"DELETE FROM results WHERE result_id IN ({dead_placeholders})", dead)
+        return len(dead)
+
+    def counts(self):
+        """status -> кількість завдань, плюс results — скільки результатів чекає на запис."""
+        with self._lock:
+            counts = {row['status']: row['total'] for row in
+                      self._conn.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status")}
+            counts["results"] = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return counts
+
+    def is_drained(self):
+        """Немає ні завдань у роботі, ні результатів, що чекають на запис."""
+        counts = self.counts()
+        return not any(counts.get(status) for status in ("pending", "claimed", "scraped", "results"))
+
+    def purge(self, retention=JOB_RETENTION):
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                                (time.time() - retention,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
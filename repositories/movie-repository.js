@@ -1,4 +1,5 @@
 const pool = require('../config/db'); 
+const logic = require('../services/logic');
 /**
  * Отримує повний список жанрів з бази даних,
  * відсортований за алфавітом.
@@ -329,6 +330,26 @@ exports.updateFilmDetails = async (filmId, data) => {
             ]
         );
 
+        // Проєкція розширеного пошуку (film_search*) має одразу бачити ручні правки
+        const projection = logic.buildSearchProjection(data);
+        await connection.execute(
+            `INSERT INTO film_search (film_id, normalized_name, release_year, duration_min, imdb_rating)
+             SELECT id, normalized_name, ?, ?, ? FROM films WHERE id = ?
+             ON DUPLICATE KEY UPDATE release_year = VALUES(release_year),
+                 duration_min = VALUES(duration_min), imdb_rating = VALUES(imdb_rating)`,
+            [projection.releaseYear, projection.durationMin, projection.imdbRating, filmId]
+        );
+        await connection.execute(
+            "DELETE FROM film_search_country WHERE film_id = ?",
+            [filmId]
+        );
+        if (projection.countries.length > 0) {
+            await connection.query(
+                "INSERT IGNORE INTO film_search_country (country, film_id) VALUES ?",
+                [projection.countries.map(country => [country, filmId])]
+            );
+        }
+
         await connection.execute(
             "DELETE FROM film_genre WHERE film_id = ?",
             [filmId]
@@ -357,6 +378,9 @@ exports.updateFilmDetails = async (filmId, data) => {
 
 exports.deleteFilmById = async (filmId) => {
     try {
+        for (const table of ['film_search', 'film_search_country', 'film_search_price']) {
+            await pool.execute(`DELETE FROM ${table} WHERE film_id = ?`, [filmId]);
+        }
         await pool.execute(
             "DELETE FROM films WHERE id = ?",
             [filmId]
@@ -1,11 +1,51 @@
 // repositories/recommendationRepository.js
 const pool = require('../config/db');
 
+/**
+ * Рекомендації з film_similarity; порожній список, якщо таблицю ще не створено.
+ */
+const getPrecomputedRecommendations = async (userId) => {
+    try {
+        const [rows] = await pool.execute(
+            `
+            WITH TargetUserHighRatings AS (
+                SELECT film_id, rating FROM ratings WHERE user_id = ? AND rating >= 4
+            )
+            SELECT
+                f.id,
+                f.name,
+                f.poster_url AS image,
+                SUM(s.score * (t.rating - 3)) AS recommendation_score
+            FROM TargetUserHighRatings t
+            JOIN film_similarity s ON s.film_id = t.film_id
+            JOIN films f ON s.similar_film_id = f.id
+            WHERE s.similar_film_id NOT IN (SELECT film_id FROM ratings WHERE user_id = ?)
+            GROUP BY f.id, f.name, f.poster_url
+            ORDER BY recommendation_score DESC
+            LIMIT 20;
+            `,
+            [userId, userId]
+        );
+        return rows;
+    } catch (err) {
+        if (err.code === 'ER_NO_SUCH_TABLE') return [];
+        throw err;
+    }
+};
+
 /**
  * Отримує персоналізовані рекомендації для користувача.
+ * Спершу — з готової таблиці схожих фільмів film_similarity (її перераховує
+ * parser/film_similarity.py): сума схожості з фільмами, які користувач оцінив на 4-5,
+ * з вагою за оцінкою. Якщо для його фільмів схожих ще не пораховано — розрахунок на льоту.
  */
 exports.getItemBaseRecommendations = async (userId) => {
     try {
+        const precomputed = await getPrecomputedRecommendations(userId);
+        if (precomputed.length > 0) {
+            return precomputed;
+        }
+
         const [rows] = await pool.execute(
             `
             WITH TargetUserHighRatings AS (
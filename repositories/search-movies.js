@@ -20,8 +20,36 @@ exports.getAllFilmNames = async (query) => {
   return results;
 };
 
+// Біти film_search.access_flags (як ACCESS_FLAGS у parser/search_index.py)
+const ACCESS_FLAGS = { free: 1, subscription: 2, rent: 4, purchase: 8 };
+// Початки film_platform.access_type для кожного класу доступу (як ACCESS_PREFIXES у parser/search_index.py)
+const ACCESS_PREFIXES = {
+    free: ['Безкоштов'],
+    subscription: ['Підписк', 'Передплат'],
+    rent: ['Оренд', 'Прокат'],
+    purchase: ['Купів', 'Покуп']
+};
+
+/**
+ * Умова для фільму з рядком проєкції film_search або, якщо парсер його ще не побудував,
+ * та сама умова по текстових колонках films/film_platform — щоб такі фільми не випадали з пошуку.
+ */
+function projectedOr(projection, legacy) {
+    return `((s.film_id IS NOT NULL AND ${projection}) OR (s.film_id IS NULL AND ${legacy}))`;
+}
+
+function legacyAccessCondition(accessClass) {
+    return "(" + ACCESS_PREFIXES[accessClass].map(() => "fp.access_type LIKE ?").join(" OR ") + ")";
+}
+
+function legacyAccessParams(accessClass) {
+    return ACCESS_PREFIXES[accessClass].map(prefix => `${prefix}%`);
+}
+
 /**
  * Виконує розширений пошук з фільтрами.
+ * Фільтри читають типізовану проєкцію film_search* (її підтримує парсер, див. parser/search_index.py),
+ * а не розбирають текстові колонки films у кожному запиті; фільми без проєкції фільтруються по-старому.
  */
 exports.getAllFilmNames = async (filters) => {
     try {
@@ -32,7 +60,10 @@ exports.getAllFilmNames = async (filters) => {
             "COUNT(r.rating) AS vote_count " +
             "FROM films f";
         
-        let joins = ["LEFT JOIN ratings r ON f.id = r.film_id"];
+        let joins = [
+            "LEFT JOIN ratings r ON f.id = r.film_id",
+            "LEFT JOIN film_search s ON f.id = s.film_id"
+        ];
         let whereConditions = [];
         let params = [];
 
@@ -42,47 +73,62 @@ exports.getAllFilmNames = async (filters) => {
             params.push(filters.genre);
         }
 
-        if (filters.price_type || filters.platform) {
-            joins.push("JOIN film_platform fp ON f.id = fp.film_id");
-        }
-        if (filters.price_type) {
-            if (filters.price_type === 'subscription') {
-                whereConditions.push("fp.access_type = 'Підписка'");
-            } else if (filters.price_type === 'free') {
-                whereConditions.push("fp.access_type = 'Безкоштовно'");
-            } else if (filters.price_type === 'rent') {
-                whereConditions.push("fp.access_type LIKE 'Оренда%' OR fp.access_type LIKE 'Прокат%'");
-            }
-        }
+        const accessClass = Object.hasOwn(ACCESS_FLAGS, filters.price_type) ? filters.price_type : null;
         if (filters.platform) {
-            whereConditions.push("fp.platform_id = ?");
-            params.push(filters.platform);
+            // Платформа й тип доступу мають збігатися в одній пропозиції
+            let priceCondition = "sp.film_id = f.id AND sp.platform_id = ?";
+            let legacyCondition = "fp.film_id = f.id AND fp.platform_id = ?";
+            const priceParams = [filters.platform];
+            const legacyParams = [filters.platform];
+            if (accessClass) {
+                priceCondition += " AND sp.access_class = ?";
+                priceParams.push(accessClass);
+                legacyCondition += " AND " + legacyAccessCondition(accessClass);
+                legacyParams.push(...legacyAccessParams(accessClass));
+            }
+            whereConditions.push(projectedOr(
+                `EXISTS (SELECT 1 FROM film_search_price sp WHERE ${priceCondition})`,
+                `EXISTS (SELECT 1 FROM film_platform fp WHERE ${legacyCondition})`
+            ));
+            params.push(...priceParams, ...legacyParams);
+        } else if (accessClass) {
+            whereConditions.push(projectedOr(
+                "(s.access_flags & ?) <> 0",
+                `EXISTS (SELECT 1 FROM film_platform fp WHERE fp.film_id = f.id AND ${legacyAccessCondition(accessClass)})`
+            ));
+            params.push(ACCESS_FLAGS[accessClass], ...legacyAccessParams(accessClass));
         }
 
         if (filters.q) {
+            // LIKE, а не FULLTEXT: ngram-індекс пропускає стоп-слова й не знаходить частини слів
             whereConditions.push("f.normalized_name LIKE ?");
             params.push(`%${filters.q}%`);
         }
         if (filters.year_from) {
-            whereConditions.push("f.release_year >= ?");
-            params.push(filters.year_from);
-            
+            whereConditions.push(projectedOr("s.release_year >= ?", "f.release_year >= ?"));
+            params.push(filters.year_from, filters.year_from);
         }
         if (filters.year_to) {
-            whereConditions.push("f.release_year <= ?");
-            params.push(filters.year_to);
+            whereConditions.push(projectedOr("s.release_year <= ?", "f.release_year <= ?"));
+            params.push(filters.year_to, filters.year_to);
         }
         if (filters.country) {
-            whereConditions.push("f.country LIKE ?");
-            params.push(`%${filters.country}%`);
+            whereConditions.push(projectedOr(
+                "EXISTS (SELECT 1 FROM film_search_country c WHERE c.country = ? AND c.film_id = f.id)",
+                "f.country LIKE ?"
+            ));
+            params.push(filters.country, `%${filters.country}%`);
         }
         if (filters.duration_max) {
-            whereConditions.push("CAST(REGEXP_SUBSTR(f.duration, '^[0-9]+') AS UNSIGNED) <= ?");
-            params.push(filters.duration_max);
+            whereConditions.push(projectedOr(
+                "s.duration_min <= ?",
+                "CAST(REGEXP_SUBSTR(f.duration, '^[0-9]+') AS UNSIGNED) <= ?"
+            ));
+            params.push(filters.duration_max, filters.duration_max);
         }
         if (filters.imdb_min) {
-            whereConditions.push("CAST(f.imdb_rating AS DECIMAL(3,1)) >= ?");
-            params.push(filters.imdb_min);
+            whereConditions.push(projectedOr("s.imdb_rating >= ?", "CAST(f.imdb_rating AS DECIMAL(3,1)) >= ?"));
+            params.push(filters.imdb_min, filters.imdb_min);
         }
 
         let finalQuery = baseQuery;
@@ -124,3 +124,44 @@ exports.isValidSearchQuery = (queryText) => {
 
     return true;
 };
+
+/**
+ * Значення проєкції розширеного пошуку (film_search) з полів фільму, як їх зберігає films.
+ * Розбір той самий, що в parser/normalize.py: "2 год 46 хв" -> 166, "8,5" -> 8.5,
+ * країни — без повторів (без різниці в регістрі) і не довші за 100 символів.
+ */
+exports.buildSearchProjection = (data) => {
+    const text = (value) => (value === null || value === undefined) ? '' : String(value);
+
+    const yearMatch = text(data.release_year).match(/\b(1[89]\d\d|2\d\d\d)\b/);
+
+    const durationText = text(data.duration);
+    const hours = durationText.match(/(\d+)\s*(?:год|h)/i);
+    const minutes = durationText.match(/(\d+)\s*(?:хв|min|m\b)/i);
+    let durationMin = null;
+    if (hours || minutes) {
+        durationMin = (hours ? Number.parseInt(hours[1], 10) * 60 : 0) + (minutes ? Number.parseInt(minutes[1], 10) : 0);
+    } else {
+        const number = durationText.match(/\d+(?:[.,]\d+)?/);
+        durationMin = number ? Math.trunc(Number.parseFloat(number[0].replace(',', '.'))) : null;
+    }
+
+    const ratingMatch = text(data.imdb_rating).match(/\d+(?:[.,]\d+)?/);
+    let imdbRating = ratingMatch ? Math.round(Number.parseFloat(ratingMatch[0].replace(',', '.')) * 10) / 10 : null;
+    if (imdbRating !== null && (imdbRating < 0 || imdbRating > 10)) imdbRating = null;
+
+    const countries = new Map();
+    text(data.country).split(',').forEach(country => {
+        const trimmed = country.trim().slice(0, 100).trim();
+        if (trimmed && !countries.has(trimmed.toLocaleLowerCase('uk'))) {
+            countries.set(trimmed.toLocaleLowerCase('uk'), trimmed);
+        }
+    });
+
+    return {
+        releaseYear: yearMatch ? Number.parseInt(yearMatch[1], 10) : null,
+        durationMin,
+        imdbRating,
+        countries: Array.from(countries.values())
+    };
+};
@@ -123,4 +123,18 @@ describe('Business Logic Unit Tests', () => {
         expect(logic.isValidSearchQuery('abba')).toBe(true);
     });
 
+    // --- Проєкція розширеного пошуку ---
+    test('buildSearchProjection: should parse film fields like the parser does', () => {
+        const result = logic.buildSearchProjection({
+            release_year: '2024', duration: '2 год 46 хв', imdb_rating: '8,5', country: 'США, Канада, сша'
+        });
+        expect(result).toEqual({ releaseYear: 2024, durationMin: 166, imdbRating: 8.5, countries: ['США', 'Канада'] });
+    });
+
+    test('buildSearchProjection: should return nulls for missing or invalid values', () => {
+        const result = logic.buildSearchProjection({ release_year: 'N/A', duration: null, imdb_rating: '87', country: '' });
+        expect(result).toEqual({ releaseYear: null, durationMin: null, imdbRating: null, countries: [] });
+        expect(logic.buildSearchProjection({ duration: '166 хв' }).durationMin).toBe(166);
+    });
+
 });
\ No newline at end of file